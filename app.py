@@ -1,5 +1,10 @@
+import hashlib
+import importlib.metadata
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
 import streamlit as st
-import re
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import numpy as np
 from streamlit_echarts import st_echarts
@@ -12,95 +17,151 @@ from templates.components import (
     render_log_format_help,
     render_about_info,
     render_statistics_card,
-    render_chart_hint
+    render_chart_hint,
+    render_chart_delta,
+    render_degradation_banner
 )
 
 # 导入智能图表分析模块
 from utils.chart_manager import ChartRuleEngine
+from utils.log_parser import TIME_COLUMNS, get_common_keys, value_columns
+from utils.log_grammars import GRAMMARS, seconds_to_datetimes
+from utils.chunk_index import ChunkedLog
+from utils.anomaly import ANOMALY_METHODS, detect_anomalies
+from utils.alarm_rules import alarm_report, evaluate_rules, parse_rule, parse_rules
+from utils.resampler import BUCKET_SIZES, AGGREGATIONS, resample, suggest_bucket
+from utils.correlation import correlation_matrix, lag_analysis, estimate_offset
+from utils.spectrum import (
+    SEGMENT_SIZES, WINDOWS, estimate_sample_rate, reduce_bins, spectral_analysis, to_db,
+)
+from utils.derived import ExpressionError, compile_expression, evaluate, function_help, parse_definitions
+from utils.exporter import EXPORT_FORMATS, available_formats, export_stream
+from utils.log_store import LogStore
+from utils.parse_jobs import MergeJob, ParseJobManager, ResultReleased
+from utils.memory_guard import (
+    MB, MEMORY_BUDGET, PARSE_LIMIT_FACTOR, PAYLOAD_BUDGET, guard_frame, guard_chart_frame, frame_nbytes,
+)
+from utils.shared_cache import SharedCache
+from utils.multi_compare import (
+    build_time_grid,
+    align_to_grid,
+    parse_runs_parallel,
+    compute_envelope
+)
 from charts.factory import ChartFactory
 
 # ==========================================
 # 配置与初始化
 # ==========================================
-st.set_page_config(
-    layout="wide", 
-    page_title="NEUP_LOG_ANALYZER v1.2", 
-    page_icon="📈",
-    initial_sidebar_state="expanded"
-)
-
-# ==========================================
-# 核心逻辑类 (保持不变)
-# ==========================================
-class LogParser:
-    def __init__(self):
-        self.first_bracket_re = re.compile(r'\[([^\]]+)\]')
-        self.data_pattern = re.compile(r'(\w+)[:=](-?[\d.]+)')
-
-    def parse(self, content):
-        data_list = []
-        lines = content.split('\n')
-        parse_errors = 0
-
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-
-            timestamp = None
-            m = self.first_bracket_re.search(line)
-            if m:
-                raw_ts = m.group(1)
-                if re.match(r'^\d+(?:\.\d+)?$', raw_ts):
-                    try:
-                        timestamp = float(raw_ts)
-                    except ValueError:
-                        parse_errors += 1
-            
-            data_matches = self.data_pattern.findall(line)
-            if data_matches:
-                row_data = {}
-                if timestamp is not None:
-                    row_data['Timestamp'] = timestamp
-                
-                for key, value in data_matches:
-                    try:
-                        row_data[key] = float(value)
-                    except ValueError:
-                        pass
-                if row_data:
-                    data_list.append(row_data)
-
-        if not data_list:
-            return pd.DataFrame(), parse_errors
-
-        df = pd.DataFrame(data_list)
-        if 'Timestamp' in df.columns:
-            df = df.sort_values('Timestamp').reset_index(drop=True)
-            df = df.ffill().fillna(0)  # 使用 ffill() 替代 fillna(method='ffill')
-        else:
-            df['Timestamp'] = df.index
-        
-        return df, parse_errors
-    
-    def get_statistics(self, df):
-        if df.empty: return {}
-        stats = {}
-        for col in df.columns:
-            if col != 'Timestamp':
-                stats[col] = {
-                    'mean': df[col].mean(), 'std': df[col].std(),
-                    'min': df[col].min(), 'max': df[col].max(),
-                    'range': df[col].max() - df[col].min()
-                }
-        return stats
+# 页面配置在 main() 中应用，导入本模块 (如基准测试) 时不产生副作用
+PAGE_CONFIG = {
+    "layout": "wide",
+    "page_title": "NEUP_LOG_ANALYZER v1.2",
+    "page_icon": "📈",
+    "initial_sidebar_state": "expanded"
+}
 
 # ==========================================
 # ECharts 绘图辅助函数 (新增)
 # ==========================================
-def render_echarts_line(df, x_col, y_cols, title="趋势图", mark_line_val=None):
+# 图表 id 写入 title.id，浏览器端据此找到已渲染的实例做增量更新
+TREND_CHART_ID = "neup-trend"
+
+def comparison_chart_id(key):
+    return f"neup-compare-{key}"
+
+def _echarts_version():
+    """已安装的 streamlit-echarts 版本 (主, 次)，无法识别时为 (0, 0)"""
+    try:
+        return tuple(int(part) for part in importlib.metadata.version("streamlit-echarts").split(".")[:2])
+    except (importlib.metadata.PackageNotFoundError, ValueError):
+        return (0, 0)
+
+ECHARTS_VERSION = _echarts_version()
+
+# 浏览器端能否找到已渲染的图表实例做增量更新:
+# 0.4 在 iframe 中由 echarts-for-react 渲染 (增量脚本沿 React fiber 查找)，0.7+ 由 CHART_REGISTER_EVENT 登记；
+# 其他版本在滑块移动后整页重跑，图表带着新的标记线重新渲染
+CHART_DELTAS = ECHARTS_VERSION == (0, 4) or ECHARTS_VERSION >= (0, 7)
+
+# 0.7+ 的事件处理函数在绑定时求值，可访问图表实例 chart: 借此按 title.id 登记到主页面的 window.neupCharts
+CHART_REGISTER_EVENT = """(function() {
+    if (typeof chart !== 'undefined') {
+        var title = (chart.getOption().title || [])[0];
+        if (title && title.id) {
+            (window.neupCharts = window.neupCharts || {})[title.id] = chart;
+            if (window.flushChartDelta) { window.flushChartDelta(title.id); }
+        }
+    }
+    return function() {};
+})()"""
+
+MARK_MOVED_KEY = "chart_mark_moved"
+
+def chart_events(events=None):
+    """st_echarts 的 events 参数: 0.7+ 附加实例登记 (处理函数不返回值，不触发重跑)"""
+    events = dict(events or {})
+    if ECHARTS_VERSION >= (0, 7):
+        events["finished"] = CHART_REGISTER_EVENT
+    return events or None
+
+def _mark_moved():
+    st.session_state[MARK_MOVED_KEY] = True
+
+def send_mark_line(deltas):
     """
-    通用 ECharts 折线图渲染器
+    移动已渲染图表的标记线 (在快照片段中调用，滑块需以 _mark_moved 作为 on_change)
+    支持增量时只发送增量；否则滑块移动后整页重跑，由图表重新渲染标记线
+    """
+    moved = st.session_state.pop(MARK_MOVED_KEY, False)
+    if CHART_DELTAS:
+        render_chart_delta(deltas)
+    elif moved:
+        st.rerun()
+
+def _build_mark_areas(x_values, intervals):
+    """
+    将 (x_start, x_end) 区间转换为 markArea 数据
+    类目轴上使用数据索引定位，避免数值型类目名被误当作索引
+    """
+    starts = np.searchsorted(x_values, [a for a, _ in intervals], side='left')
+    ends = np.searchsorted(x_values, [b for _, b in intervals], side='right') - 1
+    return {
+        "silent": True,
+        "itemStyle": {"color": "rgba(235, 77, 75, 0.15)"},
+        "data": [
+            [{"xAxis": int(a)}, {"xAxis": int(max(a, b))}]
+            for a, b in zip(starts, ends) if a < len(x_values)
+        ]
+    }
+
+def _step_points(x_values, times, values):
+    """
+    阶跃通道的变化点 → [[类目下标, 值], ...]
+    同一下标内有多次变化时保留最后一次，末尾补一个点把阶梯延伸到 x 轴终点
+    """
+    if len(x_values) == 0 or len(times) == 0:
+        return []
+    idx = np.minimum(np.searchsorted(x_values, times, side='left'), len(x_values) - 1)
+    keep = np.r_[idx[1:] != idx[:-1], True]
+    idx, values = idx[keep], np.asarray(values, dtype=float)[keep]
+    points = [[int(i), float(v)] for i, v in zip(idx, values)]
+    if points[-1][0] != len(x_values) - 1:
+        points.append([len(x_values) - 1, points[-1][1]])
+    return points
+
+def format_times(seconds):
+    """Unix 秒 → 日期时间文本 (精确到毫秒)，用于日期时间格式日志的轴标签"""
+    return seconds_to_datetimes(seconds).dt.strftime('%Y-%m-%d %H:%M:%S.%f').str[:-3].tolist()
+
+def build_echarts_line_option(df, x_col, y_cols, title="趋势图", mark_line_val=None, mark_areas=None,
+                              chart_id=None, steps=None, time_labels=False):
+    """
+    构建通用折线图的 ECharts 配置 (不渲染)
+    mark_areas: {列名: [(x_start, x_end), ...]}，以 markArea 高亮对应区间
+    chart_id: 写入 title.id，供 render_chart_delta 定位图表
+    steps: {列名: (变化时间, 值)}，游程编码的阶跃通道；只发送变化点，以阶梯线绘制 (df 中不需要该列)
+    time_labels: x 列为 Unix 秒时，类目轴标签显示为日期时间 (标记线、区间仍按数据索引定位)
     """
     # 颜色盘
     colors = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#43e97b', '#f0932b', '#eb4d4b']
@@ -109,14 +170,16 @@ def render_echarts_line(df, x_col, y_cols, title="趋势图", mark_line_val=None
     legend_data = []
 
     # 将 Pandas 数据列转换为 List
-    x_data = df[x_col].tolist()
+    x_data = format_times(df[x_col]) if time_labels else df[x_col].tolist()
 
     for i, col in enumerate(y_cols):
+        is_step = bool(steps) and col in steps
         series_list.append({
             "name": col,
             "type": "line",
-            "data": df[col].tolist(),
-            "smooth": True,  # 平滑曲线
+            "data": _step_points(df[x_col].to_numpy(), *steps[col]) if is_step else df[col].tolist(),
+            "smooth": not is_step,  # 平滑曲线 (阶跃通道不平滑)
+            "step": "end" if is_step else False,
             "showSymbol": False, # 默认不显示数据点圆圈，鼠标悬停才显示
             "itemStyle": {"color": colors[i % len(colors)]},
             "lineStyle": {"width": 2},
@@ -126,11 +189,14 @@ def render_echarts_line(df, x_col, y_cols, title="趋势图", mark_line_val=None
                 "data": [{"xAxis": mark_line_val}] if mark_line_val else []
             } if mark_line_val else {}
         })
+        if mark_areas and mark_areas.get(col):
+            series_list[-1]["markArea"] = _build_mark_areas(df[x_col].to_numpy(), mark_areas[col])
         legend_data.append(col)
 
     # ECharts 配置项 (Option)
     option = {
         "title": {
+            "id": chart_id,
             "text": title,
             "left": "center",
             "textStyle": {"color": "#2d3748", "fontSize": 16}
@@ -187,31 +253,59 @@ def render_echarts_line(df, x_col, y_cols, title="趋势图", mark_line_val=None
         ],
         "series": series_list
     }
+    return option
+
+def render_echarts_line(df, x_col, y_cols, title="趋势图", mark_line_val=None, mark_areas=None):
+    """
+    通用 ECharts 折线图渲染器
+    """
+    option = build_echarts_line_option(df, x_col, y_cols, title, mark_line_val, mark_areas)
 
     # 渲染图表
     st_echarts(options=option, height="500px", theme="light")
 
-def render_echarts_comparison_chart(df1, df2, key, current_time):
+def with_mark_line(option, mark_line_val):
+    """在已构建的折线图配置上设置标记线 (浅拷贝，不修改缓存中的原配置)"""
+    option = dict(option)
+    option["series"] = [
+        dict(series, markLine={
+            "symbol": "none",
+            "label": {"show": False},
+            "data": [{"xAxis": mark_line_val}]
+        })
+        for series in option["series"]
+    ]
+    return option
+
+def comparison_axis_value(t, time_axis):
+    """对比图 x 轴上的坐标: 数值轴为秒，时间轴为毫秒"""
+    return t * 1000 if time_axis else t
+
+def build_echarts_comparison_option(df1, df2, key, current_time, time_axis=False):
     """
-    ECharts 对比图表 (处理时间轴对齐问题)
+    构建对比图表的 ECharts 配置 (处理时间轴对齐问题)
     为了精确对比，我们使用 'value' 类型的 X 轴
+    time_axis: 日期时间格式的日志改用 'time' 类型 (坐标为 Unix 毫秒，按 UTC 显示，与 Time 列一致)
     """
     # 准备数据：[timestamp, value] 格式
-    data_main = df1[['Timestamp', key]].values.tolist()
-    data_ref = df2[['Timestamp', key]].values.tolist()
+    data_main = np.column_stack((comparison_axis_value(df1['Timestamp'].to_numpy(), time_axis),
+                                 df1[key].to_numpy())).tolist()
+    data_ref = np.column_stack((comparison_axis_value(df2['Timestamp'].to_numpy(), time_axis),
+                                df2[key].to_numpy())).tolist()
 
     option = {
-        "title": {"text": f"参数对比: {key}", "left": "center"},
+        "title": {"id": comparison_chart_id(key), "text": f"参数对比: {key}", "left": "center"},
         "tooltip": {
             "trigger": "axis",
             "axisPointer": {"type": "cross"}
         },
         "legend": {"data": ["主日志", "参考日志"], "top": "30px"},
         "grid": {"bottom": "15%", "containLabel": True},
+        "useUTC": True,
         "xAxis": {
-            "type": "value", # 使用数值轴而不是类目轴，确保时间对齐
+            "type": "time" if time_axis else "value", # 使用数值/时间轴而不是类目轴，确保时间对齐
             "scale": True,
-            "name": "Timestamp",
+            "name": "Time" if time_axis else "Timestamp",
             "splitLine": {"show": False}
         },
         "yAxis": {
@@ -236,7 +330,7 @@ def render_echarts_comparison_chart(df1, df2, key, current_time):
                     "symbol": "none",
                     "label": {"show": False},
                     "lineStyle": {"color": "red", "type": "solid", "width": 1},
-                    "data": [{"xAxis": current_time}]
+                    "data": [{"xAxis": comparison_axis_value(current_time, time_axis)}]
                 }
             },
             {
@@ -250,17 +344,481 @@ def render_echarts_comparison_chart(df1, df2, key, current_time):
             }
         ]
     }
+    return option
+
+def render_echarts_comparison_chart(df1, df2, key, current_time):
+    """
+    ECharts 对比图表
+    current_time 只决定首次渲染时的标记线，之后由 render_chart_delta 增量移动
+    两条曲线各占一半负载预算，超出时按时间桶降采样
+    """
+    time_axis = 'Time' in df1.columns
+    df1, notes_main = guard_chart_frame(df1[['Timestamp', key]], [key], f"对比图 {key} (主日志)", PAYLOAD_BUDGET / 2)
+    df2, notes_ref = guard_chart_frame(df2[['Timestamp', key]], [key], f"对比图 {key} (参考日志)", PAYLOAD_BUDGET / 2)
+    report_degradation(notes_main + notes_ref)
+    st_echarts(options=build_echarts_comparison_option(df1, df2, key, current_time, time_axis), height="400px",
+               events=chart_events())
+
+def _grid_xy(grid, values):
+    """网格数组转 [[x, y], ...]，NaN 转为 None 以便 ECharts 断开曲线"""
+    y = values.astype(object)
+    y[np.isnan(values)] = None
+    return np.column_stack((grid.astype(object), y)).tolist()
+
+def render_echarts_envelope_chart(grid, key, main_values, envelope, run_values=None, run_names=None):
+    """
+    ECharts 多日志包络图
+    主日志为粗线，历史运行的分位数区间为阴影带，min/max 为虚线
+    """
+    band_low = envelope['p_low']
+    band_width = envelope['p_high'] - envelope['p_low']
+
+    series = [
+        # 包络带: 下沿透明线 + 堆叠宽度填充
+        {
+            "name": "分位区间",
+            "type": "line",
+            "data": _grid_xy(grid, band_low),
+            "stack": "band",
+            "symbol": "none",
+            "lineStyle": {"opacity": 0},
+            "tooltip": {"show": False}
+        },
+        {
+            "name": "分位区间",
+            "type": "line",
+            "data": _grid_xy(grid, band_width),
+            "stack": "band",
+            "symbol": "none",
+            "lineStyle": {"opacity": 0},
+            "areaStyle": {"color": "rgba(102, 126, 234, 0.2)"},
+            "tooltip": {"show": False}
+        },
+        {
+            "name": "历史最小/最大",
+            "type": "line",
+            "data": _grid_xy(grid, envelope['min']),
+            "symbol": "none",
+            "lineStyle": {"width": 1, "type": "dashed", "color": "#a0aec0"}
+        },
+        {
+            "name": "历史最小/最大",
+            "type": "line",
+            "data": _grid_xy(grid, envelope['max']),
+            "symbol": "none",
+            "lineStyle": {"width": 1, "type": "dashed", "color": "#a0aec0"}
+        },
+        {
+            "name": "历史中位数",
+            "type": "line",
+            "data": _grid_xy(grid, envelope['median']),
+            "symbol": "none",
+            "lineStyle": {"width": 1, "color": "#764ba2"}
+        }
+    ]
+
+    # 可选: 逐条叠加历史运行 (细灰线)
+    if run_values is not None:
+        for name, values in zip(run_names, run_values):
+            series.append({
+                "name": name,
+                "type": "line",
+                "data": _grid_xy(grid, values),
+                "symbol": "none",
+                "silent": True,
+                "lineStyle": {"width": 0.5, "color": "rgba(113, 128, 150, 0.35)"}
+            })
+
+    series.append({
+        "name": "主日志",
+        "type": "line",
+        "data": _grid_xy(grid, main_values),
+        "symbol": "none",
+        "itemStyle": {"color": "#eb4d4b"},
+        "lineStyle": {"width": 2.5}
+    })
+
+    option = {
+        "title": {"text": f"多日志包络: {key}", "left": "center"},
+        "tooltip": {"trigger": "axis", "axisPointer": {"type": "cross"}},
+        "legend": {"data": ["主日志", "历史中位数", "分位区间", "历史最小/最大"], "top": "30px"},
+        "grid": {"bottom": "15%", "containLabel": True},
+        "xAxis": {"type": "value", "scale": True, "name": "Timestamp", "splitLine": {"show": False}},
+        "yAxis": {
+            "type": "value",
+            "scale": True,
+            "splitLine": {"lineStyle": {"type": "dashed", "color": "#eee"}}
+        },
+        "dataZoom": [
+            {"type": "slider", "show": True, "bottom": 10},
+            {"type": "inside"}
+        ],
+        "series": series
+    }
     st_echarts(options=option, height="400px")
 
+def render_echarts_correlation_heatmap(cols, matrix):
+    """ECharts 相关矩阵热力图 (全部通道一张图)"""
+    data = [
+        [j, i, None if np.isnan(matrix[i, j]) else round(float(matrix[i, j]), 3)]
+        for i in range(len(cols)) for j in range(len(cols))
+    ]
+    option = {
+        "title": {"text": "Pearson 相关矩阵", "left": "center"},
+        "tooltip": {"position": "top", "trigger": "item"},
+        "grid": {"height": "70%", "top": "10%", "containLabel": True},
+        "xAxis": {"type": "category", "data": cols, "splitArea": {"show": True},
+                  "axisLabel": {"rotate": 45 if len(cols) > 8 else 0}},
+        "yAxis": {"type": "category", "data": cols, "splitArea": {"show": True}},
+        "visualMap": {
+            "min": -1,
+            "max": 1,
+            "calculable": True,
+            "orient": "horizontal",
+            "left": "center",
+            "bottom": "2%",
+            "inRange": {"color": ["#4facfe", "#f7fafc", "#eb4d4b"]}
+        },
+        "series": [{
+            "name": "相关系数",
+            "type": "heatmap",
+            "data": data,
+            "label": {"show": len(cols) <= 15, "fontSize": 10}
+        }]
+    }
+    st_echarts(options=option, height=f"{max(400, 28 * len(cols) + 150)}px")
+
+# 时频谱热力图最多显示的频点数 (超出时相邻频点取平均)
+SPECTROGRAM_MAX_BINS = 128
+
+def render_echarts_psd(spectrum, key):
+    """ECharts Welch 功率谱密度 (dB)"""
+    option = {
+        "title": {"text": f"{key} 功率谱密度 (Welch, {spectrum.segments} 段平均)", "left": "center"},
+        "tooltip": {"trigger": "axis"},
+        "grid": {"left": "3%", "right": "4%", "bottom": "15%", "containLabel": True},
+        "xAxis": {"type": "value", "name": "Hz", "min": 0, "max": spectrum.fs / 2},
+        "yAxis": {"type": "value", "name": "dB/Hz", "scale": True,
+                  "splitLine": {"lineStyle": {"type": "dashed", "color": "#eee"}}},
+        "dataZoom": [
+            {"type": "slider", "show": True, "bottom": 10},
+            {"type": "inside"}
+        ],
+        "series": [{
+            "name": key,
+            "type": "line",
+            "showSymbol": False,
+            "itemStyle": {"color": "#667eea"},
+            "data": np.column_stack([spectrum.freqs, np.round(to_db(spectrum.psd), 3)]).tolist(),
+        }]
+    }
+    st_echarts(options=option, height="360px")
+
+def render_echarts_spectrogram(spectrum, key):
+    """ECharts 时频谱热力图 (dB)，频点过多时合并显示"""
+    freqs, power = reduce_bins(spectrum.freqs, spectrum.spectrogram, SPECTROGRAM_MAX_BINS)
+    levels = np.round(to_db(power), 2)
+    rows, cols = np.indices(levels.shape)
+    option = {
+        "title": {"text": f"{key} 时频谱", "left": "center"},
+        "tooltip": {"position": "top", "trigger": "item"},
+        "grid": {"left": "3%", "right": "4%", "bottom": "18%", "containLabel": True},
+        "xAxis": {"type": "category", "name": "时间 (s)", "data": np.round(spectrum.times, 3).tolist()},
+        "yAxis": {"type": "category", "name": "Hz", "data": np.round(freqs, 2).tolist()},
+        "visualMap": {
+            "min": float(np.percentile(levels, 5)),
+            "max": float(levels.max()),
+            "calculable": True,
+            "orient": "horizontal",
+            "left": "center",
+            "bottom": "2%",
+            "inRange": {"color": ["#f7fafc", "#4facfe", "#764ba2", "#eb4d4b"]}
+        },
+        "series": [{
+            "name": "dB/Hz",
+            "type": "heatmap",
+            "data": np.column_stack([rows.ravel(), cols.ravel(), levels.ravel()]).tolist(),
+            "progressive": 0,
+        }]
+    }
+    st_echarts(options=option, height="420px")
+
 # ==========================================
 # 辅助函数
 # ==========================================
-def get_common_keys(df1, df2):
-    cols1 = set(df1.columns)
-    cols2 = set(df2.columns)
-    common = list((cols1 & cols2) - {'Timestamp'})
-    common.sort()
-    return common
+def report_degradation(notes):
+    """收集本次运行的降级说明，由 main() 末尾统一显示横幅"""
+    st.session_state.setdefault('degradations', []).extend(notes)
+
+def content_fingerprint(raw, grammar):
+    """文件内容 + 解析语法的指纹 (同一文件换语法需要重新解析)"""
+    return hashlib.sha1(raw + b"\0" + grammar.encode("utf-8")).hexdigest()
+
+def merge_fingerprint(raws, grammar):
+    """多源合并的指纹: 涵盖各源文件名 (决定列前缀)、内容与解析语法"""
+    h = hashlib.sha1(grammar.encode("utf-8"))
+    for name, raw in raws:
+        h.update(b"\0" + name.encode("utf-8") + b"\0" + raw)
+    return h.hexdigest()
+
+# 单文件分析时，文件不小于此大小默认 "按需解析": 先发现参数名，只解析选中的参数
+PROJECTION_MIN_BYTES = 32 * 1024 * 1024
+
+def projection_fingerprint(raw, grammar, keys):
+    """按需解析的指纹: 文件内容 + 语法 + 所选参数 (换参数需要重新解析)"""
+    return content_fingerprint(raw, grammar + "\0" + "\0".join(sorted(keys)))
+
+@st.cache_resource(show_spinner=False)
+def get_parse_jobs():
+    """后台解析任务表 (进程内共享，同一文件只解析一次；结果估算远超内存预算时提前停止)"""
+    return ParseJobManager(max_bytes=MEMORY_BUDGET * PARSE_LIMIT_FACTOR)
+
+def select_projected_keys(raw, grammar):
+    """
+    按需解析的第一遍: 后台发现参数名，在侧边栏选择后返回所选参数
+    发现尚未完成或未选择参数时在主区域显示进度/提示，返回 None
+    """
+    fingerprint = content_fingerprint(raw, grammar) + ":keys"
+    job = get_parse_jobs().submit_discover(raw, fingerprint, grammar)
+    if not job.finished:
+        render_parse_progress([("参数发现", job)])
+        return None
+    if job.status != "done":
+        render_parse_issues([("参数发现", job)])
+        return None
+
+    st.sidebar.markdown("---")
+    st.sidebar.caption(f"已发现 {len(job.result)} 个参数 ({job.elapsed:.1f} s)")
+    keys = render_key_picker("选择参数", job.result, 3, key="keys_main")
+    if not keys:
+        st.info("👈 请在侧边栏选择要解析的参数")
+    return keys
+
+@st.cache_resource(show_spinner=False)
+def get_shared_cache():
+    """解析结果/派生索引的进程内共享缓存 (所有会话共用一份，只读)"""
+    return SharedCache()
+
+def current_session():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+def shared(key, build, size, label):
+    """从共享缓存取值，并记下本次运行用到的键 (运行结束时释放其余租约)"""
+    st.session_state.setdefault('shared_keys', set()).add(key)
+    return get_shared_cache().get_or_create(key, build, size, label, current_session())
+
+@contextmanager
+def cache_leases():
+    """包裹一次整页运行: 运行结束 (含提前 return / rerun) 时释放本会话不再使用的共享缓存条目"""
+    st.session_state['shared_keys'] = set()
+    try:
+        yield
+    finally:
+        get_shared_cache().release(current_session(), st.session_state.get('shared_keys', ()))
+
+def load_log(job, fingerprint, partial, label="日志"):
+    """
+    取出后台解析结果 (按内容指纹与是否为部分结果在进程内共享，同一文件所有会话共用一份)
+    缓存的是经过内存预算保护后的结果，返回 (df, parse_errors, 降级说明)；df 只读
+    结果从任务中取走，共享缓存是唯一持有者；条目被淘汰后丢弃任务并重新解析
+    """
+    def build():
+        df, parse_errors = job.take_result()
+        notes = []
+        if job.over_budget:
+            notes.append(f"{label}: 解析结果预计超出内存预算的 {PARSE_LIMIT_FACTOR:g} 倍，"
+                         f"解析到第 {job.lines_done} 行时停止，只保留前 {len(df)} 行")
+        df, guard_notes = guard_frame(df, label, copy=False)
+        return df, parse_errors, notes + guard_notes
+
+    try:
+        return shared(("log", fingerprint, partial), build, lambda r: frame_nbytes(r[0]),
+                      f"{label} {fingerprint[:8]}" + (" (部分)" if partial else ""))
+    except ResultReleased:
+        get_parse_jobs().discard(job.fingerprint)
+        st.rerun()
+
+@st.fragment(run_every=0.5)
+def render_parse_progress(jobs):
+    """
+    后台解析进度 (定时刷新本片段)
+    jobs: [(标签, ParseJob)]；没有运行中的任务时触发整页重跑
+    """
+    st.markdown("### ⏳ 正在解析日志")
+    for label, job in jobs:
+        mb = job.total_bytes / 1024 / 1024
+        if job.status == "done":
+            st.progress(1.0, text=f"✅ {label}: 完成 ({mb:.1f} MB, {job.elapsed:.1f} s)")
+            continue
+
+        st.progress(job.progress, text=f"{label}: {job.lines_done}/{job.total_lines or '?'} 行 "
+                                       f"({mb:.1f} MB, 已解析 {job.parsed_rows} 条记录)")
+        col_cancel, col_peek = st.columns([1, 3])
+        with col_cancel:
+            if job.status in ("pending", "running") and st.button("⏹️ 取消", key=f"cancel_{job.fingerprint}"):
+                job.cancel()
+        with col_peek:
+            # 部分结果预览: 解析过程中即可查看已解析的记录
+            if st.toggle("👁️ 预览已解析部分", key=f"peek_{job.fingerprint}"):
+                st.dataframe(job.partial().tail(200), use_container_width=True, height=240)
+
+    if not any(job.status in ("pending", "running") for _, job in jobs):
+        st.rerun()
+
+def render_parse_issues(jobs):
+    """已取消/失败的解析任务: 采用部分结果或重新解析"""
+    manager = get_parse_jobs()
+    for label, job in jobs:
+        if job.over_budget:
+            st.warning(f"🛡️ {label} 的解析结果预计超出内存预算 ({MEMORY_BUDGET / MB:g} MB) 的 "
+                       f"{PARSE_LIMIT_FACTOR:g} 倍，已在第 {job.lines_done} 行停止 (已解析 {job.parsed_rows} 条记录)。"
+                       "可使用已解析部分，或勾选「⚡ 按需解析」只解析部分参数")
+        elif job.status == "cancelled":
+            st.warning(f"⏹️ {label} 解析已取消 (已解析 {job.parsed_rows} 条记录)")
+        elif job.status == "error":
+            st.error(f"❌ {label} 解析失败: {job.error}")
+        else:
+            continue
+        col_partial, col_retry = st.columns([1, 1])
+        with col_partial:
+            if job.status == "cancelled" and job.partial_ok and \
+                    st.button("使用已解析部分", key=f"partial_{job.fingerprint}"):
+                job.accept_partial()
+                st.rerun()
+        with col_retry:
+            if st.button("🔁 重新解析", key=f"retry_{job.fingerprint}"):
+                manager.discard(job.fingerprint)
+                st.rerun()
+
+@st.cache_resource(show_spinner=False)
+def get_log_store():
+    """本地历史库 (进程内共享一个实例，每次操作各自开连接)"""
+    return LogStore()
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_stored_run(run_id, fingerprint, keys, t_range):
+    """从历史库读取一次运行 (按运行指纹、参数与时间范围缓存)，返回 (df, 降级说明)"""
+    return guard_frame(get_log_store().query(run_id, list(keys), *t_range), f"历史运行 #{run_id}")
+
+def select_stored_run(label, key):
+    """
+    在侧边栏选择历史库中的一次运行及读取范围
+    返回 (df, fingerprint)，只读取所选参数和时间范围，无需重新解析
+    """
+    store = get_log_store()
+    runs = store.list_runs()
+    if runs.empty:
+        st.sidebar.info("🗄️ 历史库为空，请先上传日志并保存")
+        return pd.DataFrame(), None
+
+    runs = runs.set_index('run_id')
+    run_id = st.sidebar.selectbox(
+        label, runs.index.tolist(), key=key,
+        format_func=lambda r: f"#{r} {runs.at[r, 'name']} ({runs.at[r, 'rows']} 行)"
+    )
+    run = runs.loc[run_id]
+
+    run_keys = store.get_keys(run_id)
+    keys = st.sidebar.multiselect("读取参数", run_keys, default=run_keys, key=f"{key}_keys")
+    t_range = (run['t_min'], run['t_max'])
+    if t_range[1] > t_range[0]:
+        t_range = st.sidebar.slider("读取时间范围", float(t_range[0]), float(t_range[1]),
+                                    (float(t_range[0]), float(t_range[1])), key=f"{key}_range")
+
+    fingerprint = hashlib.sha1(f"{run['fingerprint']}|{keys}|{t_range}".encode("utf-8")).hexdigest()
+    df, notes = load_stored_run(run_id, fingerprint, tuple(keys), tuple(t_range))
+    report_degradation(notes)
+    return df, fingerprint
+
+def render_store_save(df, name, fingerprint, key, notes=()):
+    """
+    侧边栏: 将已解析的上传文件保存到历史库 (同一文件只入库一次)
+    notes: 该文件的内存预算降级说明；降级后的数据 (float32 / 时间桶均值) 不入库，
+    否则会以原文件指纹永久保存，之后原始数据也无法再入库
+    """
+    store = get_log_store()
+    if notes:
+        st.sidebar.caption(f"🗄️ {name} 已按内存预算降级，不保存到历史库")
+    elif store.find_run(fingerprint) is not None:
+        st.sidebar.caption(f"🗄️ {name} 已在历史库中")
+    elif st.sidebar.button(f"💾 保存到历史库: {name}", key=key):
+        with st.spinner("正在写入历史库..."):
+            store.ingest(df, name, fingerprint)
+        st.sidebar.success(f"✅ 已保存 {name}")
+
+DERIVED_PLACEHOLDER = "power = voltage * current\nrpm_rate = deriv(rpm)\ntemp_f = temp * 9 / 5 + 32"
+
+def render_derived_editor():
+    """侧边栏: 派生通道定义 (每行一条 名称 = 表达式)，返回语法有效的表达式列表"""
+    with st.sidebar.expander("🧮 派生通道"):
+        text = st.text_area("每行一条: 名称 = 表达式", key="derived_exprs", placeholder=DERIVED_PLACEHOLDER,
+                            help="由已解析的参数计算新通道，可在图表、对比和导出中像普通参数一样使用")
+        sources, errors = parse_definitions(text)
+        for lineno, message in errors:
+            st.error(f"第 {lineno} 行: {message}")
+        st.caption("运算: + - * / // % **、比较、and/or/not；t 为时间 (秒)；"
+                   "参数名不是标识符时用 col(\"名称\")；可引用前面定义的通道")
+        if st.toggle("函数列表", key="derived_help"):
+            st.markdown(function_help())
+    return sources
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def derived_column(_df, fingerprint, sources):
+    """
+    一个派生通道 (sources 的最后一条) 的计算结果
+    按数据指纹与截至该条的全部表达式缓存: 前面的表达式可能定义了被引用的通道
+    """
+    return evaluate(compile_expression(sources[-1]), _df)
+
+def apply_derived(df, fingerprint, sources, label):
+    """
+    依次追加派生通道，返回 (df, 新指纹, 派生通道名)
+    求值失败 (如引用了不存在的参数) 的表达式在侧边栏提示并跳过
+    """
+    if df.empty or not sources:
+        return df, fingerprint, []
+    df = df.copy(deep=False)  # 只追加列，不复制已解析的数据
+    applied = []
+    for i, source in enumerate(sources):
+        try:
+            values = derived_column(df, fingerprint, tuple(sources[:i + 1]))
+        except ExpressionError as e:
+            st.sidebar.warning(f"{label}: `{source}` → {e}")
+            continue
+        df[compile_expression(source).name] = values
+        applied.append(source)
+    if applied:
+        # 派生列改变了数据内容，下游按指纹缓存的分块索引/窗口等需要区分
+        fingerprint = hashlib.sha1("\0".join([fingerprint or "", *applied]).encode("utf-8")).hexdigest()
+    names = list(dict.fromkeys(compile_expression(source).name for source in applied))
+    return df, fingerprint, names
+
+def get_chunked_log(df, fingerprint):
+    """构建时间分块索引 (按数据指纹在进程内共享，跨 rerun、跨会话复用)"""
+    return shared(("chunked", fingerprint), lambda: ChunkedLog.from_dataframe(df, fingerprint=fingerprint),
+                  lambda chunked: chunked.nbytes, f"分块索引 {fingerprint[:8]}")
+
+def render_cache_admin():
+    """管理视图 (URL 带 ?admin=1 时显示): 共享缓存占用、命中率与各条目引用计数"""
+    cache = get_shared_cache()
+    with st.sidebar.expander("🛠️ 共享缓存", expanded=True):
+        stats = cache.stats()
+        col_size, col_hit = st.columns(2)
+        col_size.metric("占用", f"{stats['bytes'] / MB:.0f} / {stats['max_bytes'] / MB:.0f} MB",
+                        help=f"其中被会话引用 (不可淘汰) {stats['pinned_bytes'] / MB:.0f} MB")
+        col_hit.metric("命中率", f"{stats['hit_rate']:.0%}", help=f"命中 {stats['hits']} / 未命中 {stats['misses']}")
+        st.caption(f"{stats['entries']} 个条目 · {stats['sessions']} 个会话 · 已淘汰 {stats['evictions']} 次")
+        entries = cache.describe()
+        if entries:
+            st.dataframe(pd.DataFrame(entries), use_container_width=True, hide_index=True)
+        if st.button("清除未引用条目", key="cache_clear"):
+            st.toast(f"已清除 {cache.clear(unused_only=True)} 个条目")
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def compute_alignment_offset(_df_main, _df_ref, fingerprint_main, fingerprint_ref, keys):
+    """估计参考日志时间偏移 (按两份日志指纹与参数缓存)"""
+    return estimate_offset(_df_main, _df_ref, list(keys))
 
 def render_comparison_dashboard(df_main, df_ref, keys):
     st.markdown("### 🔄 日志对比分析")
@@ -270,9 +828,58 @@ def render_comparison_dashboard(df_main, df_ref, keys):
         st.error("主日志无有效时间数据")
         return
 
-    # 1. 顶部控制器与快照
+    # 1. 顶部控制器与快照 (独立片段，拖动滑块不重发下方图表的序列数据)
     min_time, max_time = float(times_sorted[0]), float(times_sorted[-1])
-    current_time = st.slider("⏱️ 对比时间点同步", min_time, max_time, min_time)
+    if not min_time <= st.session_state.get('compare_time', min_time) <= max_time:
+        st.session_state['compare_time'] = min_time
+    render_comparison_snapshot_fragment(df_main, df_ref, keys, min_time, max_time)
+
+    # 2. ECharts 对比图表: 分页，只渲染当前页；序列数据只在渲染时发送，标记线由片段增量更新
+    st.markdown("### 📉 趋势叠加 (支持滚轮缩放)")
+    render_comparison_charts(df_main, df_ref, keys)
+
+# 对比图每页的图表数，同时存在的 ECharts 实例不超过其中最大值
+COMPARE_PAGE_SIZES = (2, 4, 6, 8)
+COMPARE_PAGE_KEY = "compare_page"
+
+def comparison_page_keys(keys):
+    """对比图当前页的参数，返回 (参数, 页码, 总页数)；参数变少导致页码越界时取最后一页"""
+    size = st.session_state.get(f"{COMPARE_PAGE_KEY}_size", COMPARE_PAGE_SIZES[1])
+    pages = max(1, -(-len(keys) // size))
+    page = min(st.session_state.get(COMPARE_PAGE_KEY, 0), pages - 1)
+    return keys[page * size:(page + 1) * size], page, pages
+
+def _shift_compare_page(delta, pages):
+    page = min(st.session_state.get(COMPARE_PAGE_KEY, 0), pages - 1)
+    st.session_state[COMPARE_PAGE_KEY] = min(max(page + delta, 0), pages - 1)
+
+@st.fragment
+def render_comparison_charts(df_main, df_ref, keys):
+    """对比图分页片段: 只构建并发送当前页的图表，翻页只重跑本片段"""
+    page_keys, page, pages = comparison_page_keys(keys)
+    if len(keys) > COMPARE_PAGE_SIZES[0]:
+        col_prev, col_info, col_size, col_next = st.columns([1, 2, 2, 1])
+        with col_prev:
+            st.button("⬅️ 上一页", key=f"{COMPARE_PAGE_KEY}_prev", on_click=_shift_compare_page, args=(-1, pages),
+                      disabled=page == 0, use_container_width=True)
+        with col_info:
+            st.caption(f"第 {page + 1}/{pages} 页 · 共 {len(keys)} 个参数")
+        with col_size:
+            st.selectbox("每页图表数", COMPARE_PAGE_SIZES, index=1, key=f"{COMPARE_PAGE_KEY}_size",
+                         label_visibility="collapsed", format_func=lambda n: f"每页 {n} 个图表")
+        with col_next:
+            st.button("下一页 ➡️", key=f"{COMPARE_PAGE_KEY}_next", on_click=_shift_compare_page, args=(1, pages),
+                      disabled=page >= pages - 1, use_container_width=True)
+
+    current_time = st.session_state['compare_time']
+    for key in page_keys:
+        render_echarts_comparison_chart(df_main, df_ref, key, current_time)
+
+@st.fragment
+def render_comparison_snapshot_fragment(df_main, df_ref, keys, min_time, max_time):
+    """对比快照片段: 滑块 + 指标 + 对比图标记线增量"""
+    current_time = time_slider("⏱️ 对比时间点同步", min_time, max_time, "compare_time",
+                               as_datetime='Time' in df_main.columns, on_change=_mark_moved)
 
     idx_main = (df_main['Timestamp'] - current_time).abs().idxmin()
     row_main = df_main.loc[idx_main]
@@ -296,54 +903,609 @@ def render_comparison_dashboard(df_main, df_ref, keys):
                 help=f"主: {val_main:.3f} | 参: {val_ref:.3f}"
             )
 
+    # 标记线使用 x 轴坐标 (时间轴为毫秒；只有当前页的图表存在)
+    page_keys, _, _ = comparison_page_keys(keys)
+    mark = comparison_axis_value(current_time, 'Time' in df_main.columns)
+    send_mark_line([{"chart": comparison_chart_id(key), "markLine": mark} for key in page_keys])
+
     st.markdown("---")
-    
-    # 2. ECharts 对比图表
-    st.markdown("### 📉 趋势叠加 (支持滚轮缩放)")
-    for key in keys:
-        render_echarts_comparison_chart(df_main, df_ref, key, current_time)
 
-def render_single_dashboard(df, keys, parser):
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_aligned_runs(payloads, keys, grid, align, grammar="auto", derived=()):
+    """并行解析历史日志并对齐 (按文件内容、网格参数、日志语法与派生通道缓存)"""
+    return parse_runs_parallel(list(payloads), list(keys), grid, align, grammar=grammar, derived=list(derived))
+
+def render_multi_run_dashboard(df_main, ref_files, keys, grammar="auto", derived=()):
+    st.markdown("### 🧬 多日志包络对比")
+
+    col_grid, col_align, col_pct = st.columns([1, 1, 2])
+    with col_grid:
+        grid_size = st.number_input("网格点数", min_value=100, max_value=20000, value=1000, step=100,
+                                    help="所有日志插值到同一时间网格，内存与网格大小成正比")
+    with col_align:
+        align = st.radio("时间对齐", ("start", "absolute"),
+                         format_func=lambda x: "按起点对齐" if x == "start" else "绝对时间")
+    with col_pct:
+        p_low, p_high = st.slider("包络分位数 (%)", 0, 100, (10, 90))
+    show_runs = st.checkbox("叠加显示每条历史曲线", value=len(ref_files) <= 20)
+
+    grid = build_time_grid(df_main, grid_size, align)
+    if len(grid) == 0:
+        st.error("主日志无有效时间数据")
+        return
+
+    with st.spinner(f"正在并行解析 {len(ref_files)} 份历史日志..."):
+        run_values = load_aligned_runs(tuple(f.getvalue() for f in ref_files), tuple(keys), grid, align, grammar,
+                                       tuple(derived))
+    main_values = align_to_grid(df_main, keys, grid, align)
+    envelope = compute_envelope(run_values, (p_low, p_high))
+
+    st.caption(f"历史运行: {len(ref_files)} 份 | 网格点数: {len(grid)} | "
+               f"对齐数据占用: {run_values.nbytes / 1024 / 1024:.1f} MB")
+    st.markdown("---")
+
+    run_names = [f.name for f in ref_files]
+    for i, key in enumerate(keys):
+        render_echarts_envelope_chart(
+            grid, key, main_values[i],
+            {name: arr[i] for name, arr in envelope.items()},
+            run_values[:, i, :] if show_runs else None,
+            run_names
+        )
+
+# 自助探索模块中自动分桶的目标桶数
+MAX_EXPLORE_BUCKETS = 500
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def resample_window(_chunked, fingerprint, time_window, bucket, how):
+    """时间窗口数据按桶聚合 (按数据指纹、窗口、桶大小与聚合方式缓存)"""
+    return resample(_chunked.query(*time_window), bucket, how)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def run_anomaly_detection(_chunked, fingerprint, window, methods, thresholds):
+    """对整个日志执行异常检测 (按数据指纹与参数缓存)"""
+    return detect_anomalies(_chunked.query(), None, window, dict(thresholds), methods)
+
+def _jump_to_anomaly(intervals, time_window):
+    """
+    跳转表回调: 将快照定位到所选异常区间的起点
+    区间从分析窗口之前开始时定位到窗口起点 (快照只能落在窗口内)
+    """
+    idx = st.session_state.get('anomaly_jump')
+    if idx is not None:
+        t_start, t_end = time_window
+        st.session_state['snapshot_time'] = min(max(float(intervals.loc[idx, 'start']), t_start), t_end)
+
+def render_anomaly_panel(chunked, keys, time_window):
+    """
+    异常检测面板
+    返回 {列名: [(start, end), ...]} 供趋势图叠加 markArea
+    """
+    with st.expander("🚨 异常检测", expanded=False):
+        enabled = st.checkbox("启用异常检测 (全部数值通道)", value=False, key="anomaly_enabled")
+        col_win, col_methods = st.columns([1, 2])
+        with col_win:
+            window = st.number_input("滚动窗口 (行)", min_value=5, max_value=5000, value=50, step=5)
+        with col_methods:
+            methods = st.multiselect(
+                "检测方法", list(ANOMALY_METHODS.keys()), default=["zscore", "step"],
+                format_func=lambda m: ANOMALY_METHODS[m]["name"]
+            )
+        threshold_cols = st.columns(max(len(methods), 1))
+        thresholds = {}
+        for i, method in enumerate(methods):
+            with threshold_cols[i]:
+                thresholds[method] = st.number_input(
+                    f"{ANOMALY_METHODS[method]['name']} 阈值", min_value=0.5, max_value=50.0,
+                    value=ANOMALY_METHODS[method]["default_threshold"], step=0.5
+                )
+
+        if not enabled or not methods:
+            return {}
+
+        with st.spinner("正在检测异常..."):
+            intervals = run_anomaly_detection(
+                chunked, chunked.fingerprint, int(window), tuple(methods), tuple(sorted(thresholds.items()))
+            )
+
+        # 只展示与分析窗口重叠的区间
+        t_start, t_end = time_window
+        intervals = intervals[(intervals['end'] >= t_start) & (intervals['start'] <= t_end)]
+        st.caption(f"共检测到 {len(intervals)} 个异常区间 (涉及 {intervals['column'].nunique()} 个通道)")
+        if intervals.empty:
+            return {}
+
+        st.dataframe(intervals, use_container_width=True, height=240)
+
+        # 跳转表: 选中区间后快照滑块定位到区间起点
+        jump_rows = intervals.sort_values('peak_score', ascending=False).head(500)
+        st.selectbox(
+            "⏩ 跳转到异常", options=jump_rows.index.tolist(), index=None, key="anomaly_jump",
+            format_func=lambda i: (f"{jump_rows.loc[i, 'column']} | {ANOMALY_METHODS[jump_rows.loc[i, 'method']]['name']} | "
+                                   f"{jump_rows.loc[i, 'start']:.4f} → {jump_rows.loc[i, 'end']:.4f}"),
+            on_change=_jump_to_anomaly, args=(intervals, time_window)
+        )
+
+        shown = intervals[intervals['column'].isin(keys)]
+        return {
+            col: list(zip(group['start'], group['end']))
+            for col, group in shown.groupby('column')
+        }
+
+ALARM_PLACEHOLDER = "temp > 85 for 2s\npressure drops 5% within 100ms\noverspeed: rpm >= 3000"
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def run_alarm_rules(_chunked, fingerprint, sources):
+    """对整个日志检查报警规则 (按数据指纹与规则文本缓存)，返回 (违规区间, 汇总报告)"""
+    rules = [parse_rule(source) for source in sources]
+    intervals, errors = evaluate_rules(_chunked.query(), rules)
+    return intervals, alarm_report(intervals, rules, errors)
+
+def render_alarm_panel(chunked, keys, time_window):
+    """
+    报警规则面板: 每行一条限值规则，检查整个日志并导出报告
+    返回 {列名: [(start, end), ...]} 供趋势图叠加 markArea
+    """
+    with st.expander("🚦 报警规则", expanded=False):
+        text = st.text_area("每行一条规则，可加 \"名称:\" 前缀", key="alarm_rules", placeholder=ALARM_PLACEHOLDER,
+                            help="阈值: 参数 > 值 [for 时长]；变化率: 参数 drops|rises|changes 幅度[%] within 时长；"
+                                 "时长单位 ms / s / min")
+        rules, errors = parse_rules(text)
+        for lineno, message in errors:
+            st.error(f"第 {lineno} 行: {message}")
+        if not rules:
+            return {}
+
+        with st.spinner("正在检查报警规则..."):
+            intervals, report = run_alarm_rules(chunked, chunked.fingerprint, tuple(r.source for r in rules))
+
+        failed = int((~report['passed']).sum())
+        st.caption(f"{len(rules)} 条规则，{failed} 条未通过，共 {len(intervals)} 个违规区间 (整个日志)")
+        st.dataframe(report, use_container_width=True, hide_index=True)
+
+        t_start, t_end = time_window
+        shown = intervals[(intervals['end'] >= t_start) & (intervals['start'] <= t_end)]
+        if not shown.empty:
+            st.dataframe(shown, use_container_width=True, height=240)
+
+        col_report, col_intervals = st.columns(2)
+        with col_report:
+            st.download_button("📥 导出报告 (CSV)", report.to_csv(index=False).encode("utf-8"),
+                               file_name="alarm_report.csv", mime="text/csv", key="alarm_report_csv")
+        with col_intervals:
+            st.download_button("📥 导出违规区间 (CSV)", intervals.to_csv(index=False).encode("utf-8"),
+                               file_name="alarm_intervals.csv", mime="text/csv", key="alarm_intervals_csv")
+
+        shown = shown[shown['column'].isin(keys)]
+        return {
+            col: list(zip(group['start'], group['end']))
+            for col, group in shown.groupby('column')
+        }
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def compute_correlation(_chunked, fingerprint, time_window):
+    """时间窗口内全部数值列的相关矩阵 (按数据指纹与窗口缓存)"""
+    return correlation_matrix(_chunked.query(*time_window))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def compute_lags(_chunked, fingerprint, time_window, reference, max_lag):
+    """以 reference 为基准的通道时滞 (按数据指纹、窗口与基准通道缓存)"""
+    return lag_analysis(_chunked.query(*time_window), reference, max_lag=max_lag)
+
+@st.fragment
+def render_correlation_panel(chunked, keys, time_window):
+    """相关性与时滞分析视图"""
+    with st.expander("🧮 相关性与时滞分析", expanded=False):
+        if not st.checkbox("计算全部通道的相关矩阵", value=False, key="corr_enabled"):
+            return
+
+        with st.spinner("正在计算相关矩阵..."):
+            cols, matrix = compute_correlation(chunked, chunked.fingerprint, time_window)
+        if len(cols) < 2:
+            st.info("至少需要两个数值通道")
+            return
+        render_echarts_correlation_heatmap(cols, matrix)
+
+        st.markdown("**⏱️ FFT 互相关时滞**")
+        col_ref, col_max = st.columns([1, 1])
+        with col_ref:
+            reference = st.selectbox("基准通道", cols, index=cols.index(keys[0]) if keys[0] in cols else 0)
+        with col_max:
+            max_lag = st.number_input("最大搜索时滞 (0 = 自动)", min_value=0.0, value=0.0,
+                                      help="只在 ±最大时滞范围内寻找互相关峰值")
+        lags = compute_lags(chunked, chunked.fingerprint, time_window, reference, max_lag or None)
+        st.caption("lag > 0 表示该通道滞后于基准通道；peak_corr 为互相关峰值")
+        st.dataframe(lags, use_container_width=True, height=240)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def compute_spectrum(_chunked, fingerprint, key, time_window, fs, nperseg, overlap, window):
+    """单个通道的 Welch PSD 与时频谱 (按数据指纹、通道、窗口与分析参数缓存；逐块流式计算)"""
+    return spectral_analysis(_chunked.iter_chunks(*time_window, columns=[key]), key, fs, *time_window,
+                             nperseg=nperseg, overlap=overlap, window=window)
+
+# 采样率输入下限 (Hz)
+MIN_SAMPLE_RATE = 1e-6
+
+@st.fragment
+def render_spectrum_panel(chunked, keys, time_window):
+    """频谱分析视图: 选定通道重采样为等间隔后计算 Welch PSD 与时频谱"""
+    with st.expander("〰️ 频谱分析 (PSD / 时频谱)", expanded=False):
+        if not st.checkbox("计算频谱", value=False, key="spectrum_enabled"):
+            return
+
+        col_key, col_seg, col_win, col_overlap, col_fs = st.columns([2, 1, 1, 1, 1])
+        with col_key:
+            key = st.selectbox("通道", keys, key="spectrum_key")
+        head = next(chunked.iter_chunks(*time_window, columns=[key]), None)
+        if head is None:
+            st.info("所选时间窗口内没有数据")
+            return
+        with col_seg:
+            nperseg = st.selectbox("分段长度", SEGMENT_SIZES, index=SEGMENT_SIZES.index(1024),
+                                   key="spectrum_nperseg", help="越长频率分辨率越高，时间分辨率越低")
+        with col_win:
+            window = st.selectbox("窗函数", list(WINDOWS), key="spectrum_window")
+        with col_overlap:
+            overlap = st.select_slider("重叠", options=[0.0, 0.25, 0.5, 0.75], value=0.5, key="spectrum_overlap")
+        with col_fs:
+            # 不做小数位舍入: 采样间隔较长的慢速通道 (如每小时一次) 采样率远小于 0.001 Hz
+            fs = st.number_input("采样率 (Hz)", min_value=MIN_SAMPLE_RATE,
+                                 value=max(MIN_SAMPLE_RATE, estimate_sample_rate(head['Timestamp'])),
+                                 format="%.6g",
+                                 help="通道先线性插值到该采样率；默认取采样间隔中位数的倒数")
+
+        with st.spinner("正在计算频谱..."):
+            spectrum = compute_spectrum(chunked, chunked.fingerprint, key, time_window,
+                                        fs, nperseg, overlap, window)
+        if spectrum is None:
+            st.info(f"所选时间窗口内的样本不足一个分段 ({nperseg} 点)，请缩短分段或扩大时间窗口")
+            return
+
+        st.caption(f"采样率 {fs:g} Hz · 频率分辨率 {fs / nperseg:.4g} Hz · "
+                   f"{spectrum.segments} 段 · 主频 {spectrum.peak_frequency():.4g} Hz")
+        render_echarts_psd(spectrum, key)
+        render_echarts_spectrogram(spectrum, key)
+
+def get_window_frame(chunked, fingerprint, time_window):
+    """
+    时间窗口数据 (按数据指纹与窗口放入共享缓存，片段重跑时不再重新拼接分块)
+    拼接结果计入共享缓存的内存上限，换窗口后旧窗口不再被引用即可淘汰
+    """
+    return shared(("window", fingerprint, tuple(time_window)), lambda: chunked.query(*time_window),
+                  frame_nbytes, f"时间窗口 {fingerprint[:8]}")
+
+def get_trend_frame(chunked, fingerprint, time_window, keys):
+    """趋势图使用的数据 (超出负载预算时已降采样，放入共享缓存)，返回 (df, 降级说明)"""
+    def build():
+        df = get_window_frame(chunked, fingerprint, time_window)
+        dense = [k for k in keys if k not in chunked.steps]
+        return guard_chart_frame(df[['Timestamp', *dense]], dense, "趋势图")
+
+    return shared(("trend", fingerprint, tuple(time_window), tuple(keys)), build,
+                  lambda r: frame_nbytes(r[0]), f"趋势图数据 {fingerprint[:8]}")
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_trend_option(_chunked, fingerprint, time_window, keys, mark_areas):
+    """
+    趋势图配置 (不含快照标记线)
+    只在数据、窗口、参数或异常区间变化时重建；滑块拖动不会重发，只发送标记线增量
+    """
+    df, _ = get_trend_frame(_chunked, fingerprint, time_window, keys)
+    steps = {k: _chunked.step_window(k, *time_window) for k in keys if k in _chunked.steps}
+    return build_echarts_line_option(df, 'Timestamp', list(keys), title="多参数趋势分析",
+                                     mark_areas={k: list(v) for k, v in mark_areas}, chart_id=TREND_CHART_ID,
+                                     steps=steps, time_labels='Time' in _chunked.columns)
+
+def render_step_report(chunked, payload_rows):
+    """阶跃通道 (游程编码) 的逐列内存与趋势图负载节省"""
+    with st.expander(f"🪜 阶跃通道 ({len(chunked.steps)} 列，游程编码)", expanded=False):
+        st.caption("这些通道只保存变化点；趋势图以阶梯线绘制，只发送变化点，快照按游程二分查找")
+        st.dataframe(chunked.step_report(payload_rows=payload_rows), use_container_width=True, hide_index=True)
+
+def render_single_dashboard(chunked, keys, time_window, raw_log=None):
+    """
+    raw_log: 可选 (可 seek 的原始文件对象, LineIndex, SearchIndex 或 None)
+    提供时显示原始日志查看器 (点击趋势图跳转、全文查找) 与按参数过滤行
+    """
     st.markdown("### 📋 单日志文件分析")
+
+    # 只取与时间窗口重叠的数据块
+    t_start, t_end = time_window
+    df = get_window_frame(chunked, chunked.fingerprint, time_window)
+    if df.empty:
+        st.warning("所选时间窗口内没有数据")
+        return
     
     # 统计信息 - 使用模板组件
     with st.expander("📊 数据统计概览", expanded=False):
-        stats = parser.get_statistics(df)
+        stats = chunked.get_statistics(t_start, t_end, keys)
         for key in keys:
             if key in stats:
                 render_statistics_card(key, stats[key])
-    
+
+    if chunked.steps:
+        render_step_report(chunked, len(get_trend_frame(chunked, chunked.fingerprint, time_window, tuple(keys))[0]))
+
+    mark_areas = render_anomaly_panel(chunked, keys, time_window)
+    for col, areas in render_alarm_panel(chunked, keys, time_window).items():
+        mark_areas[col] = mark_areas.get(col, []) + areas
+
+    # 以下各部分为独立片段: 片段内的交互只重跑该片段，不再重跑解析/统计/其他图表
+    render_snapshot_fragment(chunked, keys, time_window)
+
+    # ECharts 全局趋势图: 只在整页重跑时发送，快照片段只发送标记线增量
+    st.markdown("### 📊 交互式趋势图")
+    render_chart_hint()
+    trend_df, notes = get_trend_frame(chunked, chunked.fingerprint, time_window, tuple(keys))
+    report_degradation(notes)
+    option = get_trend_option(
+        chunked, chunked.fingerprint, time_window, tuple(keys),
+        tuple(sorted((k, tuple(v)) for k, v in mark_areas.items()))
+    )
+    snapshot_index = snapshot_position(trend_df, chunked.nearest_row(st.session_state['snapshot_time'])['Timestamp'])
+    events = chart_events({"click": TREND_CLICK_EVENT} if raw_log is not None else None)
+    event = st_echarts(options=with_mark_line(option, snapshot_index), height="500px", theme="light",
+                       events=events, key="trend_chart")
+
+    if raw_log is not None:
+        fileobj, line_index, search_index = raw_log
+        handle_trend_click(event, trend_df, line_index)
+        render_raw_log_viewer(fileobj, line_index, search_index)
+        if search_index is not None:
+            render_key_rows_view(chunked, keys, search_index)
+
+    render_correlation_panel(chunked, keys, time_window)
+    render_spectrum_panel(chunked, keys, time_window)
+    render_exploration_fragment(chunked, time_window)
+
+# 查找结果 / 参数候选列表最多显示的条目数
+SEARCH_LIMIT = 50
+
+# 参数数量超过此值时，参数选择改为 "搜索 + 多选"
+KEY_SEARCH_MIN = 30
+
+# 按参数过滤行时最多显示的行数
+ROW_VIEW_LIMIT = 5000
+
+# 趋势图点击: 返回数据点序号 (附带时间，连续点击同一点也视为新事件)
+# 返回被点击点的类目下标: 阶跃通道的数据为稀疏的 [类目下标, 值] (见 _step_points)，
+# 其 dataIndex 是变化点的序号而不是趋势图的行号
+TREND_CLICK_EVENT = ("function(params) { return {index: Array.isArray(params.value) ? params.value[0] "
+                     ": params.dataIndex, at: Date.now()}; }")
+
+RAW_LOG_KEY = "raw_log"
+
+def chart_event(result):
+    """st_echarts 的事件返回值 (0.4 直接返回处理函数的结果，0.7+ 放在 chart_event 字段)"""
+    if result is None:
+        return None
+    if hasattr(result, "get") and "chart_event" in result:
+        return result.get("chart_event")
+    return result
+
+def jump_to_line(line, key=RAW_LOG_KEY):
+    """原始日志查看器翻到 line (从 0 开始) 所在位置，并高亮该行"""
+    st.session_state[f"{key}_target"] = line + 1
+    st.session_state[f"{key}_first"] = max(line + 1 - 5, 1)
+
+def handle_trend_click(event, trend_df, line_index):
+    """点击趋势图上的点 → 跳转到该时刻对应的原始日志行 (event 中的 index 为类目下标，即趋势图数据的行号)"""
+    click = chart_event(event)
+    if not click or click == st.session_state.get("trend_click"):
+        return
+    st.session_state["trend_click"] = click
+    index = min(max(int(click.get("index", 0)), 0), len(trend_df) - 1)
+    line = line_index.line_for_time(float(trend_df['Timestamp'].iloc[index]))
+    if line is not None:
+        jump_to_line(line)
+
+def _shift_page(key, delta, total):
+    first = st.session_state.get(f"{key}_first", 1)
+    st.session_state[f"{key}_first"] = min(max(first + delta, 1), max(total, 1))
+
+def _jump_to_first(search_index, word, fileobj, line_index, key):
+    line = search_index.first_line(word, fileobj, line_index)
+    if line is not None:
+        jump_to_line(line, key)
+
+def render_log_search(fileobj, line_index, search_index, key=RAW_LOG_KEY):
+    """原始日志全文查找: 词项倒排索引给出候选行块，只读取这些块确认行号"""
+    col_query, col_mode = st.columns([3, 1])
+    with col_query:
+        query = st.text_input("🔎 查找词项", key=f"{key}_query", placeholder="参数名、错误码、任意单词…")
+    with col_mode:
+        mode = st.radio("匹配方式", ("prefix", "substring"), key=f"{key}_query_mode", horizontal=True,
+                        format_func=lambda m: "前缀" if m == "prefix" else "包含")
+    if not query:
+        return
+
+    words = search_index.tokens.lookup(query, mode, limit=SEARCH_LIMIT)
+    if not words:
+        st.caption(f"未找到包含 “{query}” 的词项")
+        return
+
+    col_word, col_jump = st.columns([3, 1])
+    with col_word:
+        word = st.selectbox(f"匹配词项 (前 {SEARCH_LIMIT} 个)", words, key=f"{key}_word",
+                            format_func=lambda w: f"{w} ({len(search_index.token_blocks[w])} 个行块)")
+    with col_jump:
+        st.button("⤵️ 跳到首次出现", key=f"{key}_jump", on_click=_jump_to_first,
+                  args=(search_index, word, fileobj, line_index, key), use_container_width=True)
+
+    with st.expander("匹配行", expanded=False):
+        found = search_index.find_lines(word, fileobj, line_index, limit=SEARCH_LIMIT)
+        width = len(str(found[-1] + 1)) if found else 1
+        st.code("\n".join(
+            f"{n + 1:>{width}} │ {line_index.read_lines(fileobj, n, 1)[0].rstrip(chr(13))}" for n in found
+        ), language=None)
+        st.caption(f"显示前 {len(found)} 处匹配")
+
+@st.fragment
+def render_raw_log_viewer(fileobj, line_index, search_index=None, key=RAW_LOG_KEY):
+    """
+    原始日志分页查看 (片段)
+    按行偏移索引只读取当前页的字节范围，翻页只重跑本片段
+    """
+    st.markdown("### 📄 原始日志")
+    total = line_index.line_count
+    if total == 0:
+        st.info("日志为空")
+        return
+
+    if search_index is not None:
+        render_log_search(fileobj, line_index, search_index, key)
+
+    page_key = f"{key}_page_size"
+    first_key = f"{key}_first"
+    st.session_state.setdefault(first_key, 1)
+    page_size = st.session_state.get(page_key, 200)
+
+    col_prev, col_first, col_size, col_next = st.columns([1, 2, 2, 1])
+    with col_prev:
+        st.button("⬅️ 上一页", key=f"{key}_prev", on_click=_shift_page, args=(key, -page_size, total),
+                  use_container_width=True)
+    with col_first:
+        first = st.number_input("起始行", min_value=1, max_value=total, step=page_size, key=first_key)
+    with col_size:
+        st.selectbox("每页行数", (100, 200, 500, 1000), index=1, key=page_key)
+    with col_next:
+        st.button("下一页 ➡️", key=f"{key}_next", on_click=_shift_page, args=(key, page_size, total),
+                  use_container_width=True)
+
+    lines = line_index.read_lines(fileobj, first - 1, page_size)
+    target = st.session_state.get(f"{key}_target")
+    width = len(str(first + len(lines)))
+    text = "\n".join(
+        f"{'▶' if n == target else ' '}{n:>{width}} │ {line.rstrip(chr(13))}"
+        for n, line in enumerate(lines, start=first)
+    )
+    st.code(text, language=None)
+    st.caption(f"第 {first}–{first + len(lines) - 1} 行 / 共 {total} 行 · "
+               f"行偏移索引 {line_index.nbytes / 1024 / 1024:.1f} MB · 点击趋势图上的点可跳转到对应日志行")
+
+@st.fragment
+def render_key_rows_view(chunked, keys, search_index):
+    """只看某个参数实际写入 (未经前向填充) 的行: 行号来自参数倒排索引，不扫描数据"""
+    with st.expander("🔍 按参数过滤行", expanded=False):
+        if search_index.rows != int(chunked.chunk_rows.sum()):
+            st.info("数据已按内存预算降采样，行号与原始解析结果不再对应，无法按参数过滤行")
+            return
+        key = st.selectbox("参数", keys, key="key_rows_param")
+        count = search_index.key_count(key)
+        rows = search_index.key_rows(key, limit=ROW_VIEW_LIMIT)
+        st.caption(f"{key} 在 {count} / {search_index.rows} 行中出现"
+                   + (f"，显示前 {ROW_VIEW_LIMIT} 行" if count > ROW_VIEW_LIMIT else ""))
+        time_cols = [c for c in TIME_COLUMNS if c in chunked.columns]
+        st.dataframe(chunked.take(rows, [*time_cols, key]), use_container_width=True, height=320)
+
+def render_key_picker(label, keys, default_count, search_index=None, key="keys"):
+    """
+    参数选择: 参数不多时为普通多选；参数很多时先按前缀/包含搜索，只把匹配项放进多选列表
+    有倒排索引时查找走索引，否则在参数列表上过滤
+    """
+    if len(keys) <= KEY_SEARCH_MIN:
+        return st.sidebar.multiselect(label, keys, default=keys[:min(default_count, len(keys))], key=key)
+
+    query = st.sidebar.text_input(f"🔎 搜索参数 (共 {len(keys)} 个)", key=f"{key}_query")
+    mode = st.sidebar.radio("匹配方式", ("prefix", "substring"), key=f"{key}_mode", horizontal=True,
+                            format_func=lambda m: "前缀" if m == "prefix" else "包含",
+                            label_visibility="collapsed")
+    if not query:
+        matches = keys[:SEARCH_LIMIT]
+    elif search_index is not None and len(search_index.keys):
+        matches = search_index.keys.lookup(query, mode, limit=SEARCH_LIMIT)
+    else:
+        q = query.lower()
+        test = (lambda k: k.lower().startswith(q)) if mode == "prefix" else (lambda k: q in k.lower())
+        matches = [k for k in keys if test(k)][:SEARCH_LIMIT]
+
+    # 已选中的参数始终保留在选项中，换搜索词不会丢失选择
+    selected = st.session_state.get(key, keys[:min(default_count, len(keys))])
+    options = list(dict.fromkeys([*selected, *matches]))
+    if key not in st.session_state:
+        st.session_state[key] = selected
+    return st.sidebar.multiselect(label, options, key=key,
+                                  help=f"当前搜索匹配 {len(matches)} 个参数 (最多显示 {SEARCH_LIMIT} 个)")
+
+_EPOCH = datetime(1970, 1, 1)
+
+def time_slider(label, min_time, max_time, key, as_datetime=False, step=None, on_change=None):
+    """
+    时间滑块，session_state[key] 始终为 Unix 秒 (float，异常跳转表等可直接改写)
+    as_datetime: 数据带日期时间 (Time 列) 时显示为日期时间滑块 (键为 key + "_dt")，拖动后换算回秒
+    """
+    if not as_datetime:
+        return st.slider(label, min_time, max_time, step=step, key=key, on_change=on_change)
+
+    dt_key = f"{key}_dt"
+    if key not in st.session_state:
+        st.session_state[key] = min_time
+    current = st.session_state[key]
+    shown = st.session_state.get(dt_key)
+    # 秒值被外部改写 (或首次显示) 时同步到日期时间滑块；微秒级舍入误差不算改写
+    if shown is None or abs((shown - _EPOCH).total_seconds() - current) > 1e-6:
+        st.session_state[dt_key] = _EPOCH + timedelta(seconds=current)
+
+    def sync():
+        st.session_state[key] = (st.session_state[dt_key] - _EPOCH).total_seconds()
+        if on_change is not None:
+            on_change()
+
+    st.slider(label, _EPOCH + timedelta(seconds=min_time), _EPOCH + timedelta(seconds=max_time),
+              step=timedelta(microseconds=max(1, round((step or 1e-3) * 1e6))), key=dt_key, on_change=sync,
+              format="YYYY-MM-DD HH:mm:ss.SSS")
+    return st.session_state[key]
+
+def snapshot_position(df, timestamp):
+    """
+    快照时间在趋势图数据中的行号 (趋势图为类目轴，标记线按索引定位)
+    降采样后的数据以桶起点为时间戳，取不晚于快照时间的最后一行即所在的桶
+    """
+    return max(int(np.searchsorted(df['Timestamp'].to_numpy(), timestamp, side='right')) - 1, 0)
+
+@st.fragment
+def render_snapshot_fragment(chunked, keys, time_window):
+    """快照定位片段: 滑块 + 指标 + 趋势图标记线增量"""
     # 1. 顶部控制器与快照 (保持 Streamlit 原生控件用于精确看数)
-    times_sorted = np.sort(df['Timestamp'].unique())
-    min_time, max_time = float(times_sorted[0]), float(times_sorted[-1])
-    diffs = np.diff(times_sorted)
-    step = max(float(np.min(diffs[diffs > 0])) if len(diffs) > 0 else 0.1, 1e-3)
+    df = get_window_frame(chunked, chunked.fingerprint, time_window)
+    min_time, max_time = float(df['Timestamp'].iloc[0]), float(df['Timestamp'].iloc[-1])
+    step = chunked.min_step
     
+    # 快照时间放在 session_state 中，异常跳转表可直接改写
+    if not min_time <= st.session_state.get('snapshot_time', min_time) <= max_time:
+        st.session_state['snapshot_time'] = min_time
+
     col_ctrl, col_info = st.columns([2, 1])
     with col_ctrl:
-        current_time = st.slider("⏱️ 数据快照定位", min_time, max_time, min_time, step=step)
+        current_time = time_slider("⏱️ 数据快照定位", min_time, max_time, "snapshot_time",
+                                   as_datetime='Time' in chunked.columns, step=step, on_change=_mark_moved)
     
-    nearest_idx = (df['Timestamp'] - current_time).abs().idxmin()
-    row = df.loc[nearest_idx]
+    row = chunked.nearest_row(current_time)
     real_time = row['Timestamp']
 
     with col_info:
-        st.info(f"当前锁定时间: {real_time:.4f}")
+        if 'Time' in row.index:
+            st.info(f"当前锁定时间: {row['Time']}")
+        else:
+            st.info(f"当前锁定时间: {real_time:.4f}")
 
     cols = st.columns(min(len(keys), 5))
     for i, key in enumerate(keys):
         with cols[i % len(cols)]:
             st.metric(label=key, value=f"{row[key]:.4f}")
 
+    # 趋势图已在浏览器中，只移动标记线并高亮当前点
+    trend_df, _ = get_trend_frame(chunked, chunked.fingerprint, time_window, tuple(keys))
+    index = snapshot_position(trend_df, real_time)
+    send_mark_line([{"chart": TREND_CHART_ID, "markLine": index, "highlight": index}])
+
     st.markdown("---")
 
-    # 2. ECharts 全局趋势图
-    st.markdown("### 📊 交互式趋势图")
-    render_chart_hint()
-    
-    # 调用 ECharts 渲染函数
-    render_echarts_line(df, 'Timestamp', keys, title="多参数趋势分析", mark_line_val=real_time)
-    
+@st.fragment
+def render_exploration_fragment(chunked, time_window):
+    """自助数据探索片段: 轴/图表类型切换只重跑本片段"""
+    df = get_window_frame(chunked, chunked.fingerprint, time_window)
+
     # ==========================================
     # 3. 新增: 🛠️ 自助数据探索模块
     # ==========================================
@@ -353,13 +1515,39 @@ def render_single_dashboard(df, keys, parser):
     
     # 玻璃态容器
     st.markdown('<div class="glass-container">', unsafe_allow_html=True)
+
+    # 时间分桶: 大数据量时柱状图/热力图/雷达图基于有界的聚合数据绘制
+    bucket_options = ["raw"] + list(BUCKET_SIZES.keys())
+    suggested = suggest_bucket(df, MAX_EXPLORE_BUCKETS)
+    col_bucket, col_agg = st.columns([1, 1])
+    with col_bucket:
+        bucket = st.selectbox(
+            "⏳ 时间分桶",
+            options=bucket_options,
+            index=bucket_options.index(suggested) if suggested else 0,
+            format_func=lambda b: "原始数据" if b == "raw" else b,
+            help=f"数据行数超过 {MAX_EXPLORE_BUCKETS} 时自动推荐分桶大小"
+        )
+    with col_agg:
+        how = st.selectbox(
+            "🔸 聚合方式",
+            options=list(AGGREGATIONS.keys()),
+            format_func=lambda a: AGGREGATIONS[a],
+            disabled=bucket == "raw"
+        )
+
+    if bucket == "raw":
+        df_explore = df
+    else:
+        df_explore = resample_window(chunked, chunked.fingerprint, time_window, bucket, how)
+        st.caption(f"已聚合: {len(df)} 行 → {len(df_explore)} 个 {bucket} 时间桶 ({AGGREGATIONS[how]})")
     
     col1, col2, col3 = st.columns([1, 1, 1])
     
     with col1:
         # 选择 X 轴 (维度)
         # 推荐非纯数值列作为 X 轴
-        all_cols = df.columns.tolist()
+        all_cols = df_explore.columns.tolist()
         x_axis = st.selectbox(
             "🔹 选择维度 (X轴)", 
             options=all_cols,
@@ -370,7 +1558,7 @@ def render_single_dashboard(df, keys, parser):
     with col2:
         # 选择 Y 轴 (指标) - 支持多选
         # 过滤出数值列作为推荐
-        numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and c != x_axis]
+        numeric_cols = [c for c in df_explore.columns if pd.api.types.is_numeric_dtype(df_explore[c]) and c != x_axis]
         default_y = numeric_cols[:min(2, len(numeric_cols))] if numeric_cols else []
         
         y_axis = st.multiselect(
@@ -384,7 +1572,7 @@ def render_single_dashboard(df, keys, parser):
         # 核心逻辑: 动态更新图表选项
         if x_axis and y_axis:
             # 调用规则引擎获取可用图表
-            valid_charts = ChartRuleEngine.get_valid_charts(df, x_axis, y_axis)
+            valid_charts = ChartRuleEngine.get_valid_charts(df_explore, x_axis, y_axis)
             
             if valid_charts:
                 # 构建显示用的标签 (Icon + Name)
@@ -418,7 +1606,7 @@ def render_single_dashboard(df, keys, parser):
         with col_title:
             st.subheader(f"{chart_info['icon']} {chart_info['name']}")
         with col_reason:
-            reason = ChartRuleEngine.get_recommendation_reason(df, x_axis, y_axis, selected_chart_key)
+            reason = ChartRuleEngine.get_recommendation_reason(df_explore, x_axis, y_axis, selected_chart_key)
             st.markdown(f'<div class="chart-recommendation">💡 {reason}</div>', unsafe_allow_html=True)
         
         # 显示图表描述
@@ -431,7 +1619,7 @@ def render_single_dashboard(df, keys, parser):
             
             ChartFactory.render(
                 chart_type=selected_chart_key,
-                df=df,
+                df=df_explore,
                 x_col=x_axis,
                 y_cols=y_axis,
                 height="500px",
@@ -445,9 +1633,9 @@ def render_single_dashboard(df, keys, parser):
                 **当前分析**: {', '.join(y_axis)} vs {x_axis}
                 
                 **数据特征**:
-                - X轴类型: {ChartRuleEngine.detect_col_type(df, x_axis)}
+                - X轴类型: {ChartRuleEngine.detect_col_type(df_explore, x_axis)}
                 - Y轴数量: {len(y_axis)}
-                - 数据点数: {len(df)}
+                - 数据点数: {len(df_explore)}
                 
                 **建议**:
                 - 可尝试切换不同的图表类型观察数据
@@ -462,11 +1650,43 @@ def render_single_dashboard(df, keys, parser):
             st.error(f"图表渲染失败: {str(e)}")
             st.code(f"错误详情:\n{e}", language="python")
 
+# ==========================================
+# 数据导出
+# ==========================================
+@st.fragment
+def render_export_panel(chunked, all_keys, time_window):
+    """
+    导出面板: 格式 / 列子集 / 时间窗口
+    文件只在点击下载时按块生成，平时重跑不产生任何导出开销
+    """
+    with st.expander("📥 数据导出", expanded=False):
+        fmt = st.selectbox("导出格式", available_formats(),
+                           format_func=lambda f: EXPORT_FORMATS[f]["name"], key="export_format")
+        columns = st.multiselect("导出列", all_keys, default=all_keys, key="export_columns",
+                                 help="Timestamp 列总是导出")
+        window_only = st.checkbox("仅导出当前分析时间窗口", value=False, key="export_window_only")
+
+        t_start, t_end = time_window if window_only else chunked.time_range
+        selected = columns or all_keys
+
+        def build_export():
+            return export_stream(chunked.iter_chunks(t_start, t_end, selected), fmt,
+                                 empty=chunked.empty_frame(selected))
+
+        st.download_button(
+            f"📥 导出 {EXPORT_FORMATS[fmt]['name']}",
+            data=build_export,
+            file_name=f"log_data{EXPORT_FORMATS[fmt]['suffix']}",
+            mime=EXPORT_FORMATS[fmt]["mime"],
+            on_click="ignore",
+            use_container_width=True
+        )
+
 # ==========================================
 # 主程序入口
 # ==========================================
 def main():
-    parser = LogParser()
+    st.set_page_config(**PAGE_CONFIG)
     
     st.sidebar.title("⚙️ 控制面板")
     
@@ -496,15 +1716,55 @@ def main():
     apply_modern_theme()
     load_custom_scripts()
     render_header()
+
+    # 内存预算降级横幅: 占位在页面顶部，本次运行结束时填充
+    st.session_state['degradations'] = []
+    banner = st.empty()
     
-    analysis_mode = st.sidebar.radio("📌 分析模式", ("单文件分析", "日志对比"), index=0)
+    analysis_mode = st.sidebar.radio("📌 分析模式", ("单文件分析", "日志对比", "多日志对比"), index=0)
     st.sidebar.markdown("---")
     
     st.sidebar.markdown("### 📁 数据导入")
-    file_main = st.sidebar.file_uploader("主日志文件", type=["txt", "log"], key="f1")
+    data_source = "上传文件"
+    if analysis_mode != "多日志对比":
+        data_source = st.sidebar.radio("数据来源", ("上传文件", "多文件合并", "历史库"), horizontal=True, key="data_source")
+    grammar = "auto"
+    if data_source != "历史库":
+        grammar = st.sidebar.selectbox(
+            "日志格式", ["auto", *GRAMMARS], key="log_grammar",
+            format_func=lambda g: "🔎 自动识别" if g == "auto" else GRAMMARS[g].label,
+            help="自动识别根据文件前 200 行选择匹配最完整的格式"
+        )
+
+    # 数据解析
+    df_main = pd.DataFrame()
+    df_ref = pd.DataFrame()
+    fingerprint_main = None
+    fingerprint_ref = None
+
+    file_main = None
     file_ref = None
-    if analysis_mode == "日志对比":
-        file_ref = st.sidebar.file_uploader("参考日志文件", type=["txt", "log"], key="f2")
+    merge_files = []
+    if data_source == "历史库":
+        # 直接按参数/时间范围查询已入库的运行
+        df_main, fingerprint_main = select_stored_run("主日志运行", "store_main")
+        if analysis_mode == "日志对比":
+            df_ref, fingerprint_ref = select_stored_run("参考日志运行", "store_ref")
+    else:
+        if data_source == "多文件合并":
+            # 同一次运行按子系统拆分的多个文件，按时间戳合并为主日志，参数名加文件名前缀
+            merge_files = st.sidebar.file_uploader(
+                "主日志文件 (按子系统拆分，可多选)", type=["txt", "log"], key="f1_merge", accept_multiple_files=True
+            ) or []
+        else:
+            file_main = st.sidebar.file_uploader("主日志文件", type=["txt", "log"], key="f1")
+        if analysis_mode == "日志对比":
+            file_ref = st.sidebar.file_uploader("参考日志文件", type=["txt", "log"], key="f2")
+    ref_files = []
+    if analysis_mode == "多日志对比":
+        ref_files = st.sidebar.file_uploader(
+            "历史日志文件 (可多选)", type=["txt", "log"], key="f_hist", accept_multiple_files=True
+        ) or []
     
     # 帮助信息
     st.sidebar.markdown("---")
@@ -513,40 +1773,111 @@ def main():
     
     with st.sidebar.expander("ℹ️ 关于"):
         st.markdown(render_about_info())
+    if st.query_params.get("admin"):
+        render_cache_admin()
     
-    # 数据解析
-    df_main = pd.DataFrame()
-    df_ref = pd.DataFrame()
-
+    # 上传文件在后台线程中解析: 主/参考日志同时提交，并发解析
+    parse_jobs = []
+    name_main = None
+    raw_log = None
+    projected_keys = None   # 按需解析时在解析前选定的参数
     if file_main:
-        content_main = file_main.getvalue().decode("utf-8", errors='ignore')
-        df_main, _ = parser.parse(content_main)
+        raw_main = file_main.getvalue()
+        name_main = file_main.name
+        projected = analysis_mode == "单文件分析" and st.sidebar.checkbox(
+            "⚡ 按需解析", value=len(raw_main) >= PROJECTION_MIN_BYTES,
+            help="先快速列出参数名，只解析选中的参数 (大文件更快、更省内存)；换参数会重新解析"
+        )
+        if projected:
+            projected_keys = select_projected_keys(raw_main, grammar)
+            if not projected_keys:
+                return
+            fingerprint_main = projection_fingerprint(raw_main, grammar, projected_keys)
+        else:
+            fingerprint_main = content_fingerprint(raw_main, grammar)
+        parse_jobs.append(("主日志", get_parse_jobs().submit(raw_main, fingerprint_main, grammar, projected_keys)))
+    elif merge_files:
+        raws = [(f.name, f.getvalue()) for f in merge_files]
+        name_main = " + ".join(name for name, _ in raws)
+        fingerprint_main = merge_fingerprint(raws, grammar)
+        parse_jobs.append(("主日志", get_parse_jobs().submit_merge(raws, fingerprint_main, grammar)))
+    if file_ref:
+        raw_ref = file_ref.getvalue()
+        fingerprint_ref = content_fingerprint(raw_ref, grammar)
+        parse_jobs.append(("参考日志", get_parse_jobs().submit(raw_ref, fingerprint_ref, grammar)))
+
+    if any(job.status in ("pending", "running") for _, job in parse_jobs):
+        render_parse_progress(parse_jobs)
+        return
+    if any(job.status != "done" for _, job in parse_jobs):
+        render_parse_issues(parse_jobs)
+        return
+
+    if name_main:
+        job = parse_jobs[0][1]
+        df_main, _, notes = load_log(job, fingerprint_main, job.partial_result, "主日志")
+        report_degradation(notes)
         if not df_main.empty:
-            st.sidebar.success(f"✅ 主日志: {len(df_main)} 行")
+            st.sidebar.success(f"✅ 主日志: {len(df_main)} 行" + (" (部分结果)" if job.partial_result else ""))
+            if isinstance(job, MergeJob):
+                for src in job.sources:
+                    order = "已有序，直接归并" if src.sorted else "乱序，已单独排序"
+                    st.sidebar.caption(f"{src.name} → `{src.prefix}_*` ({src.grammar.label}，{order})")
+            else:
+                st.sidebar.caption(f"日志格式: {job.detected.label}")
+                if job.line_index is not None:
+                    raw_log = (file_main, job.line_index, job.search_index)
+            if projected_keys is not None:
+                st.sidebar.caption("按需解析: 只含所选参数，不保存到历史库")
+            elif not job.partial_result:
+                render_store_save(df_main, name_main, fingerprint_main, "save_main", notes)
     
     if file_ref:
-        content_ref = file_ref.getvalue().decode("utf-8", errors='ignore')
-        df_ref, _ = parser.parse(content_ref)
+        job = parse_jobs[-1][1]
+        df_ref, _, notes = load_log(job, fingerprint_ref, job.partial_result, "参考日志")
+        report_degradation(notes)
+        if not df_ref.empty:
+            st.sidebar.info(f"✅ 参考日志: {len(df_ref)} 行" + (" (部分结果)" if job.partial_result else ""))
+            if not job.partial_result:
+                render_store_save(df_ref, file_ref.name, fingerprint_ref, "save_ref", notes)
+
+    # 派生通道: 追加到主/参考日志，之后与解析出的参数一样参与选择、绘图、对比和导出
+    derived_sources = []
+    derived_keys = []
+    if not df_main.empty:
+        derived_sources = render_derived_editor()
+        df_main, fingerprint_main, derived_keys = apply_derived(df_main, fingerprint_main, derived_sources, "主日志")
         if not df_ref.empty:
-            st.sidebar.info(f"✅ 参考日志: {len(df_ref)} 行")
+            df_ref, fingerprint_ref, _ = apply_derived(df_ref, fingerprint_ref, derived_sources, "参考日志")
 
     # 路由
     if df_main.empty:
         render_welcome_screen()
         return
 
-    all_keys = [c for c in df_main.columns if c != 'Timestamp']
+    all_keys = value_columns(df_main)
     
     if analysis_mode == "单文件分析":
         st.sidebar.markdown("---")
-        selected_keys = st.sidebar.multiselect("选择参数", all_keys, default=all_keys[:min(3, len(all_keys))])
+        if projected_keys is not None:
+            # 参数已在解析前选定 (发现的参数名可能在解析中被丢弃，例如数值无法转换)，另加派生通道
+            selected_keys = list(dict.fromkeys([*(k for k in projected_keys if k in all_keys), *derived_keys]))
+        else:
+            search_index = raw_log[2] if raw_log is not None else None
+            selected_keys = render_key_picker("选择参数", all_keys, 3, search_index, key="keys_main")
         if selected_keys:
-            render_single_dashboard(df_main, selected_keys, parser)
+            chunked = get_chunked_log(df_main, fingerprint_main)
+            t_lo, t_hi = chunked.time_range
+            time_window = (t_lo, t_hi)
+            if t_hi > t_lo:
+                time_window = st.sidebar.slider("🔍 分析时间窗口", t_lo, t_hi, (t_lo, t_hi),
+                                                help="统计、快照和图表只读取与窗口重叠的数据块")
+            render_single_dashboard(chunked, selected_keys, time_window, raw_log)
             
-            # CSV 导出
+            # 数据导出 (点击时才生成文件)
             st.sidebar.markdown("---")
-            csv = df_main.to_csv(index=False).encode('utf-8')
-            st.sidebar.download_button("📥 导出 CSV", csv, "log_data.csv", "text/csv")
+            with st.sidebar:
+                render_export_panel(chunked, all_keys, time_window)
 
     elif analysis_mode == "日志对比":
         if df_ref.empty:
@@ -557,9 +1888,29 @@ def main():
                 st.sidebar.markdown("---")
                 selected_keys = st.sidebar.multiselect("对比参数", common_keys, default=common_keys[:min(2, len(common_keys))])
                 if selected_keys:
+                    if st.sidebar.checkbox("🧲 自动对齐 (FFT 互相关)", value=False,
+                                           help="用互相关估计参考日志的时间偏移并自动平移"):
+                        offset, score = compute_alignment_offset(
+                            df_main, df_ref, fingerprint_main, fingerprint_ref, tuple(selected_keys)
+                        )
+                        df_ref = df_ref.assign(Timestamp=df_ref['Timestamp'] + offset)
+                        st.sidebar.info(f"参考日志偏移: {offset:+.4f} (相关度 {score:.3f})")
                     render_comparison_dashboard(df_main, df_ref, selected_keys)
             else:
                 st.error("无共同字段")
 
+    elif analysis_mode == "多日志对比":
+        if not ref_files:
+            st.warning("请上传至少一份历史日志")
+        else:
+            st.sidebar.info(f"✅ 历史日志: {len(ref_files)} 份")
+            st.sidebar.markdown("---")
+            selected_keys = render_key_picker("对比参数", all_keys, 2, key="keys_multi")
+            if selected_keys:
+                render_multi_run_dashboard(df_main, ref_files, selected_keys, grammar, derived_sources)
+
+    render_degradation_banner(banner, st.session_state['degradations'])
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with cache_leases():
+        main()
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+报警规则基准: 在大日志上一次检查大量阈值/变化率规则
+规则随机生成 (约 60% 阈值规则、40% 变化率规则，变化率窗口取自少数几个常用值)，
+分别记录整批检查与跟随模式 (按批增量检查) 的耗时，并校验两者确认的区间一致。
+
+用法:
+    python benchmarks/bench_alarms.py [--rows 1000000] [--cols 20] [--rules 100]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from common import make_frame, print_table, timeit
+
+from utils.alarm_rules import AlarmRuleEngine, alarm_report, evaluate_rules, parse_rules
+
+
+def make_rules(df, n_rules, dt, seed=0):
+    """按各通道的分布生成偶尔触发的规则文本"""
+    rng = np.random.default_rng(seed)
+    keys = list(df.columns[1:])
+    lines = []
+    for i in range(n_rules):
+        key = keys[i % len(keys)]
+        if rng.random() < 0.6:
+            op = rng.choice([">", "<"])
+            value = np.percentile(df[key], 99.5 if op == ">" else 0.5)
+            lines.append(f"r{i}: {key} {op} {value:.3f} for {rng.choice([0, 50, 200])}ms")
+        else:
+            # 随机游走在 k 行内的变化约为 sqrt(k) 个标准差，取 4 倍作为限值
+            direction = rng.choice(["drops", "rises", "changes"])
+            window = rng.choice([50, 100, 500])
+            amount = 4 * np.sqrt(window / 1000 / dt)
+            lines.append(f"r{i}: {key} {direction} {amount:.2f} within {window}ms")
+    rules, errors = parse_rules("\n".join(lines))
+    assert not errors, errors
+    return rules
+
+
+def follow(df, rules, batch):
+    engine = AlarmRuleEngine(rules)
+    for start in range(0, len(df), batch):
+        engine.update(df.iloc[start:start + batch])
+    return engine.intervals
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--rows", type=int, default=1_000_000)
+    arg_parser.add_argument("--cols", type=int, default=20)
+    arg_parser.add_argument("--rules", type=int, default=100)
+    arg_parser.add_argument("--batch", type=int, default=100_000, help="跟随模式每批追加的行数")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    df = make_frame(args.rows, args.cols, dt=0.001)
+    rules = make_rules(df, args.rules, dt=0.001)
+
+    batch_seconds, (intervals, _) = timeit(lambda: evaluate_rules(df, rules), args.repeat)
+    report_seconds, report = timeit(lambda: alarm_report(intervals, rules), args.repeat)
+    started = time.perf_counter()
+    followed = follow(df, rules, args.batch)
+    follow_seconds = time.perf_counter() - started
+
+    # 跟随模式不报告延续到最后一行的区间
+    confirmed = intervals[intervals['end'] < df['Timestamp'].iloc[-1]]
+    assert len(confirmed) == len(followed), "跟随模式与整批检查的区间数不一致"
+
+    print_table(
+        ["方式", "行数", "规则数", "耗时 (s)", "违规区间", "违规规则"],
+        [
+            ["整批检查", args.rows, len(rules), f"{batch_seconds:.2f}", len(intervals), int((~report['passed']).sum())],
+            ["汇总报告", "-", len(rules), f"{report_seconds:.3f}", "-", "-"],
+            [f"跟随模式 (每批 {args.batch} 行)", args.rows, len(rules), f"{follow_seconds:.2f}", len(followed), "-"],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+对比图分页基准: 一次渲染全部参数 vs 只渲染当前页
+
+对每个参数执行与 render_echarts_comparison_chart 相同的服务端工作
+(负载预算降采样 + 构建 ECharts 配置 + JSON 序列化)，记录:
+- 首图耗时 (服务端): 第一个图表的配置发出前的耗时
+- 整页耗时 (服务端): 本次运行全部图表配置发出的耗时
+- 图表实例数、发送到浏览器的负载字节数与序列数据点数
+
+脚本不启动浏览器: 浏览器中的首图时间与 JS 堆没有直接测量，以服务端耗时、负载字节数与
+各实例持有的序列数据点总数代替 (每个 ECharts 实例都持有自己的序列数据，点数与浏览器内存近似成正比)。
+
+用法:
+    python benchmarks/bench_compare_paging.py [--rows 100000] [--keys 8 24 48]
+"""
+
+import argparse
+import json
+import time
+
+from common import make_frame, print_table
+
+from app import COMPARE_PAGE_SIZES, build_echarts_comparison_option
+from utils.memory_guard import PAYLOAD_BUDGET, guard_chart_frame
+
+
+def render_charts(df_main, df_ref, keys, current_time):
+    """返回 (首图耗时, 总耗时, 负载字节数, 序列数据点数)"""
+    started = time.perf_counter()
+    first = None
+    payload = 0
+    points = 0
+    for key in keys:
+        df1, _ = guard_chart_frame(df_main[['Timestamp', key]], [key], key, PAYLOAD_BUDGET / 2)
+        df2, _ = guard_chart_frame(df_ref[['Timestamp', key]], [key], key, PAYLOAD_BUDGET / 2)
+        option = build_echarts_comparison_option(df1, df2, key, current_time)
+        payload += len(json.dumps(option).encode("utf-8"))
+        points += sum(len(series['data']) for series in option['series'])
+        if first is None:
+            first = time.perf_counter() - started
+    return first or 0.0, time.perf_counter() - started, payload, points
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--rows", type=int, default=100_000)
+    arg_parser.add_argument("--keys", type=int, nargs="+", default=[8, 24, 48])
+    arg_parser.add_argument("--page-size", type=int, default=COMPARE_PAGE_SIZES[1])
+    args = arg_parser.parse_args()
+
+    rows = []
+    for n_keys in args.keys:
+        df_main = make_frame(args.rows, n_keys, seed=0)
+        df_ref = make_frame(args.rows, n_keys, seed=1)
+        keys = list(df_main.columns[1:])
+        current_time = float(df_main['Timestamp'].iloc[len(df_main) // 2])
+
+        for name, shown in [("全部渲染", keys), (f"分页 (每页 {args.page_size})", keys[:args.page_size])]:
+            first, total, payload, points = render_charts(df_main, df_ref, shown, current_time)
+            rows.append([n_keys, name, f"{first * 1000:.0f}", f"{total * 1000:.0f}", len(shown),
+                         f"{payload / 1024 / 1024:.1f} MB", points])
+
+    print_table(["参数数", "方式", "服务端首图 (ms)", "服务端整页 (ms)", "图表实例", "负载", "序列数据点"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+投影 / 时间范围下推基准
+比较全量解析、只解析部分参数、只解析部分时间范围，以及仅发现参数名 (discover_keys) 的耗时，
+并校验下推结果与 "全量解析后再选列/过滤" 一致。
+
+用法:
+    python benchmarks/bench_pushdown.py [--rows 200000] [--cols 32] [--keys 3]
+"""
+
+import argparse
+
+import numpy as np
+
+from common import make_log_text, print_table, timeit
+
+from utils.log_parser import LogParser, value_columns
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--rows", type=int, default=200_000)
+    arg_parser.add_argument("--cols", type=int, default=32)
+    arg_parser.add_argument("--keys", type=int, default=3, help="投影保留的参数个数")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    content = make_log_text(args.rows, args.cols)
+    full_seconds, (full, _) = timeit(lambda: LogParser("neup").parse(content), args.repeat)
+    all_keys = value_columns(full)
+    keys = all_keys[:args.keys]
+    t_end = full['Timestamp'].iloc[-1]
+    t_range = (t_end * 0.45, t_end * 0.55)
+
+    cases = [
+        ("仅发现参数名", lambda: LogParser("neup").discover_keys(content)),
+        (f"投影 {len(keys)} 个参数", lambda: LogParser("neup", keys=keys).parse(content)),
+        ("时间范围 10%", lambda: LogParser("neup", t_range=t_range).parse(content)),
+        ("投影 + 时间范围", lambda: LogParser("neup", keys=keys, t_range=t_range).parse(content)),
+    ]
+    rows = [["全量解析", f"{full_seconds:.2f}", "1.0x", len(full), len(all_keys)]]
+    for name, func in cases:
+        seconds, result = timeit(func, args.repeat)
+        if isinstance(result, list):
+            assert result == all_keys, "discover_keys 与全量解析的参数不一致"
+            n_rows, n_keys = "-", len(result)
+        else:
+            df = result[0]
+            n_rows, n_keys = len(df), len(value_columns(df))
+            check_against(full, df)
+        rows.append([name, f"{seconds:.2f}", f"{full_seconds / seconds:.1f}x", n_rows, n_keys])
+
+    print_table(["方式", "耗时 (s)", "加速", "行数", "参数数"], rows)
+
+
+def check_against(full, df):
+    """下推结果应等于全量结果按相同时间范围/参数截取"""
+    ref = full[full['Timestamp'].isin(df['Timestamp'])][df.columns]
+    assert len(ref) == len(df), "下推解析的行数与全量结果不一致"
+    assert np.allclose(ref.to_numpy(), df.to_numpy()), "下推解析的数值与全量结果不一致"
+
+
+if __name__ == "__main__":
+    main()
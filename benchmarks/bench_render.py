@@ -0,0 +1,122 @@
+"""
+图表渲染端到端基准: ChartFactory 各渲染器与仪表盘图表在不同数据规模下的服务端开销
+
+对递增行数 / 列数的合成 DataFrame 调用 ChartFactory.render (7 种图表)、render_echarts_line
+与 render_echarts_comparison_chart，st_echarts 替换为只记录配置的桩函数 (不启动浏览器)，记录:
+- 构建耗时: 渲染函数从调用到配置交给 st_echarts 的耗时 (含降级)
+- 负载: 配置 JSON 序列化后的字节数 (即发送到浏览器的数据量)
+- 峰值内存: 渲染期间 Python 分配的峰值 (tracemalloc，单独一次运行测量，不计入耗时)
+
+结果可用 --out 保存为 JSON，下一版本用 --baseline 读入后逐项给出耗时与负载的变化倍数，
+便于在版本间对比渲染开销。
+
+用法:
+    python benchmarks/bench_render.py [--rows 1000 10000 100000] [--cols 2 8] [--charts line pie ...]
+                                      [--out render.json] [--baseline render.json]
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tracemalloc
+import types
+
+from common import make_frame, print_table, timeit
+
+
+# 在导入 app / charts 之前替换 streamlit_echarts: 桩函数只记录最后一次收到的配置
+captured = {}
+
+
+def st_echarts(options, **kwargs):
+    captured['option'] = options
+
+
+sys.modules['streamlit_echarts'] = types.ModuleType('streamlit_echarts')
+sys.modules['streamlit_echarts'].st_echarts = st_echarts
+
+from app import render_echarts_comparison_chart, render_echarts_line  # noqa: E402
+from charts.factory import ChartFactory  # noqa: E402
+
+# 脚本不在 Streamlit 运行时中，session_state 可用但每次访问都会告警
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+
+FACTORY_CHARTS = ["line", "bar", "scatter", "pie", "area", "radar", "heatmap"]
+DASHBOARD_CHARTS = ["trend", "compare"]
+
+
+def make_case(chart, df, df_ref):
+    """返回无参渲染函数"""
+    keys = list(df.columns[1:])
+    if chart == "trend":
+        return lambda: render_echarts_line(df, 'Timestamp', keys, mark_line_val=float(df['Timestamp'].iloc[-1]))
+    if chart == "compare":
+        current_time = float(df['Timestamp'].iloc[len(df) // 2])
+        return lambda: render_echarts_comparison_chart(df, df_ref, keys[0], current_time)
+    return lambda: ChartFactory.render(chart, df, 'Timestamp', keys)
+
+
+def measure(render, repeat):
+    """返回 (耗时, 负载字节数, 峰值内存字节数)"""
+    seconds, _ = timeit(render, repeat)
+    payload = len(json.dumps(captured.pop('option')).encode("utf-8"))
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    captured.clear()
+    return seconds, payload, peak
+
+
+def change(new, old):
+    return f"{new / old:.2f}x" if old else "-"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    arg_parser.add_argument("--cols", type=int, nargs="+", default=[2, 8])
+    arg_parser.add_argument("--charts", nargs="+", default=FACTORY_CHARTS + DASHBOARD_CHARTS,
+                            choices=FACTORY_CHARTS + DASHBOARD_CHARTS)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--out", help="结果保存为 JSON")
+    arg_parser.add_argument("--baseline", help="上一版本 --out 保存的 JSON，输出变化倍数")
+    args = arg_parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {(r['chart'], r['rows'], r['cols']): r for r in json.load(f)}
+
+    results = []
+    for n_rows in args.rows:
+        for n_cols in args.cols:
+            df = make_frame(n_rows, n_cols, seed=0)
+            df_ref = make_frame(n_rows, n_cols, seed=1)
+            for chart in args.charts:
+                seconds, payload, peak = measure(make_case(chart, df, df_ref), args.repeat)
+                results.append({'chart': chart, 'rows': n_rows, 'cols': n_cols,
+                                'ms': seconds * 1000, 'payload': payload, 'peak': peak})
+
+    headers = ["图表", "行数", "列数", "构建 (ms)", "负载 (KB)", "峰值内存 (MB)"]
+    if baseline:
+        headers += ["耗时变化", "负载变化"]
+    rows = []
+    for r in results:
+        row = [r['chart'], r['rows'], r['cols'], f"{r['ms']:.1f}", f"{r['payload'] / 1024:.0f}",
+               f"{r['peak'] / 1024 / 1024:.1f}"]
+        if baseline:
+            old = baseline.get((r['chart'], r['rows'], r['cols']))
+            row += [change(r['ms'], old['ms']), change(r['payload'], old['payload'])] if old else ["-", "-"]
+        rows.append(row)
+    print_table(headers, rows)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+阶跃通道游程编码基准
+在随机游走通道之外加入若干很少变化的 "模式" 通道，比较整列存储 (rle=False) 与游程编码:
+- 分块索引内存
+- 快照定位 (nearest_row) 与全程统计耗时
+- 趋势图负载 (阶跃通道整列绘制 vs 只发送变化点)
+
+用法:
+    python benchmarks/bench_rle.py [--rows 300000] [--cols 8] [--steps 8]
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from common import make_frame, print_table, timeit
+
+from app import build_echarts_line_option
+from utils.chunk_index import ChunkedLog
+
+
+def add_step_columns(df, n_steps, seed=0):
+    """追加 n_steps 个阶跃通道: 每列约 200 次变化，变化点随机"""
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    for i in range(n_steps):
+        marks = np.zeros(n, dtype=int)
+        marks[rng.choice(n, size=200, replace=False)] = 1
+        df[f"mode{i}"] = rng.integers(0, 5, size=201)[np.cumsum(marks)].astype(float)
+    return df
+
+
+def payload_bytes(chunked, keys):
+    t_start, t_end = chunked.time_range
+    df = chunked.query(t_start, t_end)
+    dense = [k for k in keys if k not in chunked.steps]
+    steps = {k: chunked.step_window(k, t_start, t_end) for k in keys if k in chunked.steps}
+    option = build_echarts_line_option(df[['Timestamp', *dense]], 'Timestamp', keys, steps=steps)
+    return len(json.dumps(option).encode("utf-8"))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--rows", type=int, default=300_000)
+    arg_parser.add_argument("--cols", type=int, default=8, help="随机游走通道数")
+    arg_parser.add_argument("--steps", type=int, default=8, help="阶跃通道数")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    df = add_step_columns(make_frame(args.rows, args.cols), args.steps)
+    keys = list(df.columns[1:])
+    step_keys = [k for k in keys if k.startswith("mode")]
+    t_start, t_end = float(df['Timestamp'].iloc[0]), float(df['Timestamp'].iloc[-1])
+    probes = np.linspace(t_start, t_end, 200)
+
+    rows = []
+    results = {}
+    for name, rle in [("整列存储", False), ("游程编码", True)]:
+        build_seconds, chunked = timeit(lambda: ChunkedLog.from_dataframe(df, rle=rle), args.repeat)
+        snapshot_seconds, _ = timeit(lambda: [chunked.nearest_row(t) for t in probes], args.repeat)
+        stats_seconds, stats = timeit(lambda: chunked.get_statistics(t_start, t_end, keys), args.repeat)
+        results[name] = stats
+        rows.append([name, len(chunked.steps), f"{build_seconds * 1000:.0f}",
+                     f"{chunked.nbytes / 1024 / 1024:.1f} MB",
+                     f"{snapshot_seconds / len(probes) * 1e6:.0f}", f"{stats_seconds * 1000:.1f}",
+                     f"{payload_bytes(chunked, step_keys) / 1024:.0f} KB"])
+
+    for key in keys:
+        dense, encoded = results["整列存储"][key], results["游程编码"][key]
+        assert all(np.isclose(dense[s], encoded[s]) for s in dense), f"{key} 统计结果不一致"
+
+    print_table(["方式", "阶跃通道", "建索引 (ms)", "索引内存", "快照 (µs/次)", "全程统计 (ms)",
+                 "阶跃通道趋势图负载"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+快照滑块延迟对比
+
+拖动 "⏱️ 数据快照定位" 时服务端需要执行的工作:
+- 整页重跑 (改造前): 解码 + 解析 + get_statistics + 重建完整趋势图配置 + 最近行全表扫描
+- 片段重跑 (改造后): 分块二分查找最近行 + 只发送标记线增量 (趋势图留在浏览器中)
+
+同时统计每次交互发送到浏览器的负载字节数。
+
+用法:
+    python benchmarks/bench_slider_latency.py [--sizes 10000 100000 500000] [--cols 8]
+"""
+
+import argparse
+import json
+
+from common import make_log_text, print_table, timeit
+
+from app import TREND_CHART_ID, build_echarts_line_option, snapshot_position
+from templates.components import chart_delta_html
+from utils.chunk_index import ChunkedLog
+from utils.log_parser import LogParser
+
+
+def full_rerun(raw, keys, current_time):
+    """改造前: 每次滑块移动都整页重跑"""
+    parser = LogParser()
+    df, _ = parser.parse(raw.decode("utf-8", errors='ignore'))
+    parser.get_statistics(df)
+    row = df.loc[(df['Timestamp'] - current_time).abs().idxmin()]
+    option = build_echarts_line_option(df, 'Timestamp', keys, mark_line_val=row['Timestamp'])
+    return json.dumps(option)
+
+
+def fragment_rerun(chunked, df, keys, current_time):
+    """改造后: 只重跑快照片段，趋势图只收到标记线增量"""
+    row = chunked.nearest_row(current_time)
+    [f"{row[k]:.4f}" for k in keys]
+    index = snapshot_position(df, row['Timestamp'])
+    return chart_delta_html([{"chart": TREND_CHART_ID, "markLine": index, "highlight": index}])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    arg_parser.add_argument("--cols", type=int, default=8)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        raw = make_log_text(size, args.cols).encode("utf-8")
+        df, _ = LogParser().parse(raw.decode("utf-8"))
+        keys = list(df.columns[1:4])
+        current_time = float(df['Timestamp'].iloc[len(df) // 2])
+
+        chunked = ChunkedLog.from_dataframe(df)
+
+        before, full_payload = timeit(lambda: full_rerun(raw, keys, current_time), args.repeat)
+        after, delta_payload = timeit(lambda: fragment_rerun(chunked, df, keys, current_time), args.repeat)
+        rows.append([
+            size, args.cols,
+            f"{before * 1000:.1f}", f"{after * 1000:.2f}", f"{before / after:.0f}x",
+            f"{len(full_payload.encode('utf-8')) / 1024:.0f} KB", f"{len(delta_payload.encode('utf-8'))} B",
+        ])
+
+    print_table(["行数", "列数", "整页重跑 (ms)", "片段重跑 (ms)", "加速比", "整页负载", "增量负载"], rows)
+
+
+if __name__ == "__main__":
+    main()
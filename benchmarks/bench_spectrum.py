@@ -0,0 +1,84 @@
+"""
+频谱分析基准: 流式分块计算 vs 整列一次计算
+整列方式先把整个窗口拼接、插值为等间隔样本，再一次性生成全部分段做 FFT；
+流式方式 (spectral_analysis) 逐块插值、成批 FFT 并累加。记录耗时与 tracemalloc 峰值内存，
+并校验两者的 PSD 一致。
+
+用法:
+    python benchmarks/bench_spectrum.py [--sizes 1000000 4000000] [--nperseg 1024]
+"""
+
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from common import print_table, timeit
+
+from utils.chunk_index import ChunkedLog
+from utils.spectrum import spectral_analysis
+
+
+def make_vibration(rows, fs=1000.0, seed=0):
+    """合成振动通道: 50 Hz 基频 + 扫频分量 + 白噪声"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(rows) / fs
+    x = np.sin(2 * np.pi * 50 * t) + 0.5 * np.sin(2 * np.pi * (100 + t / 10) * t) + 0.2 * rng.standard_normal(rows)
+    return pd.DataFrame({'Timestamp': t, 'vib': x})
+
+
+def full_welch(chunked, fs, nperseg):
+    """整列方式: 拼接 → 插值 → 全部分段一次 FFT"""
+    df = chunked.query(columns=['vib'])
+    times = df['Timestamp'].to_numpy()
+    grid = times[0] + np.arange(int(np.floor((times[-1] - times[0]) * fs + 1e-9)) + 1) / fs
+    x = np.interp(grid, times, df['vib'].to_numpy())
+    frames = sliding_window_view(x, nperseg)[::nperseg // 2]
+    taper = np.hanning(nperseg)
+    power = np.abs(np.fft.rfft((frames - frames.mean(axis=1, keepdims=True)) * taper, axis=1)) ** 2
+    power *= 1.0 / (fs * (taper ** 2).sum())
+    power[:, 1:-1] *= 2
+    return power.mean(axis=0)
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 4_000_000])
+    arg_parser.add_argument("--nperseg", type=int, default=1024)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+    fs = 1000.0
+
+    rows = []
+    for size in args.sizes:
+        chunked = ChunkedLog.from_dataframe(make_vibration(size, fs))
+        t_start, t_end = chunked.time_range
+        cases = [
+            ("整列一次计算", lambda: full_welch(chunked, fs, args.nperseg)),
+            ("流式分块", lambda: spectral_analysis(chunked.iter_chunks(columns=['vib']), 'vib', fs,
+                                                t_start, t_end, nperseg=args.nperseg).psd),
+        ]
+        psds = []
+        for name, func in cases:
+            seconds, _ = timeit(func, args.repeat)
+            peak, psd = peak_memory(func)
+            psds.append(psd)
+            rows.append([size, name, f"{seconds:.2f}", f"{peak / 1024 / 1024:.1f} MB"])
+        assert np.allclose(*psds), "流式 PSD 与整列计算结果不一致"
+
+    print_table(["样本数", "方式", "耗时 (s)", "峰值内存"], rows)
+
+
+if __name__ == "__main__":
+    main()
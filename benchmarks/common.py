@@ -0,0 +1,59 @@
+"""
+基准测试公共工具
+生成合成日志 / DataFrame，并提供计时辅助函数
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 以脚本方式运行时也能导入项目模块
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def make_frame(rows, cols, seed=0, dt=0.01):
+    """生成合成 DataFrame: Timestamp + cols 个随机游走通道"""
+    rng = np.random.default_rng(seed)
+    values = np.cumsum(rng.standard_normal((rows, cols)), axis=0) + 100.0
+    df = pd.DataFrame(values, columns=[f"ch{i}" for i in range(cols)])
+    df.insert(0, 'Timestamp', np.arange(rows) * dt)
+    return df
+
+
+def make_log_text(rows, cols, seed=0, dt=0.01):
+    """生成合成日志文本: [ts] ch0:v ch1=v ..."""
+    df = make_frame(rows, cols, seed, dt)
+    times = df['Timestamp'].to_numpy()
+    values = df.drop(columns='Timestamp').to_numpy()
+    names = df.columns[1:]
+    lines = []
+    for t, row in zip(times, values):
+        pairs = " ".join(f"{name}{':' if j % 2 == 0 else '='}{v:.3f}" for j, (name, v) in enumerate(zip(names, row)))
+        lines.append(f"[{t:.3f}] {pairs}")
+    return "\n".join(lines)
+
+
+def timeit(func, repeat=5):
+    """多次执行取最小耗时 (秒)，返回 (耗时, 最后一次结果)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def print_table(headers, rows):
+    """打印对齐的 Markdown 表格，便于在版本间 diff"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    line = "| " + " | ".join(str(h).ljust(w) for h, w in zip(headers, widths)) + " |"
+    print(line)
+    print("|" + "|".join("-" * (w + 2) for w in widths) + "|")
+    for r in rows:
+        print("| " + " | ".join(str(c).ljust(w) for c, w in zip(r, widths)) + " |")
@@ -0,0 +1,215 @@
+"""
+NEUP Log Analyzer - 命令行批处理入口
+
+不依赖 Streamlit，复用 LogParser / get_statistics / get_common_keys，
+使用进程池批量解析目录下的日志，输出统计 JSON、列式导出文件和吞吐量报告。
+
+用法:
+    python cli.py logs/ -o out/ --format parquet --workers 8
+    python cli.py logs/*.log -o out/ --reference ref.log --stats-only
+    python cli.py logs/ -o out/ --keys temp,pressure --time-range 100 200
+    python cli.py logs/ -o out/ --rules limits.txt --stats-only
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from utils.alarm_rules import alarm_report, evaluate_rules, parse_rules
+from utils.exporter import EXPORT_FORMATS, export_frame
+from utils.log_grammars import GRAMMARS
+from utils.log_parser import LogParser, get_common_keys
+
+
+def collect_files(inputs, patterns):
+    """展开输入参数: 目录按各个 pattern 匹配，文件直接使用；同一文件只保留一次"""
+    files = {}
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            found = {p for pattern in patterns for p in path.glob(pattern) if p.is_file()}
+            for p in sorted(found):
+                files.setdefault(p.resolve(), p)
+        elif path.is_file():
+            files.setdefault(path.resolve(), path)
+        else:
+            print(f"⚠️  跳过不存在的路径: {item}", file=sys.stderr)
+    return list(files.values())
+
+
+def output_names(files):
+    """
+    各文件输出的相对路径: 相对所有输入文件的公共上级目录
+    不同目录下的同名日志 (a/run.log 与 b/run.log) 输出到 a/、b/ 子目录，不会互相覆盖
+    """
+    resolved = [p.resolve() for p in files]
+    root = Path(os.path.commonpath([p.parent for p in resolved]))
+    return [p.relative_to(root) for p in resolved]
+
+
+def _to_builtin(stats):
+    """统计结果中的 numpy 数值转为 Python float，便于 JSON 序列化"""
+    return {
+        key: {name: float(value) for name, value in values.items()}
+        for key, values in stats.items()
+    }
+
+
+def process_file(path, name, out_dir, fmt, stats_only, reference_df, grammar="auto", keys=None, t_range=None,
+                 rules=None):
+    """
+    工作进程入口: 解析单个日志 → 统计 → 报警规则检查 → 导出
+    只回传汇总信息，不回传 DataFrame；keys / t_range 下推到解析阶段
+    name: 输出文件相对 out_dir 的路径 (见 output_names)
+    rules: 报警规则列表，违规区间写入 <文件名>.alarms.csv，逐条汇总写入统计 JSON
+    """
+    started = time.perf_counter()
+    parser = LogParser(grammar, keys=keys, t_range=t_range)
+    raw = Path(path).read_bytes()
+    df, parse_errors = parser.parse(raw.decode("utf-8", errors='ignore'))
+    parse_seconds = time.perf_counter() - started
+
+    base = out_dir / name
+    base.parent.mkdir(parents=True, exist_ok=True)
+    result = {
+        'file': str(path),
+        'bytes': len(raw),
+        'rows': len(df),
+        'columns': max(len(df.columns) - 1, 0),
+        'parse_errors': parse_errors,
+        'parse_seconds': parse_seconds,
+        'grammar': parser.detected.name,
+    }
+
+    stats = _to_builtin(parser.get_statistics(df))
+    report = {'file': str(path), 'rows': len(df), 'parse_errors': parse_errors,
+              'grammar': parser.detected.name, 'units': parser.units, 'statistics': stats}
+    if reference_df is not None:
+        report['common_keys'] = get_common_keys(df, reference_df)
+    if rules:
+        intervals, errors = evaluate_rules(df, rules)
+        summary = alarm_report(intervals, rules, errors)
+        report['alarms'] = json.loads(summary.to_json(orient='records', force_ascii=False))
+        intervals.to_csv(base.with_name(f"{base.name}.alarms.csv"), index=False)
+        result['alarm_violations'] = len(intervals)
+        result['alarm_failed_rules'] = int((~summary['passed']).sum())
+    base.with_name(f"{base.name}.stats.json").write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if not stats_only and not df.empty:
+        result['export'] = str(export_frame(df, base, fmt))
+
+    result['total_seconds'] = time.perf_counter() - started
+    return result
+
+
+def print_report(results, wall_seconds, workers):
+    """打印吞吐量报告"""
+    total_bytes = sum(r['bytes'] for r in results)
+    total_rows = sum(r['rows'] for r in results)
+    parse_seconds = sum(r['parse_seconds'] for r in results)
+
+    print()
+    print("=" * 60)
+    print("📊 批处理吞吐量报告")
+    print("=" * 60)
+    print(f"文件数        : {len(results)}")
+    print(f"工作进程      : {workers}")
+    print(f"总数据量      : {total_bytes / 1024 / 1024:.2f} MB")
+    print(f"总行数        : {total_rows}")
+    print(f"墙钟耗时      : {wall_seconds:.2f} s")
+    print(f"累计解析耗时  : {parse_seconds:.2f} s")
+    if wall_seconds > 0:
+        print(f"吞吐量        : {total_bytes / 1024 / 1024 / wall_seconds:.2f} MB/s, "
+              f"{total_rows / wall_seconds:.0f} 行/s")
+    print("=" * 60)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="NEUP 日志批处理 (无需 Streamlit)")
+    parser.add_argument("inputs", nargs="+", help="日志文件或目录")
+    parser.add_argument("-o", "--out", default="neup_out", help="输出目录 (默认: neup_out)")
+    parser.add_argument("--pattern", nargs="+", default=["*.log", "*.txt"],
+                        help="目录中匹配的文件模式，可给多个 (默认: *.log *.txt)")
+    parser.add_argument("--format", default="csv", choices=list(EXPORT_FORMATS), help="导出格式")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="工作进程数")
+    parser.add_argument("--grammar", default="auto", choices=["auto", *GRAMMARS],
+                        help="日志格式 (默认: auto，按前 200 行自动识别)")
+    parser.add_argument("--keys", help="只解析这些参数 (逗号分隔)")
+    parser.add_argument("--time-range", nargs=2, type=float, metavar=("START", "END"),
+                        help="只解析该时间范围内的行 (秒)")
+    parser.add_argument("--reference", help="参考日志，用于在统计中报告共同参数")
+    parser.add_argument("--stats-only", action="store_true", help="只输出统计，不导出数据")
+    parser.add_argument("--rules", help="报警规则文件 (每行一条，如 `temp > 85 for 2s`)")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+
+    files = collect_files(args.inputs, args.pattern)
+    if not files:
+        print("❌ 没有找到日志文件", file=sys.stderr)
+        return 1
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    reference_df = None
+    if args.reference:
+        ref_df, _ = LogParser(args.grammar).parse(Path(args.reference).read_text(encoding="utf-8", errors='ignore'))
+        # get_common_keys 只比较列名，传给工作进程时只保留表头
+        reference_df = pd.DataFrame(columns=ref_df.columns)
+
+    keys = [k.strip() for k in args.keys.split(",") if k.strip()] if args.keys else None
+    t_range = tuple(args.time_range) if args.time_range else None
+
+    rules = None
+    if args.rules:
+        rules, rule_errors = parse_rules(Path(args.rules).read_text(encoding="utf-8"))
+        for lineno, message in rule_errors:
+            print(f"❌ {args.rules} 第 {lineno} 行: {message}", file=sys.stderr)
+        if rule_errors:
+            return 1
+
+    workers = max(1, min(args.workers, len(files)))
+    results = []
+    failed = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_file, path, name, out_dir, args.format, args.stats_only, reference_df,
+                            args.grammar, keys, t_range, rules): path
+            for path, name in zip(files, output_names(files))
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ {path}: {e}", file=sys.stderr)
+                continue
+            results.append(result)
+            alarms = f", {result['alarm_failed_rules']} 条规则未通过" if 'alarm_failed_rules' in result else ""
+            print(f"✅ {path} ({result['rows']} 行, {result['grammar']}, {result['parse_seconds']:.2f} s{alarms})")
+
+    wall_seconds = time.perf_counter() - started
+    results.sort(key=lambda r: r['file'])
+    (out_dir / "batch_summary.json").write_text(
+        json.dumps({'wall_seconds': wall_seconds, 'workers': workers, 'files': results},
+                   ensure_ascii=False, indent=2),
+        encoding="utf-8"
+    )
+    print_report(results, wall_seconds, workers)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+/**
+ * NEUP Log Analyzer - ECharts 增量更新
+ *
+ * 序列数据只在图表首次渲染时发送；快照滑块移动时，服务端只发送
+ * { chart, markLine, highlight } 这样的小增量，由本脚本在浏览器中
+ * 找到已渲染的 ECharts 实例并以合并模式 setOption。
+ *
+ * 由 templates/components.py 中的 render_chart_delta 在每个会话首次发送增量时
+ * 安装到 Streamlit 主页面 (window 为主页面)，之后的增量只调用 applyChartDeltas。
+ *
+ * 查找实例的两种方式:
+ * - streamlit-echarts 0.7+: 组件直接渲染在主页面中，图表通过事件处理函数把实例登记到
+ *   window.neupCharts (见 app.py 的 CHART_REGISTER_EVENT)
+ * - streamlit-echarts 0.4: 组件在 iframe 中由 echarts-for-react 渲染，沿 React fiber 查找
+ */
+
+(function() {
+    'use strict';
+
+    const ECHARTS_FRAME_SELECTOR = 'iframe[title*="st_echarts"]';
+
+    // 实例尚未登记 (图表在增量之后才渲染) 的增量，图表登记时补上
+    const pending = {};
+
+    /**
+     * 从 0.4 版 st_echarts 组件 iframe 中取出 ECharts 实例
+     * echarts-for-react 将实例挂在 React 组件上，这里沿 React fiber 向上查找
+     */
+    function findFrameInstance(frame) {
+        let frameDoc;
+        try {
+            frameDoc = frame.contentDocument;
+        } catch (e) {
+            return null; // 跨域时无法访问
+        }
+        if (!frameDoc) {
+            return null;
+        }
+
+        const host = frameDoc.querySelector('[_echarts_instance_]');
+        if (!host) {
+            return null;
+        }
+
+        const fiberKey = Object.keys(host).find(function(key) {
+            return key.startsWith('__reactFiber') || key.startsWith('__reactInternalInstance');
+        });
+        let fiber = fiberKey ? host[fiberKey] : null;
+        while (fiber) {
+            const component = fiber.stateNode;
+            if (component && typeof component.getEchartsInstance === 'function') {
+                return component.getEchartsInstance();
+            }
+            fiber = fiber.return;
+        }
+        return null;
+    }
+
+    /**
+     * 收集页面上所有图表实例，按 title.id 索引
+     */
+    function collectCharts() {
+        const charts = {};
+        const registry = window.neupCharts || {};
+        Object.keys(registry).forEach(function(id) {
+            if (registry[id].isDisposed()) {
+                delete registry[id];
+            } else {
+                charts[id] = registry[id];
+            }
+        });
+
+        document.querySelectorAll(ECHARTS_FRAME_SELECTOR).forEach(function(frame) {
+            const instance = findFrameInstance(frame);
+            if (!instance) {
+                return;
+            }
+            const title = (instance.getOption().title || [])[0];
+            if (title && title.id) {
+                charts[title.id] = instance;
+            }
+        });
+        return charts;
+    }
+
+    /**
+     * 应用增量
+     * delta: { chart: 图表 id, markLine: 标记线 x 值, highlight: 高亮的数据索引 }
+     */
+    function applyDelta(instance, delta) {
+        const option = instance.getOption();
+
+        if (delta.markLine !== undefined && delta.markLine !== null) {
+            // 只更新原本带标记线的序列，其余序列传空对象保持不变 (按索引合并)
+            instance.setOption({
+                series: option.series.map(function(series) {
+                    return series.markLine ? { markLine: { data: [{ xAxis: delta.markLine }] } } : {};
+                })
+            }, { lazyUpdate: true });
+        }
+
+        if (delta.highlight !== undefined && delta.highlight !== null) {
+            instance.dispatchAction({ type: 'downplay' });
+            instance.dispatchAction({ type: 'highlight', seriesIndex: 0, dataIndex: delta.highlight });
+        }
+    }
+
+    window.applyChartDeltas = function(deltas) {
+        const charts = collectCharts();
+        deltas.forEach(function(delta) {
+            const instance = charts[delta.chart];
+            if (instance) {
+                delete pending[delta.chart];
+                applyDelta(instance, delta);
+            } else {
+                pending[delta.chart] = delta;
+            }
+        });
+    };
+
+    /**
+     * 图表登记后补上等待中的增量 (由 CHART_REGISTER_EVENT 调用)
+     */
+    window.flushChartDelta = function(id) {
+        const delta = pending[id];
+        const instance = (window.neupCharts || {})[id];
+        if (delta && instance) {
+            delete pending[id];
+            applyDelta(instance, delta);
+        }
+    };
+})();
@@ -2,7 +2,12 @@
 HTML 模板组件模块
 存放所有 HTML 模板和组件函数
 """
+import json
+from functools import lru_cache
+from pathlib import Path
+
 import streamlit as st
+import streamlit.components.v1 as components
 
 
 def render_header():
@@ -44,7 +49,7 @@ def render_log_format_help():
     """渲染日志格式帮助"""
     return """
     **日志格式要求：**
-    - 支持 `key:value` 或 `key=value` 格式
+    - 支持 `key:value` 或 `key=value` 格式 (其他格式见侧边栏「日志格式」，默认自动识别)
     - 时间戳需要用方括号包裹，如 `[123.45]`
     - 示例：`[100.5] temp:25.3 pressure=101.2`
     
@@ -52,7 +57,7 @@ def render_log_format_help():
     - 🔍 单文件分析：查看参数随时间的变化
     - 🔄 日志对比：对比两个日志的差异
     - 📊 统计分析：查看数据的统计特征
-    - 📥 数据导出：将数据导出为 CSV 格式
+    - 📥 数据导出：按列和时间窗口导出为 CSV / gzip / Parquet / Feather
     - ⌨️  快捷键：Ctrl+E 导出, F 全屏
     - 🎨 主题切换：顶部切换浅色/深色模式
     """
@@ -116,3 +121,54 @@ def render_chart_hint():
 def render_loading_spinner(text="正在处理..."):
     """渲染加载动画"""
     return st.spinner(text)
+
+
+# 会话中是否已把增量脚本安装到主页面 (刷新页面即新会话，会重新安装)
+CHART_DELTA_INSTALLED = "chart_delta_installed"
+
+
+@lru_cache(maxsize=1)
+def _chart_delta_script():
+    """读取图表增量更新脚本 (进程内只读一次)"""
+    js_path = Path(__file__).parent.parent / "static" / "js" / "chart_delta.js"
+    return js_path.read_text(encoding="utf-8")
+
+
+def chart_delta_html(deltas, install=False):
+    """
+    构建图表增量更新的 HTML 片段 (在 components.html 的 iframe 中执行，作用于主页面)
+    deltas: [{"chart": 图表 id, "markLine": x 值, "highlight": 数据索引}, ...]
+    install: 附带增量脚本并安装到主页面；安装后一直保留，之后的增量只需调用
+    """
+    payload = json.dumps(deltas, separators=(",", ":"))
+    setup = ""
+    if install:
+        setup = (
+            "if (!host.applyChartDeltas) {"
+            " var s = host.document.createElement('script');"
+            f" s.textContent = {json.dumps(_chart_delta_script())};"
+            " host.document.head.appendChild(s); }"
+        )
+    return (
+        "<script>(function(host) {"
+        f"{setup} if (host.applyChartDeltas) {{ host.applyChartDeltas({payload}); }}"
+        "})(window.parent);</script>"
+    )
+
+
+def render_chart_delta(deltas):
+    """
+    向浏览器中已渲染的 ECharts 图表发送增量更新
+    序列数据保持在浏览器中，只传输标记线位置 / 高亮点；增量脚本每个会话只发送一次
+    """
+    install = not st.session_state.get(CHART_DELTA_INSTALLED)
+    st.session_state[CHART_DELTA_INSTALLED] = True
+    components.html(chart_delta_html(deltas, install), height=0)
+
+
+def render_degradation_banner(placeholder, notes):
+    """在页面顶部占位中显示内存预算保护的降级说明"""
+    if notes:
+        placeholder.warning(
+            "🛡️ 内存预算保护已生效，以下内容已自动降级:\n\n" + "\n".join(f"- {note}" for note in notes)
+        )
@@ -0,0 +1,49 @@
+"""
+历史库: 多个会话同时保存同一指纹时只入库一次，均返回同一个 run_id
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.log_store import LogStore
+
+
+def make_frame(rows=20_000):
+    t = np.arange(rows) * 0.01
+    return pd.DataFrame({'Timestamp': t, 'temp': np.sin(t), 'pressure': np.cos(t)})
+
+
+def test_concurrent_ingest_same_fingerprint(tmp_path):
+    store = LogStore(tmp_path / "store.sqlite")
+    df = make_frame()
+    barrier = threading.Barrier(4)
+    results, errors = [], []
+
+    def save():
+        barrier.wait()
+        try:
+            results.append(store.ingest(df, "run.log", "fp-same"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(set(results)) == 1
+    runs = store.list_runs()
+    assert len(runs) == 1
+    assert len(store.query(results[0])) == len(df)
+
+
+def test_ingest_existing_fingerprint_returns_run(tmp_path):
+    store = LogStore(tmp_path / "store.sqlite")
+    df = make_frame(100)
+    run_id = store.ingest(df, "a.log", "fp")
+    assert store.ingest(df, "b.log", "fp") == run_id
+    assert store.find_run("fp") == run_id
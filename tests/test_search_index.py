@@ -0,0 +1,47 @@
+"""
+词项索引与行确认的边界一致性: 索引登记的词项，find_lines 必须能在同一行找到
+"""
+
+import io
+
+from utils.line_index import LineIndex
+from utils.search_index import SearchIndex
+
+
+LINES = [
+    "[08:00:00.000] temp:25.3C pressure=101.2kPa",
+    "[08:00:01.000] temp:25.4C pressure=101.3kPa mode=1abc",
+    "[08:00:02.000] note=kPa_total flow=3.2e-3",
+    "[08:00:03.000] 温度kPa status=ok",
+]
+
+
+def build(lines, block_lines=2):
+    raw = "\n".join(lines).encode("utf-8")
+    line_index = LineIndex.from_bytes(raw)
+    index = SearchIndex()
+    index.index_tokens(raw, line_index, block_lines=block_lines)
+    return index, io.BytesIO(raw), line_index
+
+
+def test_unit_suffix_is_indexed_and_found():
+    index, fileobj, line_index = build(LINES)
+    assert "kpa" in index.token_blocks
+    assert "c" in index.token_blocks
+    assert index.find_lines("kPa", fileobj, line_index) == [0, 1, 3]
+    assert index.find_lines("C", fileobj, line_index) == [0, 1]
+    assert index.find_lines("abc", fileobj, line_index) == [1]
+    assert index.first_line("kpa_total", fileobj, line_index) == 2
+
+
+def test_every_indexed_token_is_found_in_its_blocks():
+    index, fileobj, line_index = build(LINES)
+    for word, blocks in index.token_blocks.items():
+        found = index.find_lines(word, fileobj, line_index)
+        assert sorted({line // index.block_lines for line in found}) == blocks.tolist(), word
+
+
+def test_token_inside_word_is_not_matched():
+    index, fileobj, line_index = build(["a.kpa=1 x-c=2", "kpa=3"])
+    assert "kpa" in index.token_blocks
+    assert index.find_lines("kpa", fileobj, line_index) == [1]
@@ -0,0 +1,350 @@
+"""
+报警规则模块
+对日志逐条检查限值规则，返回违规区间 (供趋势图标记与导出报告)
+
+规则每行一条，可在前面加 "名称:"，时间单位支持 ms / s / min (省略时为秒):
+    temp > 85 for 2s                    阈值规则: 条件持续不少于 2 秒
+    overtemp: temp >= 90                阈值规则: 不限持续时间
+    pressure drops 5% within 100ms      变化率规则: 100 ms 内较窗口内最大值下降超过 5%
+    rpm rises 300 within 1s             变化率规则: 1 s 内较窗口内最小值上升超过 300
+    valve changes 1 within 50ms         变化率规则: 任一方向
+
+- 阈值规则是一次整列 NumPy 比较，区间由布尔数组的边沿一次求出，没有逐行循环
+- 变化率规则先按窗口行数分块，用各块最值求变化量上界，只在可能违规的块内按时间窗口精确计算；
+  同一通道的分块最值在多条规则间复用
+- AlarmRuleEngine.update 增量检查 (跟随模式): 只保留未结束的区间与滚动窗口所需的尾部数据
+"""
+
+import operator
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+ALARM_COLUMNS = ['rule', 'column', 'start', 'end', 'duration', 'rows', 'peak']
+
+REPORT_COLUMNS = ['rule', 'column', 'violations', 'total_duration', 'first', 'peak', 'passed', 'error']
+
+_OPS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "==": operator.eq, "!=": operator.ne,
+}
+
+_UNITS = {"ms": 0.001, "s": 1.0, "min": 60.0}
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+
+_THRESHOLD = re.compile(
+    rf"^(?P<column>[^\s<>=!]+)\s*(?P<op>>=|<=|==|!=|>|<)\s*(?P<value>{_NUMBER})"
+    rf"(?:\s+for\s+(?P<duration>{_NUMBER})\s*(?P<unit>ms|s|min)?)?$"
+)
+
+_RATE = re.compile(
+    rf"^(?P<column>\S+)\s+(?P<direction>drops|rises|changes)\s+(?:by\s+)?(?:more\s+than\s+)?"
+    rf"(?P<amount>{_NUMBER})\s*(?P<percent>%)?\s+within\s+(?P<window>{_NUMBER})\s*(?P<unit>ms|s|min)?$"
+)
+
+
+class AlarmRuleError(ValueError):
+    """规则格式错误或引用了不存在的参数"""
+
+
+class AlarmRule:
+    """一条已解析的报警规则"""
+
+    def __init__(self, source, name, column, kind, op=None, value=None, duration=0.0,
+                 direction=None, amount=None, percent=False, window=0.0):
+        self.source = source
+        self.name = name
+        self.column = column
+        self.kind = kind                # "threshold" / "rate"
+        self.op = op
+        self.value = value
+        self.duration = duration        # 阈值规则的最短持续时间 (秒)
+        self.direction = direction      # "drops" / "rises" / "changes"
+        self.amount = amount
+        self.percent = percent
+        self.window = window            # 变化率规则的时间窗口 (秒)
+
+    def __repr__(self):
+        return f"AlarmRule({self.source!r})"
+
+
+@lru_cache(maxsize=512)
+def parse_rule(source):
+    """解析一行规则，返回 AlarmRule；格式不正确时抛出 AlarmRuleError"""
+    text = source.strip()
+    name, body = None, text
+    head, sep, rest = text.partition(":")
+    if sep and not _THRESHOLD.match(text) and not _RATE.match(text):
+        name, body = head.strip(), rest.strip()
+    body = re.sub(r"\s+", " ", body)
+
+    match = _THRESHOLD.match(body)
+    if match:
+        scale = _UNITS[match['unit'] or "s"]
+        return AlarmRule(text, name or body, match['column'], "threshold", op=match['op'],
+                         value=float(match['value']), duration=float(match['duration'] or 0) * scale)
+
+    match = _RATE.match(body)
+    if match:
+        window = float(match['window']) * _UNITS[match['unit'] or "s"]
+        if window <= 0:
+            raise AlarmRuleError("时间窗口必须大于 0")
+        return AlarmRule(text, name or body, match['column'], "rate", direction=match['direction'],
+                         amount=float(match['amount']), percent=bool(match['percent']), window=window)
+
+    raise AlarmRuleError("格式应为 `参数 > 值 [for 时长]` 或 `参数 drops|rises|changes 幅度[%] within 时长`")
+
+
+def parse_rules(text):
+    """
+    规则文本 → (规则列表, [(行号, 错误信息)])
+    空行与 # 开头的注释行忽略
+    区间与汇总报告按规则名称区分，名称 (未命名时为规则本身) 重复的规则报错，不参与检查
+    """
+    rules = []
+    errors = []
+    names = {}
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            rule = parse_rule(line)
+        except AlarmRuleError as e:
+            errors.append((lineno, str(e)))
+            continue
+        if rule.name in names:
+            errors.append((lineno, f"规则名称重复: {rule.name} (第 {names[rule.name]} 行已使用)"))
+            continue
+        names[rule.name] = lineno
+        rules.append(rule)
+    return rules, errors
+
+
+def _window_starts(times, window, cache):
+    """每行时间窗口 [t_i - window, t_i] 的起始行号，以及窗口最多覆盖的行数 (按窗口缓存)"""
+    key = ('starts', window)
+    if key not in cache:
+        starts = np.searchsorted(times, times - window, side='left')
+        cache[key] = starts, int((np.arange(1, len(times) + 1) - starts).max())
+    return cache[key]
+
+
+def _block_bounds(values, size, cache, column):
+    """
+    按 size 行分块的 最大值 / 最小值 / 最小绝对值 (按通道与块大小缓存)
+    size 不小于窗口最多覆盖的行数时，任一行的窗口只跨越其所在块与前一块
+    """
+    key = ('blocks', column, size)
+    if key not in cache:
+        n = len(values)
+        padded = np.full(-(-n // size) * size, np.nan)
+        padded[:n] = values
+        blocks = padded.reshape(-1, size)
+        cache[key] = (np.fmax.reduce(blocks, axis=1), np.fmin.reduce(blocks, axis=1),
+                      np.fmin.reduce(np.abs(blocks), axis=1))
+    return cache[key]
+
+
+def _window_extreme(values, starts, rows, how):
+    """rows 各行在 [starts[i], i] 内的最大/最小值 (reduceat，只计算给出的行)"""
+    func = np.fmax if how == "max" else np.fmin
+    return _segment_reduce(func, values, starts[rows], rows + 1)
+
+
+def _rate_change(rule, values, times, cache):
+    """
+    变化率规则每行的变化量 (百分比规则为 %)
+    先用分块最值求各块变化量的上界，只在上界超过限值的块内精确计算，其余行为 NaN (不违规)
+    """
+    starts, size = _window_starts(times, rule.window, cache)
+    high, low, small = _block_bounds(values, size, cache, rule.column)
+    prev_high = np.r_[-np.inf, high[:-1]]
+    prev_low = np.r_[np.inf, low[:-1]]
+
+    bound = np.zeros(len(high))
+    if rule.direction in ("drops", "changes"):
+        bound = np.fmax(bound, np.fmax(prev_high, high) - low)
+    if rule.direction in ("rises", "changes"):
+        bound = np.fmax(bound, high - np.fmin(prev_low, low))
+    if rule.percent:
+        bound = bound / np.fmin(np.r_[np.inf, small[:-1]], small) * 100
+
+    change = np.full(len(values), np.nan)
+    candidates = ~(bound <= rule.amount)
+    if not candidates.any():
+        return change
+    rows = np.flatnonzero(np.repeat(candidates, size)[:len(values)])
+
+    deltas = []
+    if rule.direction in ("drops", "changes"):
+        base = _window_extreme(values, starts, rows, "max")
+        deltas.append((base - values[rows], base))
+    if rule.direction in ("rises", "changes"):
+        base = _window_extreme(values, starts, rows, "min")
+        deltas.append((values[rows] - base, base))
+    if rule.percent:
+        deltas = [(delta / np.abs(base) * 100, base) for delta, base in deltas]
+    change[rows] = deltas[0][0] if len(deltas) == 1 else np.fmax(deltas[0][0], deltas[1][0])
+    return change
+
+
+def _runs(flags):
+    """布尔数组中连续 True 的段 → (起始行, 结束行 (不含))"""
+    if not flags.any():
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    edges = np.flatnonzero(flags[1:] != flags[:-1]) + 1
+    if flags[0]:
+        edges = np.r_[0, edges]
+    if flags[-1]:
+        edges = np.r_[edges, len(flags)]
+    return edges[0::2], edges[1::2]
+
+
+def _segment_reduce(func, values, starts, ends):
+    """各段 [start, end) 的归约 (reduceat 的最后一个下标一直归约到数组末尾，end 为行数时省略)"""
+    if len(starts) == 0:
+        return np.empty(0)
+    bounds = np.empty(len(starts) * 2, dtype=np.int64)
+    bounds[0::2] = starts
+    bounds[1::2] = ends
+    if bounds[-1] >= len(values):
+        bounds = bounds[:-1]
+    return func.reduceat(values, bounds)[0::2]
+
+
+def _raw_intervals(df, rules):
+    """
+    各规则的违规区间 (尚未按最短持续时间过滤)，返回 (区间表, [(规则, 错误信息)])
+    peak: 阈值规则为超出限值的最大幅度，变化率规则为最大变化量；
+    变化率规则的区间起点向前延伸一个窗口，覆盖发生变化的整段
+    """
+    times = df['Timestamp'].to_numpy(dtype=float)
+    found = {name: [] for name in ALARM_COLUMNS}
+    errors = []
+    cache = {}
+    columns = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for rule in rules:
+            if rule.column not in df.columns:
+                errors.append((rule.source, f"未知参数: {rule.column}"))
+                continue
+            if rule.column not in columns:
+                columns[rule.column] = df[rule.column].to_numpy(dtype=float)
+            values = columns[rule.column]
+
+            if rule.kind == "threshold":
+                first, end = _runs(_OPS[rule.op](values, rule.value))
+                # 区间内离限值最远的点必为区间的最大值或最小值
+                peak = np.fmax(np.abs(_segment_reduce(np.fmax, values, first, end) - rule.value),
+                               np.abs(_segment_reduce(np.fmin, values, first, end) - rule.value))
+                start = times[first]
+            else:
+                change = _rate_change(rule, values, times, cache)
+                first, end = _runs(change > rule.amount)
+                peak = _segment_reduce(np.fmax, change, first, end)
+                start = np.maximum(times[first] - rule.window, times[0])
+
+            found['rule'].append(np.full(len(first), rule.name, dtype=object))
+            found['column'].append(np.full(len(first), rule.column, dtype=object))
+            found['start'].append(start)
+            found['end'].append(times[end - 1])
+            found['rows'].append(end - first)
+            found['peak'].append(peak)
+
+    if not found['rule']:
+        return pd.DataFrame(columns=ALARM_COLUMNS), errors
+    intervals = pd.DataFrame({name: np.concatenate(parts) for name, parts in found.items() if parts})
+    intervals['duration'] = intervals['end'] - intervals['start']
+    return intervals[ALARM_COLUMNS], errors
+
+
+def _apply_durations(intervals, rules):
+    """只保留持续时间不少于规则要求的区间"""
+    if intervals.empty:
+        return intervals
+    minimum = intervals['rule'].map({r.name: r.duration for r in rules}).fillna(0.0)
+    kept = intervals[intervals['duration'] >= minimum]
+    return kept.sort_values(['start', 'rule']).reset_index(drop=True)
+
+
+def evaluate_rules(df, rules):
+    """
+    对整个 DataFrame 检查全部规则
+    返回 (违规区间表, [(规则, 错误信息)])，区间按开始时间排序
+    """
+    if df.empty or not rules:
+        return pd.DataFrame(columns=ALARM_COLUMNS), []
+    intervals, errors = _raw_intervals(df, rules)
+    return _apply_durations(intervals, rules), errors
+
+
+def alarm_report(intervals, rules, errors=()):
+    """
+    按规则汇总违规区间 (无违规的规则也列出)，供导出
+    errors: evaluate_rules 返回的错误，对应规则在 error 列注明且不计为通过
+    """
+    summary = intervals.groupby('rule').agg(
+        violations=('start', 'size'), total_duration=('duration', 'sum'),
+        first=('start', 'min'), peak=('peak', 'max'),
+    )
+    report = pd.DataFrame({'rule': [r.name for r in rules], 'column': [r.column for r in rules]})
+    report = report.join(summary, on='rule')
+    report['violations'] = report['violations'].fillna(0).astype(int)
+    report['total_duration'] = report['total_duration'].fillna(0.0)
+    report['error'] = [dict(errors).get(r.source, "") for r in rules]
+    report['passed'] = (report['violations'] == 0) & (report['error'] == "")
+    return report[REPORT_COLUMNS]
+
+
+class AlarmRuleEngine:
+    """
+    报警规则引擎
+    evaluate: 整个日志一次检查；update: 跟随模式下按批追加新行，只报告新确认的区间
+
+    增量检查只保留 尾部未结束的区间 + 最长变化率窗口 的数据作为上下文:
+    仍延续到最新一行的区间留到下一批再确认 (届时才知道持续了多久)
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.context = max((r.window for r in self.rules if r.kind == "rate"), default=0.0)
+        self._tail = pd.DataFrame()
+        self._last_time = None
+        self.intervals = pd.DataFrame(columns=ALARM_COLUMNS)
+        self.errors = []
+
+    def evaluate(self, df):
+        intervals, self.errors = evaluate_rules(df, self.rules)
+        return intervals
+
+    def update(self, df_new):
+        """追加新行，返回新确认的违规区间"""
+        if df_new.empty or not self.rules:
+            return pd.DataFrame(columns=ALARM_COLUMNS)
+
+        data = pd.concat([self._tail, df_new], ignore_index=True) if not self._tail.empty else df_new
+        raw, self.errors = _raw_intervals(data, self.rules)
+        last_time = float(data['Timestamp'].iloc[-1])
+
+        # 结束于最新一行的区间尚未结束；上一批已确认的区间结束时间都早于上一批的最后一行
+        confirmed = raw[raw['end'] < last_time]
+        if self._last_time is not None:
+            confirmed = confirmed[confirmed['end'] >= self._last_time]
+        new = _apply_durations(confirmed, self.rules)
+
+        # 尾部: 从未结束区间的起点 (与最新时间) 再往前一个变化率窗口
+        open_starts = raw.loc[raw['end'] >= last_time, 'start']
+        keep_from = min(open_starts.min() if len(open_starts) else last_time, last_time) - self.context
+        times = data['Timestamp'].to_numpy(dtype=float)
+        self._tail = data.iloc[int(np.searchsorted(times, keep_from, side='left')):].reset_index(drop=True)
+        self._last_time = last_time
+
+        if not new.empty:
+            self.intervals = new if self.intervals.empty else pd.concat([self.intervals, new], ignore_index=True)
+        return new
@@ -0,0 +1,163 @@
+"""
+异常检测模块
+对所有数值列同时做滚动 z-score、滚动 MAD 和阶跃检测
+
+所有计算都作用于整个二维数组 (行 × 列)，由 pandas/numpy 的向量化滚动窗口完成，
+不按列写 Python 循环；区间提取同样在二维布尔矩阵上一次完成。
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# 检测方法定义
+ANOMALY_METHODS = {
+    "zscore": {"name": "滚动 Z-Score", "default_threshold": 4.0},
+    "mad": {"name": "滚动 MAD", "default_threshold": 6.0},
+    "step": {"name": "阶跃变化", "default_threshold": 5.0},
+}
+
+# MAD → 标准差的一致性系数 (正态分布)
+MAD_SCALE = 1.4826
+
+INTERVAL_COLUMNS = ['column', 'method', 'start', 'end', 'rows', 'peak_score']
+
+
+# 每次同时处理的列数: 既保持按二维数组向量化，又限制 1M 行 × 100 列时的峰值内存
+COLUMN_BLOCK = 32
+
+
+def _numeric_columns(df, columns=None):
+    cols = columns if columns is not None else df.columns
+    return [c for c in cols if c != 'Timestamp' and pd.api.types.is_numeric_dtype(df[c])]
+
+
+def _window_moments(values, window):
+    """
+    基于累积和的滚动均值/方差 (O(行 × 列)，与窗口长度无关)
+
+    返回 centered: 减去列均值后的数据
+         mean, var: 第 j 个完整窗口 (行 j .. j+window-1) 的均值与方差，float32
+    """
+    n = values.shape[0]
+    # 先减去列均值，降低平方累积和的数值误差
+    centered = values - np.nanmean(values, axis=0)
+    c1 = np.zeros((n + 1, values.shape[1]), order='F')
+    c2 = np.zeros((n + 1, values.shape[1]), order='F')
+    np.cumsum(centered, axis=0, out=c1[1:])
+    np.cumsum(centered ** 2, axis=0, out=c2[1:])
+
+    s1 = c1[window:] - c1[:-window]
+    s2 = c2[window:] - c2[:-window]
+    del c1, c2
+    mean = s1 / window
+    var = np.maximum((s2 - s1 * mean) / (window - 1), 0.0)
+    return centered.astype(np.float32), mean.astype(np.float32), var.astype(np.float32)
+
+
+def compute_scores(values, window=50, methods=("zscore", "step")):
+    """
+    计算每种方法的异常分数矩阵
+
+    values: (行, 列) 浮点数组
+    返回 {method: float32 数组 (行, 列)}，分数越大越异常；窗口未满处为 NaN
+    """
+    # 列优先存储，使沿时间轴的累积和/滚动访问连续内存
+    values = np.asfortranarray(values, dtype=np.float64)
+    n = values.shape[0]
+    scores = {}
+    if n <= 2 * window:
+        return scores
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if "zscore" in methods or "step" in methods:
+            centered, mean, var = _window_moments(values, window)
+            std = np.sqrt(var)
+
+        # 第 i 行只使用其之前 window 行 (第 i-window 个窗口) 作为基线
+        if "zscore" in methods:
+            z = np.full(values.shape, np.nan, dtype=np.float32, order='F')
+            z[window:] = np.abs(centered[window:] - mean[:-1]) / np.where(std[:-1] > 0, std[:-1], np.nan)
+            scores["zscore"] = z
+
+        if "mad" in methods:
+            # 滚动中位数没有累积和形式，交给 pandas 的二维滚动窗口 (C 实现)
+            frame = pd.DataFrame(values)
+            median = frame.rolling(window, min_periods=window).median().shift(1)
+            abs_dev = (frame - median).abs()
+            mad = abs_dev.rolling(window, min_periods=window).median().shift(1).to_numpy() * MAD_SCALE
+            scores["mad"] = (abs_dev.to_numpy() / np.where(mad > 0, mad, np.nan)).astype(np.float32)
+
+        if "step" in methods:
+            # 前 window 行 (第 i-window 个窗口) 与后 window 行 (第 i 个窗口) 的均值差 / 合并标准差
+            step = np.full(values.shape, np.nan, dtype=np.float32, order='F')
+            pooled = np.sqrt((var[:-window] + var[window:]) / 2)
+            step[window:n - window + 1] = np.abs(mean[window:] - mean[:-window]) / np.where(pooled > 0, pooled, np.nan)
+            scores["step"] = step
+
+    return scores
+
+
+def extract_intervals(flags, times, scores, method, columns):
+    """
+    将二维布尔矩阵转为异常区间表 (所有列一次完成)
+
+    flags / scores: (行, 列) 数组，times: 与行对应的时间戳数组，columns: 列名
+    """
+    mask = np.asarray(flags, dtype=np.int8)
+    if mask.size == 0 or not mask.any():
+        return pd.DataFrame(columns=INTERVAL_COLUMNS)
+
+    # 上下补零后做差分: +1 为区间开始，-1 为区间结束 (不含)
+    padded = np.zeros((mask.shape[0] + 2, mask.shape[1]), dtype=np.int8)
+    padded[1:-1] = mask
+    edges = np.diff(padded, axis=0).T
+    start_col, start_row = np.nonzero(edges == 1)
+    _, end_row = np.nonzero(edges == -1)
+
+    # 每个区间内的峰值分数: 对按列展开的分数做 reduceat
+    flat = np.nan_to_num(scores, nan=0.0).T.ravel()
+    offsets = start_col * mask.shape[0]
+    bounds = np.empty(len(start_row) * 2, dtype=np.int64)
+    bounds[0::2] = offsets + start_row
+    bounds[1::2] = offsets + end_row
+    peaks = np.maximum.reduceat(np.append(flat, 0), bounds)[0::2]
+
+    return pd.DataFrame({
+        'column': np.asarray(columns)[start_col],
+        'method': method,
+        'start': times[start_row],
+        'end': times[end_row - 1],
+        'rows': end_row - start_row,
+        'peak_score': peaks,
+    })
+
+
+def detect_anomalies(df, columns=None, window=50, thresholds=None, methods=("zscore", "step")):
+    """
+    对整个 DataFrame 执行异常检测，返回按开始时间排序的区间表
+
+    thresholds: {method: 阈值}，未给出时使用 ANOMALY_METHODS 中的默认值
+    """
+    if df.empty or len(df) <= window:
+        return pd.DataFrame(columns=INTERVAL_COLUMNS)
+
+    thresholds = thresholds or {}
+    times = df['Timestamp'].to_numpy()
+    cols = _numeric_columns(df, columns)
+
+    frames = []
+    for b in range(0, len(cols), COLUMN_BLOCK):
+        block = cols[b:b + COLUMN_BLOCK]
+        scores = compute_scores(df[block].to_numpy(dtype=np.float64), window, methods)
+        for method, score in scores.items():
+            threshold = thresholds.get(method, ANOMALY_METHODS[method]["default_threshold"])
+            with np.errstate(invalid='ignore'):
+                flags = score > threshold
+            frames.append(extract_intervals(flags, times, score, method, block))
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=INTERVAL_COLUMNS)
+    return pd.concat(frames, ignore_index=True).sort_values(['start', 'column']).reset_index(drop=True)
+
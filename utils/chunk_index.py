@@ -0,0 +1,357 @@
+"""
+时间分块索引模块
+将解析后的 DataFrame 按时间切分为若干块，并维护每块的 min/max 时间戳索引，
+使时间窗口查询、快照定位和统计只触碰与请求范围重叠的块
+
+很少变化的阶跃通道 (模式、设定值等) 不放在块中，而是整列游程编码 (见 utils.rle):
+查询时按行号二分展开，快照与统计直接在游程上计算
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.log_parser import TIME_COLUMNS
+from utils.rle import RunLengthColumn, detect_step_columns
+
+
+# 每块的目标行数 (按时间跨度均分，实际行数随采样密度浮动)
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+class ChunkedLog:
+    """按时间分块存储的日志数据"""
+
+    def __init__(self, chunks, columns, fingerprint=None, steps=None):
+        self.chunks = chunks
+        self.fingerprint = fingerprint  # 数据指纹，供下游缓存作为键
+        self.columns = columns
+        self.value_columns = [c for c in columns if c not in TIME_COLUMNS]
+        self.steps = steps or {}        # 阶跃通道 → RunLengthColumn (不在块中存放)
+        self.dense_columns = [c for c in self.value_columns if c not in self.steps]
+        self.chunk_min = np.array([c['Timestamp'].iloc[0] for c in chunks], dtype=float)
+        self.chunk_max = np.array([c['Timestamp'].iloc[-1] for c in chunks], dtype=float)
+        self.chunk_rows = np.array([len(c) for c in chunks], dtype=np.int64)
+        self.chunk_offsets = np.r_[0, np.cumsum(self.chunk_rows)].astype(np.int64)   # 各块首行的全局行号
+        self._row_index = pd.Index(self.columns)      # nearest_row 复用，避免每次重建索引
+        self._chunk_stats = [self._summarize(c, self.dense_columns) for c in chunks]
+        self.min_step = self._compute_min_step()
+
+    @classmethod
+    def from_dataframe(cls, df, chunk_rows=DEFAULT_CHUNK_ROWS, fingerprint=None, rle=True):
+        """
+        按时间跨度切分 DataFrame (要求 Timestamp 已排序)
+        rle: 检测阶跃通道并游程编码 (不进入分块)
+        """
+        if df.empty:
+            return cls([], list(df.columns), fingerprint)
+
+        steps = {}
+        if rle:
+            value_cols = [c for c in df.columns if c not in TIME_COLUMNS]
+            times = df['Timestamp'].to_numpy(dtype=float)
+            steps = {c: RunLengthColumn.encode(times, df[c].to_numpy()) for c in detect_step_columns(df, value_cols)}
+        columns = list(df.columns)
+        if steps:
+            df = df.drop(columns=list(steps))
+
+        times = df['Timestamp'].to_numpy(dtype=float)
+        n_chunks = max(1, int(np.ceil(len(df) / chunk_rows)))
+        t_min, t_max = times[0], times[-1]
+
+        if n_chunks == 1 or t_max <= t_min:
+            bounds = [0, len(df)]
+        else:
+            # 等时间跨度的边界，再用二分查找映射为行号
+            edges = np.linspace(t_min, t_max, n_chunks + 1)[1:-1]
+            bounds = [0, *np.searchsorted(times, edges, side='left').tolist(), len(df)]
+
+        chunks = [
+            df.iloc[start:end].reset_index(drop=True)
+            for start, end in zip(bounds[:-1], bounds[1:])
+            if end > start
+        ]
+        return cls(chunks, columns, fingerprint, steps)
+
+    @property
+    def empty(self):
+        return len(self.chunks) == 0
+
+    @property
+    def time_range(self):
+        """整体时间范围 (min, max)"""
+        if self.empty:
+            return 0.0, 0.0
+        return float(self.chunk_min[0]), float(self.chunk_max[-1])
+
+    def __len__(self):
+        return int(self.chunk_rows.sum())
+
+    @property
+    def nbytes(self):
+        """各块与游程编码占用的内存 (字节)"""
+        chunk_bytes = sum(c.memory_usage(index=True, deep=True).sum() for c in self.chunks)
+        return int(chunk_bytes + sum(r.nbytes for r in self.steps.values()))
+
+    def step_report(self, payload_rows=None):
+        """
+        各阶跃通道的节省情况: 游程数、整列/编码后内存，以及趋势图负载点数
+        payload_rows: 趋势图中整列绘制时的点数 (默认为总行数)
+        """
+        rows = []
+        for col, runs in self.steps.items():
+            dense_points = runs.n_rows if payload_rows is None else payload_rows
+            rows.append({
+                'column': col,
+                'rows': runs.n_rows,
+                'runs': len(runs),
+                'dense_KB': round(runs.dense_nbytes / 1024, 1),
+                'rle_KB': round(runs.nbytes / 1024, 1),
+                'memory_saving': f"{1 - runs.nbytes / max(runs.dense_nbytes, 1):.1%}",
+                'dense_points': dense_points,
+                'step_points': len(runs) + 1,
+            })
+        return pd.DataFrame(rows)
+
+    def step_window(self, key, t_start, t_end):
+        """阶跃通道在时间窗口内的变化点 (times, values)，供阶梯线绘制"""
+        return self.steps[key].window(t_start, t_end)
+
+    def overlapping_chunks(self, t_start, t_end):
+        """返回与 [t_start, t_end] 重叠的块序号范围 (first, last+1)"""
+        first = int(np.searchsorted(self.chunk_max, t_start, side='left'))
+        last = int(np.searchsorted(self.chunk_min, t_end, side='right'))
+        return first, max(first, last)
+
+    def query(self, t_start=None, t_end=None, columns=None):
+        """查询时间窗口内的数据，只拼接重叠的块"""
+        if self.empty:
+            return pd.DataFrame(columns=columns or self.columns)
+
+        cols = self._select_columns(columns)
+        parts = list(self.iter_chunks(t_start, t_end, columns))
+        if not parts:
+            return pd.DataFrame(columns=cols or self.columns)
+        return pd.concat(parts, ignore_index=True)
+
+    def _dense_selection(self, cols):
+        """列子集中存放在块里的部分"""
+        if cols is None:
+            return None
+        return [c for c in cols if c not in self.steps]
+
+    def _with_steps(self, part, rows, cols):
+        """为块中取出的行补上阶跃通道 (按全局行号二分查找游程)，列顺序与原始数据一致"""
+        wanted = list(self.steps) if cols is None else [c for c in cols if c in self.steps]
+        if not wanted:
+            return part
+        part = part.assign(**{c: self.steps[c].at_rows(rows) for c in wanted})
+        order = cols if cols is not None else self.columns
+        return part[[c for c in order if c in part.columns]]
+
+    def iter_chunks(self, t_start=None, t_end=None, columns=None):
+        """逐块产出时间窗口内的数据 (不拼接)，供导出等流式消费"""
+        if self.empty:
+            return
+
+        lo, hi = self.time_range
+        t_start = lo if t_start is None else t_start
+        t_end = hi if t_end is None else t_end
+        first, last = self.overlapping_chunks(t_start, t_end)
+        cols = self._select_columns(columns)
+        dense = self._dense_selection(cols)
+
+        for ci in range(first, last):
+            chunk = self.chunks[ci]
+            times = chunk['Timestamp'].to_numpy(dtype=float)
+            start = int(np.searchsorted(times, t_start, side='left'))
+            end = int(np.searchsorted(times, t_end, side='right'))
+            if end > start:
+                part = chunk.iloc[start:end]
+                part = part[dense] if dense else part
+                offset = self.chunk_offsets[ci]
+                yield self._with_steps(part, np.arange(offset + start, offset + end), cols)
+
+    def empty_frame(self, columns=None):
+        """零行的 DataFrame (列与类型同 iter_chunks 的输出)，窗口内没有数据时供导出写出表头 / schema"""
+        cols = self._select_columns(columns)
+        if self.empty:
+            return pd.DataFrame(columns=cols or self.columns)
+        dense = self._dense_selection(cols)
+        part = self.chunks[0].iloc[:0]
+        part = part[dense] if dense else part
+        return self._with_steps(part, np.arange(0), cols)
+
+    def take(self, positions, columns=None):
+        """按全局行号取行 (行号为各块依次拼接后的位置，需有序)"""
+        cols = self._select_columns(columns)
+        dense = self._dense_selection(cols)
+        positions = np.asarray(positions, dtype=np.int64)
+        bounds = self.chunk_offsets
+        chunk_ids = np.searchsorted(bounds, positions, side='right') - 1
+        parts = []
+        rows = []
+        for ci in np.unique(chunk_ids):
+            if 0 <= ci < len(self.chunks):
+                chunk = self.chunks[ci] if dense is None else self.chunks[ci][dense]
+                picked = positions[chunk_ids == ci]
+                parts.append(chunk.iloc[picked - bounds[ci]])
+                rows.append(picked)
+        if not parts:
+            return pd.DataFrame(columns=cols if cols else self.columns)
+        return self._with_steps(pd.concat(parts, ignore_index=True), np.concatenate(rows), cols)
+
+    @staticmethod
+    def _select_columns(columns):
+        """列子集总是带上 Timestamp"""
+        if columns is None:
+            return None
+        return ['Timestamp'] + [c for c in columns if c != 'Timestamp']
+
+    def nearest_row(self, t):
+        """二分查找距离 t 最近的一行"""
+        if self.empty:
+            return None
+
+        # 先定位块，再在块内二分
+        idx = int(np.searchsorted(self.chunk_max, t, side='left'))
+        candidates = []
+        for ci in (idx - 1, idx):
+            if 0 <= ci < len(self.chunks):
+                times = self.chunks[ci]['Timestamp'].to_numpy(dtype=float)
+                pos = int(np.searchsorted(times, t))
+                for p in (pos - 1, pos):
+                    if 0 <= p < len(times):
+                        candidates.append((abs(times[p] - t), ci, p))
+
+        _, ci, p = min(candidates)
+        row = self.chunks[ci].iloc[p]
+        if not self.steps:
+            return row
+        # 阶跃通道: 在游程上二分查找该行所在的段
+        position = self.chunk_offsets[ci] + p
+        values = row.to_dict()
+        values.update({c: float(r.at_rows(position)) for c, r in self.steps.items()})
+        return pd.Series(np.array([values[c] for c in self.columns], dtype=row.dtype),
+                         index=self._row_index, name=row.name)
+
+    def get_statistics(self, t_start=None, t_end=None, columns=None):
+        """
+        时间窗口统计，格式与 LogParser.get_statistics 一致
+        完整覆盖的块直接复用预计算的分块汇总，只有边缘块需要重新计算
+        """
+        if self.empty:
+            return {}
+
+        lo, hi = self.time_range
+        t_start = lo if t_start is None else t_start
+        t_end = hi if t_end is None else t_end
+        value_cols = self.value_columns
+        if columns is not None:
+            value_cols = [c for c in value_cols if c in columns]
+        if not value_cols:
+            return {}
+        stats = self._dense_statistics(t_start, t_end, [c for c in value_cols if c not in self.steps])
+        step_cols = [c for c in value_cols if c in self.steps]
+        if step_cols:
+            r0, r1 = self._row_range(t_start, t_end)
+            for col in step_cols:
+                s = self.steps[col].row_summary(r0, r1)
+                if s['n'] == 0:
+                    continue
+                std = np.sqrt(s['m2'] / (s['n'] - 1)) if s['n'] > 1 else np.nan
+                stats[col] = {'mean': s['mean'], 'std': std, 'min': s['min'], 'max': s['max'],
+                              'range': s['max'] - s['min']}
+        return {c: stats[c] for c in value_cols if c in stats}
+
+    def _row_range(self, t_start, t_end):
+        """时间窗口对应的全局行号区间 [r0, r1)"""
+        first, last = self.overlapping_chunks(t_start, t_end)
+        if last <= first:
+            return 0, 0
+        head = self.chunks[first]['Timestamp'].to_numpy(dtype=float)
+        tail = self.chunks[last - 1]['Timestamp'].to_numpy(dtype=float)
+        r0 = self.chunk_offsets[first] + int(np.searchsorted(head, t_start, side='left'))
+        r1 = self.chunk_offsets[last - 1] + int(np.searchsorted(tail, t_end, side='right'))
+        return int(r0), int(r1)
+
+    def _dense_statistics(self, t_start, t_end, value_cols):
+        """块中存放的列的窗口统计"""
+        if not value_cols:
+            return {}
+        sel = [self.dense_columns.index(c) for c in value_cols]
+
+        first, last = self.overlapping_chunks(t_start, t_end)
+        summaries = []
+        for ci in range(first, last):
+            if self.chunk_min[ci] >= t_start and self.chunk_max[ci] <= t_end:
+                # 完整覆盖: 直接取预计算汇总的对应列
+                summary = self._chunk_stats[ci]
+                summaries.append({k: (v if k == 'n' else v[sel]) for k, v in summary.items()})
+            else:
+                chunk = self.chunks[ci]
+                times = chunk['Timestamp'].to_numpy(dtype=float)
+                start = int(np.searchsorted(times, t_start, side='left'))
+                end = int(np.searchsorted(times, t_end, side='right'))
+                if end > start:
+                    summaries.append(self._summarize(chunk.iloc[start:end], value_cols))
+
+        summaries = [s for s in summaries if s['n'] > 0]
+        if not summaries:
+            return {}
+
+        n, mean, m2, vmin, vmax = self._combine(summaries)
+        std = np.sqrt(m2 / (n - 1)) if n > 1 else np.full_like(mean, np.nan)
+
+        return {
+            col: {
+                'mean': mean[i], 'std': std[i],
+                'min': vmin[i], 'max': vmax[i],
+                'range': vmax[i] - vmin[i]
+            }
+            for i, col in enumerate(value_cols)
+        }
+
+    @staticmethod
+    def _summarize(chunk, value_cols):
+        """单块汇总: 行数 / 均值 / 离差平方和 / 最小 / 最大 (按列向量化)"""
+        values = chunk[value_cols].to_numpy(dtype=float)
+        n = len(values)
+        if n == 0:
+            empty = np.zeros(values.shape[1])
+            return {'n': 0, 'mean': empty, 'm2': empty, 'min': empty, 'max': empty}
+        mean = values.mean(axis=0)
+        return {
+            'n': n,
+            'mean': mean,
+            'm2': ((values - mean) ** 2).sum(axis=0),
+            'min': values.min(axis=0),
+            'max': values.max(axis=0),
+        }
+
+    @staticmethod
+    def _combine(summaries):
+        """合并分块汇总 (Chan 并行方差公式)"""
+        n = summaries[0]['n']
+        mean = summaries[0]['mean'].copy()
+        m2 = summaries[0]['m2'].copy()
+        vmin = summaries[0]['min'].copy()
+        vmax = summaries[0]['max'].copy()
+        for s in summaries[1:]:
+            total = n + s['n']
+            delta = s['mean'] - mean
+            mean = mean + delta * s['n'] / total
+            m2 = m2 + s['m2'] + delta ** 2 * n * s['n'] / total
+            vmin = np.minimum(vmin, s['min'])
+            vmax = np.maximum(vmax, s['max'])
+            n = total
+        return n, mean, m2, vmin, vmax
+
+    def _compute_min_step(self):
+        """最小正时间间隔 (用于快照滑块步长)"""
+        steps = []
+        for chunk in self.chunks:
+            diffs = np.diff(chunk['Timestamp'].to_numpy(dtype=float))
+            diffs = diffs[diffs > 0]
+            if len(diffs):
+                steps.append(diffs.min())
+        return max(float(min(steps)) if steps else 0.1, 1e-3)
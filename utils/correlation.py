@@ -0,0 +1,157 @@
+"""
+相关性与时滞分析模块
+- 一次 NumPy 调用计算全部数值列的 Pearson 相关矩阵
+- 基于 FFT 的互相关估计通道间时滞，以及主/参考日志之间的时间偏移
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _value_columns(df, columns=None):
+    cols = columns if columns is not None else df.columns
+    return [c for c in cols if c != 'Timestamp' and pd.api.types.is_numeric_dtype(df[c])]
+
+
+def correlation_matrix(df, columns=None):
+    """
+    Pearson 相关矩阵
+    返回 (列名列表, 矩阵)；常数列对应的行列为 NaN
+    """
+    cols = _value_columns(df, columns)
+    if len(cols) < 2 or len(df) < 2:
+        return cols, np.full((len(cols), len(cols)), np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        matrix = np.corrcoef(df[cols].to_numpy(dtype=float), rowvar=False)
+    return cols, np.atleast_2d(matrix)
+
+
+def uniform_series(times, values, dt=None):
+    """
+    将不规则采样插值到等间隔网格 (互相关要求均匀采样)
+    values 可以是一维或 (行, 列) 二维数组；dt 默认取时间间隔的中位数
+    返回 (网格, 插值后的数组 (列, 网格))
+    """
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+
+    if dt is None:
+        diffs = np.diff(times)
+        diffs = diffs[diffs > 0]
+        dt = float(np.median(diffs)) if len(diffs) else 1.0
+
+    grid = np.arange(times[0], times[-1] + dt / 2, dt)
+    resampled = np.stack([np.interp(grid, times, values[:, i]) for i in range(values.shape[1])])
+    return grid, resampled
+
+
+def _normalize(x):
+    """去均值并按标准差归一化 (沿最后一维)，使互相关峰值落在 [-1, 1]"""
+    x = x - x.mean(axis=-1, keepdims=True)
+    std = x.std(axis=-1, keepdims=True)
+    return np.divide(x, std, out=np.zeros_like(x), where=std > 0)
+
+
+def fft_cross_correlation(a, b):
+    """
+    批量 FFT 互相关
+
+    a: (n,) 基准序列；b: (k, m) 或 (m,) 待比较序列
+    返回 (lags, corr)，lags 为样本偏移 (-(m-1) .. n-1)，corr 形状 (k, len(lags))；
+    corr 在 lag = L 处的峰值表示 b 向后平移 L 个样本后与 a 最相似
+    """
+    a = _normalize(np.asarray(a, dtype=float))
+    b = _normalize(np.atleast_2d(np.asarray(b, dtype=float)))
+    n, m = a.shape[-1], b.shape[-1]
+    size = 1 << int(np.ceil(np.log2(n + m - 1)))
+
+    fa = np.fft.rfft(a, size)
+    fb = np.fft.rfft(b, size, axis=-1)
+    raw = np.fft.irfft(fa * np.conj(fb), size, axis=-1)
+
+    # 循环结果重排为 -(m-1) .. n-1
+    corr = np.concatenate([raw[:, size - (m - 1):], raw[:, :n]], axis=-1) if m > 1 else raw[:, :n]
+    lags = np.arange(-(m - 1), n)
+
+    # 无偏归一化: 除以每个时滞下的实际重叠样本数
+    overlap = np.minimum(n, m + lags) - np.maximum(0, lags)
+    return lags, corr / np.maximum(overlap, 1)
+
+
+def _peak_lag(lags, corr, max_lag_samples=None):
+    """
+    在允许的时滞范围内找互相关峰值
+    默认只搜索 ±(较短序列长度 / 2)，重叠过少的边缘时滞估计不可靠
+    """
+    if max_lag_samples is None:
+        max_lag_samples = (min(-lags[0] + 1, lags[-1] + 1)) // 2
+    keep = np.abs(lags) <= max_lag_samples
+    lags, corr = lags[keep], corr[..., keep]
+    idx = np.argmax(corr, axis=-1)
+    return lags[idx], np.take_along_axis(corr, idx[..., None], axis=-1)[..., 0]
+
+
+def lag_analysis(df, reference, columns=None, max_lag=None):
+    """
+    以 reference 通道为基准，估计其余所有数值通道的时滞
+    所有通道的 FFT 在一次批量调用中完成
+
+    返回 DataFrame: column / lag (时间单位) / peak_corr
+    lag > 0 表示该通道滞后于 reference
+    """
+    cols = [c for c in _value_columns(df, columns) if c != reference]
+    if not cols or len(df) < 4:
+        return pd.DataFrame(columns=['column', 'lag', 'peak_corr'])
+
+    times = df['Timestamp'].to_numpy(dtype=float)
+    grid, series = uniform_series(times, df[[reference] + cols].to_numpy(dtype=float))
+    dt = grid[1] - grid[0] if len(grid) > 1 else 1.0
+
+    lags, corr = fft_cross_correlation(series[0], series[1:])
+    max_lag_samples = int(max_lag / dt) if max_lag else None
+    best, peak = _peak_lag(lags, corr, max_lag_samples)
+
+    # corr 峰值在 L 处表示通道需后移 L 才能与基准对齐，即通道领先 L；取负号表示滞后量
+    return pd.DataFrame({
+        'column': cols,
+        'lag': -best * dt,
+        'peak_corr': peak,
+    }).sort_values('peak_corr', ascending=False).reset_index(drop=True)
+
+
+def estimate_offset(df_main, df_ref, keys, max_lag=None):
+    """
+    估计参考日志相对主日志的时间偏移
+
+    对每个共同参数做互相关并叠加 (多参数联合投票更稳健)
+    返回 (offset, score)：将参考日志 Timestamp 加上 offset 即与主日志对齐
+    """
+    keys = [k for k in keys if k in df_main.columns and k in df_ref.columns]
+    if not keys or len(df_main) < 4 or len(df_ref) < 4:
+        return 0.0, 0.0
+
+    t_main = df_main['Timestamp'].to_numpy(dtype=float)
+    t_ref = df_ref['Timestamp'].to_numpy(dtype=float)
+
+    # 两份日志使用相同的采样间隔
+    diffs = np.concatenate([np.diff(t_main), np.diff(t_ref)])
+    diffs = diffs[diffs > 0]
+    dt = float(np.median(diffs)) if len(diffs) else 1.0
+
+    grid_main, main = uniform_series(t_main, df_main[keys].to_numpy(dtype=float), dt)
+    grid_ref, ref = uniform_series(t_ref, df_ref[keys].to_numpy(dtype=float), dt)
+
+    total = None
+    for i in range(len(keys)):
+        lags, corr = fft_cross_correlation(main[i], ref[i])
+        total = corr[0] if total is None else total + corr[0]
+
+    max_lag_samples = int(max_lag / dt) if max_lag else None
+    best, peak = _peak_lag(lags, total[None, :], max_lag_samples)
+
+    # 参考序列后移 best 个样本与主序列对齐，再加上两条网格的起点差
+    offset = float(best[0] * dt + grid_main[0] - grid_ref[0])
+    return offset, float(peak[0] / len(keys))
@@ -0,0 +1,305 @@
+"""
+派生通道表达式模块
+在侧边栏写 `power = voltage * current` 这样的表达式，由已解析的参数计算新通道
+
+- 表达式用 ast 解析，只允许白名单内的节点 (算术/比较/逻辑运算、数字常量、参数名、白名单函数)，
+  不会执行任意 Python 代码
+- 求值时每个节点对应一次 NumPy 整列运算，没有逐行循环
+- 参数名不是合法标识符时用 col("名称") 引用；t 为时间戳 (秒)
+- 后面的表达式可以引用前面定义的派生通道
+- 结果中的 NaN/inf (如除零) 与解析结果一样前向填充，开头缺失处补 0
+"""
+
+import ast
+from functools import lru_cache, reduce
+
+import numpy as np
+import pandas as pd
+
+from utils.log_parser import TIME_COLUMNS
+
+
+class ExpressionError(ValueError):
+    """表达式语法错误、使用了不允许的写法或引用了不存在的参数"""
+
+
+def _rolling(func):
+    def apply(x, n):
+        window = int(n)
+        if window < 1:
+            raise ExpressionError("窗口长度必须为正整数")
+        return getattr(pd.Series(x).rolling(window, min_periods=1), func)().to_numpy()
+    return apply
+
+
+def _diff(x):
+    """相邻差分，首个点为 0"""
+    return np.diff(x, prepend=x[:1])
+
+
+def _deriv(x, t):
+    """对时间的导数 (每秒变化量)，时间相同的相邻点为 NaN (随后前向填充)"""
+    dt = np.diff(t, prepend=t[:1])
+    return _diff(x) / np.where(dt > 0, dt, np.nan)
+
+
+def _integral(x, t):
+    """对时间的累积梯形积分"""
+    area = (x[1:] + x[:-1]) * 0.5 * np.diff(t)
+    return np.concatenate([[0.0], np.cumsum(area)])
+
+
+def _shift(x, n):
+    return pd.Series(x).shift(int(n)).to_numpy()
+
+
+# 白名单函数: 名称 → (实现, 参数个数, 说明)；需要时间轴的函数由求值器补上 t
+FUNCTIONS = {
+    "abs": (np.abs, 1, "绝对值"),
+    "sqrt": (np.sqrt, 1, "平方根"),
+    "exp": (np.exp, 1, "指数"),
+    "log": (np.log, 1, "自然对数"),
+    "log10": (np.log10, 1, "常用对数"),
+    "sin": (np.sin, 1, "正弦"),
+    "cos": (np.cos, 1, "余弦"),
+    "tan": (np.tan, 1, "正切"),
+    "floor": (np.floor, 1, "向下取整"),
+    "ceil": (np.ceil, 1, "向上取整"),
+    "min": (np.minimum, 2, "逐点较小值"),
+    "max": (np.maximum, 2, "逐点较大值"),
+    "clip": (np.clip, 3, "限幅 clip(x, 下限, 上限)"),
+    "where": (np.where, 3, "条件选择 where(条件, 真值, 假值)"),
+    "diff": (_diff, 1, "相邻差分"),
+    "deriv": (_deriv, 1, "对时间求导 (每秒变化量)"),
+    "integral": (_integral, 1, "对时间累积积分"),
+    "cumsum": (np.cumsum, 1, "累加"),
+    "shift": (_shift, 2, "平移 n 个采样点"),
+    "ma": (_rolling("mean"), 2, "n 点滑动平均"),
+    "rolling_max": (_rolling("max"), 2, "n 点滑动最大值"),
+    "rolling_min": (_rolling("min"), 2, "n 点滑动最小值"),
+    "rolling_std": (_rolling("std"), 2, "n 点滑动标准差"),
+}
+
+# 沿时间轴计算的函数: 第一个参数必须是整列 (常量会先展开)
+SERIES_FUNCTIONS = {"diff", "deriv", "integral", "cumsum", "shift", "ma", "rolling_max", "rolling_min", "rolling_std"}
+
+# 需要把时间轴作为最后一个参数的函数
+TIME_FUNCTIONS = {"deriv", "integral"}
+
+# 第二个参数为采样点数的函数: 点数必须是整数常量 (校验时检查，求值时不会因非法点数出错)
+COUNT_FUNCTIONS = {"shift", "ma", "rolling_max", "rolling_min", "rolling_std"}
+MAX_COUNT = 10 ** 9
+
+CONSTANTS = {"pi": np.pi, "e": np.e}
+
+_BINARY = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide,
+    ast.FloorDiv: np.floor_divide, ast.Mod: np.mod, ast.Pow: np.power,
+    ast.BitAnd: np.logical_and, ast.BitOr: np.logical_or,
+}
+_UNARY = {ast.USub: np.negative, ast.UAdd: np.positive, ast.Not: np.logical_not, ast.Invert: np.logical_not}
+_COMPARE = {
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+
+
+class Expression:
+    """一条已校验的派生通道定义: name = expr"""
+
+    def __init__(self, source, name, node, columns):
+        self.source = source
+        self.name = name
+        self.node = node
+        self.columns = columns      # 引用的参数名 (不含 t 与常量)
+
+    def __repr__(self):
+        return f"Expression({self.source!r})"
+
+
+@lru_cache(maxsize=256)
+def compile_expression(source):
+    """解析并校验一行表达式，返回 Expression；不合法时抛出 ExpressionError"""
+    text = source.strip()
+    try:
+        tree = ast.parse(text, mode='exec')
+    except SyntaxError as e:
+        raise ExpressionError(f"语法错误: {e.msg}") from None
+    if len(tree.body) != 1 or not isinstance(tree.body[0], ast.Assign):
+        raise ExpressionError("格式应为 名称 = 表达式")
+    assign = tree.body[0]
+    if len(assign.targets) != 1 or not isinstance(assign.targets[0], ast.Name):
+        raise ExpressionError("等号左侧必须是一个通道名称")
+    name = assign.targets[0].id
+    if name in TIME_COLUMNS:
+        raise ExpressionError(f"不能覆盖时间列 {name}")
+
+    columns = []
+    _check(assign.value, columns)
+    return Expression(text, name, assign.value, tuple(dict.fromkeys(columns)))
+
+
+def _check(node, columns):
+    """白名单校验，同时收集引用的参数名"""
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"只支持数值常量: {node.value!r}")
+    elif isinstance(node, ast.Name):
+        if node.id not in CONSTANTS and node.id != "t":
+            columns.append(node.id)
+    elif isinstance(node, ast.BinOp):
+        if type(node.op) not in _BINARY:
+            raise ExpressionError(f"不支持的运算符: {type(node.op).__name__}")
+        _check(node.left, columns)
+        _check(node.right, columns)
+    elif isinstance(node, ast.UnaryOp):
+        if type(node.op) not in _UNARY:
+            raise ExpressionError(f"不支持的运算符: {type(node.op).__name__}")
+        _check(node.operand, columns)
+    elif isinstance(node, ast.BoolOp):
+        for value in node.values:
+            _check(value, columns)
+    elif isinstance(node, ast.Compare):
+        if any(type(op) not in _COMPARE for op in node.ops):
+            raise ExpressionError("不支持的比较运算")
+        _check(node.left, columns)
+        for comparator in node.comparators:
+            _check(comparator, columns)
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise ExpressionError("只能调用内置函数，且不支持关键字参数")
+        func = node.func.id
+        if func == "col":
+            if len(node.args) != 1 or not isinstance(node.args[0], ast.Constant) \
+                    or not isinstance(node.args[0].value, str):
+                raise ExpressionError('col() 的参数必须是参数名字符串，如 col("10")')
+            columns.append(node.args[0].value)
+            return
+        if func not in FUNCTIONS:
+            raise ExpressionError(f"未知函数: {func}")
+        if len(node.args) != FUNCTIONS[func][1]:
+            raise ExpressionError(f"{func}() 需要 {FUNCTIONS[func][1]} 个参数")
+        for arg in node.args:
+            _check(arg, columns)
+        if func in COUNT_FUNCTIONS:
+            _check_count(func, node.args[1])
+    else:
+        raise ExpressionError(f"不支持的写法: {type(node).__name__}")
+
+
+def _check_count(func, node):
+    """shift / 滑动窗口函数的点数参数: 整数常量 (shift 可带负号)，且不超过 MAX_COUNT"""
+    sign = 1
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        sign = -1 if isinstance(node.op, ast.USub) else 1
+        node = node.operand
+    value = node.value if isinstance(node, ast.Constant) else None
+    if not isinstance(value, (int, float)) or isinstance(value, bool) \
+            or (isinstance(value, float) and not value.is_integer()):
+        raise ExpressionError(f"{func}() 的点数必须是整数常量")
+    count = sign * int(value)
+    if abs(count) > MAX_COUNT:
+        raise ExpressionError(f"{func}() 的点数不能超过 {MAX_COUNT}")
+    if func != "shift" and count < 1:
+        raise ExpressionError(f"{func}() 的窗口长度必须为正整数")
+
+
+def evaluate(expression, df):
+    """
+    在 DataFrame 上求值，返回与 df 等长的 float64 数组
+    引用的参数不存在时抛出 ExpressionError
+    """
+    missing = [c for c in expression.columns if c not in df.columns]
+    if missing:
+        raise ExpressionError(f"未知参数: {', '.join(missing)}")
+
+    env = {c: df[c].to_numpy(dtype=float) for c in expression.columns}
+    times = df['Timestamp'].to_numpy(dtype=float)
+    with np.errstate(all='ignore'):
+        result = _eval(expression.node, env, times)
+    result = np.broadcast_to(np.asarray(result, dtype=float), (len(df),))
+
+    # 与解析结果一致: 非有限值前向填充，开头缺失补 0
+    result = pd.Series(result).where(np.isfinite(result)).ffill().fillna(0.0)
+    return result.to_numpy()
+
+
+def _eval(node, env, times):
+    if isinstance(node, ast.Constant):
+        return float(node.value)
+    if isinstance(node, ast.Name):
+        if node.id in env:
+            return env[node.id]
+        if node.id == "t":
+            return times
+        return CONSTANTS[node.id]
+    if isinstance(node, ast.BinOp):
+        return _BINARY[type(node.op)](_eval(node.left, env, times), _eval(node.right, env, times))
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY[type(node.op)](_eval(node.operand, env, times))
+    if isinstance(node, ast.BoolOp):
+        func = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        return reduce(func, [_eval(v, env, times) for v in node.values])
+    if isinstance(node, ast.Compare):
+        # a < b < c → (a < b) & (b < c)
+        left = _eval(node.left, env, times)
+        result = True
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _eval(comparator, env, times)
+            result = np.logical_and(result, _COMPARE[type(op)](left, right))
+            left = right
+        return result
+    # ast.Call (已校验)
+    func = node.func.id
+    if func == "col":
+        return env[node.args[0].value]
+    args = [_eval(arg, env, times) for arg in node.args]
+    if func in SERIES_FUNCTIONS:
+        args[0] = np.broadcast_to(np.asarray(args[0], dtype=float), times.shape)
+    if func in TIME_FUNCTIONS:
+        args.append(times)
+    return FUNCTIONS[func][0](*args)
+
+
+def parse_definitions(text):
+    """
+    侧边栏文本 → (有效的表达式文本列表, [(行号, 错误信息)])
+    空行与 # 开头的注释行忽略；同名通道后定义的覆盖先定义的
+    """
+    sources = []
+    errors = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            compile_expression(line)
+        except ExpressionError as e:
+            errors.append((lineno, str(e)))
+            continue
+        sources.append(line)
+    return sources, errors
+
+
+def add_derived(df, sources):
+    """
+    依次计算派生通道并追加到 df 的副本 (不依赖 Streamlit，供工作进程/命令行使用)
+    返回 (df, [(表达式, 错误信息)])
+    """
+    if df.empty or not sources:
+        return df, []
+    df = df.copy()
+    errors = []
+    for source in sources:
+        expression = compile_expression(source)
+        try:
+            df[expression.name] = evaluate(expression, df)
+        except ExpressionError as e:
+            errors.append((source, str(e)))
+    return df, errors
+
+
+def function_help():
+    """函数列表说明 (Markdown)"""
+    lines = [f"- `{name}()`: {desc}" for name, (_, _, desc) in FUNCTIONS.items()]
+    return "\n".join(lines)
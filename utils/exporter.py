@@ -0,0 +1,142 @@
+"""
+数据导出模块
+将解析后的 DataFrame 写出为 CSV / gzip-CSV / Parquet / Feather
+
+所有格式都按块写出: CSV 逐块追加，Parquet 每块一个 row group，
+Feather 每块一个 record batch，不需要先把所有块拼接成一个 DataFrame。
+没有数据块时按给出的零行表写出表头 / schema，不会生成空文件。
+Parquet 与 Feather 依赖 pyarrow (可选依赖)，未安装时给出明确提示。
+"""
+
+import gzip
+import io
+from pathlib import Path
+
+
+# 导出格式定义: 文件后缀与说明
+EXPORT_FORMATS = {
+    "csv": {"suffix": ".csv", "name": "CSV", "mime": "text/csv"},
+    "csv.gz": {"suffix": ".csv.gz", "name": "CSV (gzip)", "mime": "application/gzip"},
+    "parquet": {"suffix": ".parquet", "name": "Parquet", "mime": "application/vnd.apache.parquet"},
+    "feather": {"suffix": ".feather", "name": "Feather", "mime": "application/octet-stream"},
+}
+
+# 单个 DataFrame 导出时的分块行数
+EXPORT_CHUNK_ROWS = 50_000
+
+
+def has_pyarrow():
+    """检查列式格式所需的 pyarrow 是否可用"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_formats():
+    """当前环境可用的导出格式"""
+    if has_pyarrow():
+        return list(EXPORT_FORMATS)
+    return [f for f in EXPORT_FORMATS if f.startswith("csv")]
+
+
+def split_frame(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """将 DataFrame 切成若干行块 (视图，不复制)"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _check_format(fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    if fmt in ("parquet", "feather") and not has_pyarrow():
+        raise RuntimeError(f"{EXPORT_FORMATS[fmt]['name']} 导出需要安装 pyarrow: pip install pyarrow")
+
+
+def _or_empty(frames, empty):
+    """frames 没有产出任何块时改为产出 empty (零行表)，保证写出表头 / schema"""
+    written = False
+    for frame in frames:
+        written = True
+        yield frame
+    if not written and empty is not None:
+        yield empty
+
+
+def _write_csv(frames, fileobj):
+    """逐块写 CSV，只有第一块带表头"""
+    header = True
+    for frame in frames:
+        fileobj.write(frame.to_csv(index=False, header=header).encode("utf-8"))
+        header = False
+
+
+def _write_arrow(frames, fileobj, fmt):
+    """逐块写 Parquet (row group) / Feather (record batch)，以第一块的 schema 为准"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                if fmt == "parquet":
+                    writer = pq.ParquetWriter(fileobj, schema)
+                else:
+                    writer = pa.ipc.new_file(fileobj, schema)
+            else:
+                table = table.cast(schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_frames(frames, fileobj, fmt="csv", empty=None):
+    """
+    将 DataFrame 块序列写入二进制文件对象
+    frames 可以是生成器 (如 ChunkedLog.iter_chunks)，不会整体拼接
+    empty: 零行的 DataFrame，frames 为空 (如时间窗口内没有数据) 时用于写出表头 / schema
+    """
+    _check_format(fmt)
+    frames = _or_empty(frames, empty)
+
+    if fmt == "csv":
+        _write_csv(frames, fileobj)
+    elif fmt == "csv.gz":
+        with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+            _write_csv(frames, gz)
+    else:
+        _write_arrow(frames, fileobj, fmt)
+
+
+def export_stream(frames, fmt="csv", empty=None):
+    """
+    按块写出并返回文件内容 (bytes)，供下载按钮的 data 回调使用
+    下载按钮最终需要完整的 bytes，因此直接在内存缓冲中生成
+    """
+    buffer = io.BytesIO()
+    write_frames(frames, buffer, fmt, empty)
+    return buffer.getvalue()
+
+
+def export_frame(df, path, fmt="csv"):
+    """
+    将 DataFrame 写入文件，返回写出的文件路径
+    path 不带后缀时按格式自动补全
+    """
+    _check_format(fmt)
+
+    path = Path(path)
+    suffix = EXPORT_FORMATS[fmt]["suffix"]
+    if not path.name.endswith(suffix):
+        path = path.with_name(path.name + suffix)
+
+    with open(path, "wb") as f:
+        write_frames(split_frame(df), f, fmt, empty=df.iloc[:0])
+
+    return path
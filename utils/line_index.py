@@ -0,0 +1,78 @@
+"""
+原始日志行偏移索引
+解析时记录每行起始字节偏移 (紧凑的 uint32/uint64 数组)，查看原始日志时
+只按偏移 seek + read 当前页的几百行，不需要把整个文件放进页面
+
+同时保存 记录时间 → 源行号 的映射，图表上点击某个时刻即可跳转到对应的日志行
+"""
+
+import numpy as np
+
+
+# 扫描换行符时每次处理的字节数 (限制临时布尔数组的大小)
+SCAN_BLOCK = 64 * 1024 * 1024
+
+
+class LineIndex:
+    """行偏移索引: offsets[i] 为第 i 行 (从 0 开始) 的起始字节偏移，最后附加文件长度"""
+
+    def __init__(self, offsets):
+        self.offsets = offsets
+        self.record_times = np.array([], dtype=float)   # 按时间排序的记录时间
+        self.record_lines = np.array([], dtype=np.int64)
+
+    @classmethod
+    def from_bytes(cls, raw, block=SCAN_BLOCK):
+        """按块扫描换行符构建索引 (向量化，不切分文本)"""
+        size = len(raw)
+        dtype = np.uint32 if size < 2 ** 32 else np.uint64
+        data = np.frombuffer(raw, dtype=np.uint8)
+        parts = [np.zeros(1, dtype=dtype)]
+        for start in range(0, size, block):
+            newlines = np.flatnonzero(data[start:start + block] == 10)
+            parts.append((newlines + start + 1).astype(dtype))
+        offsets = np.concatenate(parts)
+        # 文件以换行结尾时最后一个偏移即文件末尾；否则补上文件长度作为末行的结束位置
+        if offsets[-1] != size:
+            offsets = np.append(offsets, np.array(size, dtype=dtype))
+        return cls(offsets)
+
+    @property
+    def line_count(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.record_times.nbytes + self.record_lines.nbytes
+
+    def attach_records(self, times, lines):
+        """
+        记录解析结果与源行的对应关系
+        times: 各记录的时间戳 (秒，解析顺序，无时间戳为 NaN)；lines: 各记录所在行号
+        """
+        times = np.asarray(times, dtype=float)
+        lines = np.asarray(lines, dtype=np.int64)
+        valid = ~np.isnan(times)
+        times, lines = times[valid], lines[valid]
+        order = np.argsort(times, kind='stable')
+        self.record_times = times[order]
+        self.record_lines = lines[order]
+
+    def line_for_time(self, t):
+        """时间 t 处 (首个不早于 t 的记录) 所在的行号；没有记录时返回 None"""
+        if len(self.record_times) == 0:
+            return None
+        pos = min(int(np.searchsorted(self.record_times, t, side='left')), len(self.record_times) - 1)
+        return int(self.record_lines[pos])
+
+    def read_lines(self, fileobj, first, count):
+        """从可 seek 的文件对象读取 [first, first + count) 行，返回解码后的行列表"""
+        first = max(0, min(first, self.line_count))
+        last = min(first + count, self.line_count)
+        if last <= first:
+            return []
+        start, end = int(self.offsets[first]), int(self.offsets[last])
+        fileobj.seek(start)
+        text = fileobj.read(end - start).decode("utf-8", errors='replace')
+        lines = text.split('\n')
+        return lines[:last - first]
@@ -0,0 +1,230 @@
+"""
+日志语法 (格式插件) 模块
+每种日志格式声明自己的时间戳语法与键值对语法，编译为一条合并的预编译正则:
+
+    (?:时间戳) | (?:键值对)
+
+解析时每行只需一次 findall 即可同时取出时间戳和全部键值对，
+时间戳被整体消费，不会再被误识别为键值对 (如 "10:00:00")。
+
+日期时间类时间戳 (ts_kind="datetime") 在逐行循环中只保留原始文本，
+解析结束后整列一次性转换: 以第一个值推断格式并缓存，再向量化 to_datetime。
+
+每种语法还附带一条只捕获参数名的 "发现" 正则 (key_pattern)，
+对整块文本一次 findall 即可列出全部参数名，不需要逐行循环 (见 LogParser.discover_keys)。
+
+新增格式:
+    register_grammar(LogGrammar("my_fmt", "我的格式", timestamp=..., pair=..., ts_convert=...))
+"""
+
+import re
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+
+# 通用片段
+NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+UNIT = r'[A-Za-z%°µ/]+'
+
+
+def _numeric_ts(raw):
+    """方括号内的纯数字时间戳 (秒)"""
+    return float(raw)
+
+
+def _epoch_ms_ts(raw):
+    """毫秒级 Unix 时间戳 → 秒"""
+    return int(raw) / 1000.0
+
+
+# 时间格式缓存: 数字替换为 0 后的 "形状" → strftime 格式
+_FORMAT_CACHE = {}
+_DIGITS = re.compile(r'\d')
+
+_EPOCH = pd.Timestamp(0)
+
+
+def infer_datetime_format(sample):
+    """推断时间字符串的格式；同一形状的字符串只推断一次"""
+    shape = _DIGITS.sub('0', sample)
+    if shape not in _FORMAT_CACHE:
+        _FORMAT_CACHE[shape] = guess_datetime_format(sample)
+    return _FORMAT_CACHE[shape]
+
+
+def parse_datetimes(values):
+    """
+    批量解析时间字符串
+    以第一个非空值推断格式，整列一次 to_datetime；与该格式不符的值回退到 ISO 8601 解析
+    带时区的时间统一换算到 UTC 后去掉时区
+
+    返回 (datetime64[ns] Series, 解析失败个数)
+    """
+    raw = pd.Series(values, dtype=object)
+    present = raw.notna()
+    if not present.any():
+        return pd.Series(pd.NaT, index=raw.index, dtype='datetime64[ns]'), 0
+
+    text = raw.str.replace(',', '.', regex=False)  # 08:15:02,123 → 08:15:02.123
+    fmt = infer_datetime_format(text[present].iloc[0]) or 'ISO8601'
+    parsed = pd.to_datetime(text, format=fmt, errors='coerce', utc=True)
+
+    retry = parsed.isna() & present
+    if retry.any():
+        parsed[retry] = pd.to_datetime(text[retry], format='ISO8601', errors='coerce', utc=True)
+
+    parsed = parsed.dt.tz_localize(None).astype('datetime64[ns]')
+    return parsed, int((parsed.isna() & present).sum())
+
+
+def datetimes_to_seconds(times):
+    """datetime64 → Unix 秒 (float64，NaT → NaN)，供数值时间轴使用"""
+    return (times - _EPOCH).dt.total_seconds()
+
+
+def seconds_to_datetimes(seconds):
+    """Unix 秒 → datetime64 (datetimes_to_seconds 的逆运算，用于显示降采样后的时间轴)"""
+    return pd.to_datetime(pd.Series(seconds, dtype=float), unit='s')
+
+
+class LogGrammar:
+    """
+    一种日志格式
+
+    timestamp: 时间戳正则，必须包含命名组 ts (可为 None 表示无时间戳)
+    pair: 键值对正则，必须包含命名组 key / value，可选 unit
+    ts_convert: 将 ts 组文本转换为浮点秒的函数，抛出 ValueError 视为解析错误
+    ts_kind: "numeric" 逐行转换为秒；"datetime" 逐行只保留文本，解析结束后批量转换
+             (结果同时保留 datetime64 的 Time 列)
+    """
+
+    def __init__(self, name, label, timestamp, pair, ts_convert=_numeric_ts, ts_kind="numeric", description=""):
+        self.name = name
+        self.label = label
+        self.description = description
+        self.ts_kind = ts_kind
+        self.ts_convert = str if ts_kind == "datetime" else ts_convert
+
+        parts = []
+        if timestamp:
+            parts.append(f"(?:{timestamp})")
+        parts.append(f"(?:{pair})")
+        self.pattern = re.compile("|".join(parts))
+
+        # findall 返回的元组中各组的位置
+        groups = self.pattern.groupindex
+        self.ts_index = groups['ts'] - 1 if 'ts' in groups else None
+        self.key_index = groups['key'] - 1
+        self.value_index = groups['value'] - 1
+        self.unit_index = groups['unit'] - 1 if 'unit' in groups else None
+
+        self.key_pattern = self._key_pattern(timestamp, pair)
+
+    @staticmethod
+    def _key_pattern(timestamp, pair):
+        """
+        参数名发现正则: 多行模式下整块文本 findall，只有 key 一个捕获组 (结果直接是字符串列表)
+        注释行与时间戳整体消费 (捕获为空串)，与逐行解析一样不会被误识别为键值对
+        """
+        def only_key(regex):
+            regex = re.sub(r'\(\?P<(?!key>)\w+>', '(?:', regex)
+            return regex.replace('(?P<key>', '(')
+
+        parts = [r'^[ \t]*#.*$']
+        if timestamp:
+            # 逐行解析时行首空白已被 strip，这里让行首锚点同样跳过空白
+            if timestamp.startswith('^'):
+                timestamp = r'^[ \t]*' + timestamp[1:]
+            parts.append(f"(?:{only_key(timestamp)})")
+        parts.append(f"(?:{only_key(pair)})")
+        return re.compile("|".join(parts), re.MULTILINE)
+
+    def __repr__(self):
+        return f"LogGrammar({self.name!r})"
+
+
+# 语法注册表 (按注册顺序参与自动识别，得分相同时靠前者优先)
+GRAMMARS = {}
+
+
+def register_grammar(grammar):
+    """注册 (或覆盖) 一种日志语法"""
+    GRAMMARS[grammar.name] = grammar
+    return grammar
+
+
+def get_grammar(name):
+    if isinstance(name, LogGrammar):
+        return name
+    if name not in GRAMMARS:
+        raise ValueError(f"未知的日志格式: {name}")
+    return GRAMMARS[name]
+
+
+register_grammar(LogGrammar(
+    "neup", "NEUP 默认",
+    timestamp=r'\[(?P<ts>\d+(?:\.\d+)?)\]',
+    pair=r'(?P<key>\w+)[:=](?P<value>-?[\d.]+)',
+    description="[123.45] temp:25.3 pressure=101.2",
+))
+
+register_grammar(LogGrammar(
+    "neup_ext", "NEUP 扩展 (科学计数/空格/单位)",
+    timestamp=r'\[(?P<ts>\d+(?:\.\d+)?)\]',
+    pair=rf'(?P<key>[A-Za-z_]\w*)\s*[:=]\s*(?P<value>{NUMBER})(?P<unit>{UNIT})?',
+    description="[123.45] temp = 2.53e1C pressure: 101.2kPa",
+))
+
+register_grammar(LogGrammar(
+    "datetime", "日期时间 (ISO 8601 / [YYYY-MM-DD hh:mm:ss.fff])",
+    timestamp=r'^\[?(?P<ts>\d{4}[-/]\d{2}[-/]\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\]?',
+    pair=rf'(?P<key>[A-Za-z_]\w*)\s*[:=]\s*(?P<value>{NUMBER})(?P<unit>{UNIT})?',
+    ts_kind="datetime",
+    description="[2026-10-17 08:15:02.123] temp:25.3 pressure=101.2kPa",
+))
+
+register_grammar(LogGrammar(
+    "epoch_ms", "毫秒时间戳",
+    timestamp=r'^\[?(?P<ts>\d{13})\]?(?!\d)',
+    pair=rf'(?P<key>[A-Za-z_]\w*)\s*[:=]\s*(?P<value>{NUMBER})(?P<unit>{UNIT})?',
+    ts_convert=_epoch_ms_ts,
+    description="1714564800125 temp=25.3 pressure=101.2",
+))
+
+
+# 自动识别时采样的行数
+DETECT_LINES = 200
+
+
+def _score(grammar, lines):
+    """匹配覆盖的字符数: 时间戳可转换、数值完整匹配 (如科学计数法) 的格式得分更高"""
+    score = 0
+    for line in lines:
+        for m in grammar.pattern.finditer(line):
+            ts = m.groupdict().get('ts')
+            if ts is not None:
+                try:
+                    grammar.ts_convert(ts)
+                except ValueError:
+                    continue
+            score += m.end() - m.start()
+    return score
+
+
+def detect_grammar(content, max_lines=DETECT_LINES):
+    """根据前 max_lines 个非空、非注释行自动识别日志格式"""
+    lines = []
+    for line in content.split('\n', max_lines * 4)[:max_lines * 4]:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            lines.append(line)
+            if len(lines) >= max_lines:
+                break
+
+    best, best_score = GRAMMARS["neup"], -1
+    for grammar in GRAMMARS.values():
+        score = _score(grammar, lines)
+        if score > best_score:
+            best, best_score = grammar, score
+    return best
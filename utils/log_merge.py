@@ -0,0 +1,210 @@
+"""
+多源日志合并模块
+同一次运行按子系统拆分为多个文件时，按时间戳把它们合并为一份日志
+
+- 每个源逐行流式解析，不为单个源构建完整 DataFrame
+- 各源先假定已按时间有序，直接做 k 路堆归并 (heapq.merge)，无需排序；
+  归并中发现某个源乱序时，只对该源整体解析并稳定排序，然后重新归并
+- 参数名加上源前缀 (如 engine_temp)，不同子系统的同名参数不会互相覆盖
+- 不同源在同一时刻的记录合并为一行，之后与单文件解析一样前向填充
+"""
+
+import heapq
+import re
+from pathlib import Path
+
+import pandas as pd
+
+from utils.log_grammars import parse_datetimes, datetimes_to_seconds
+from utils.log_parser import LogParser, ParseCancelled, PROGRESS_EVERY, TIME_COLUMNS
+
+
+# 每个源每次批量转换时间戳的记录数，以及合并结果每攒多少行转为一个 DataFrame 块
+MERGE_BLOCK = 20_000
+
+
+class _Unsorted(Exception):
+    """归并过程中发现源乱序"""
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.index = index
+
+
+def source_prefix(name):
+    """由文件名生成列前缀: 去掉扩展名，非标识符字符替换为下划线"""
+    stem = Path(name).stem
+    return re.sub(r'\W+', '_', stem).strip('_') or "src"
+
+
+class MergeSource:
+    """一个待合并的日志源"""
+
+    def __init__(self, name, content, grammar="auto", prefix=None):
+        self.name = name
+        self.content = content
+        self.parser = LogParser(grammar)
+        self.grammar = self.parser.resolve_grammar(content)
+        self.prefix = source_prefix(name) if prefix is None else prefix
+        self.sorted = True          # 归并中发现乱序后置为 False
+        self._columns = {}          # 参数名 → 带前缀列名
+
+    def column(self, key):
+        name = self._columns.get(key)
+        if name is None:
+            name = self._columns[key] = f"{self.prefix}_{key}" if self.prefix else key
+        return name
+
+    def _rows(self, cancel=None):
+        """逐条产出记录；日期时间格式按 MERGE_BLOCK 分批，时间戳整批向量化转换为秒"""
+        rows = self.parser.iter_rows(self.content, self.grammar, cancel=cancel)
+        if self.grammar.ts_kind != "datetime":
+            yield from rows
+            return
+        block = []
+        for row in rows:
+            block.append(row)
+            if len(block) >= MERGE_BLOCK:
+                yield from self._convert(block)
+                block = []
+        yield from self._convert(block)
+
+    def _convert(self, block):
+        if not block:
+            return block
+        raw = [row.get('Timestamp') for row in block]
+        times, failed = parse_datetimes(raw)
+        self.parser.parse_errors += failed
+        for row, t in zip(block, datetimes_to_seconds(times).tolist()):
+            if 'Timestamp' in row:
+                row['Timestamp'] = t
+        return block
+
+    def stream(self, index, cancel=None):
+        """
+        产出 (timestamp, index, 序号, 带前缀的记录)，用作 heapq.merge 的输入
+        无时间戳的行沿用本源上一条时间戳；时间倒退时抛出 _Unsorted
+        """
+        last = None
+        pending = []    # 首个时间戳之前的行，等到首个时间戳出现后一起产出
+        seq = 0
+        columns = self._columns
+        for row in self._rows(cancel):
+            t = row.pop('Timestamp', None)
+            if t is not None and t == t:  # 排除 NaN
+                if last is not None and t < last:
+                    raise _Unsorted(index)
+                last = t
+            values = {columns.get(k) or self.column(k): v for k, v in row.items()}
+            if last is None:
+                pending.append(values)
+                continue
+            if pending:
+                for early in pending:
+                    yield last, index, seq, early
+                    seq += 1
+                pending = []
+            yield last, index, seq, values
+            seq += 1
+        for early in pending:
+            yield 0.0, index, seq, early
+            seq += 1
+
+    def sorted_stream(self, index, cancel=None):
+        """乱序源: 整体解析并稳定排序后再产出"""
+        df, errors = self.parser.parse(self.content, cancel=cancel)
+        self.parser.parse_errors = errors
+        if df.empty:
+            return
+        keys = [c for c in df.columns if c not in TIME_COLUMNS]
+        values = df[keys].rename(columns=self.column).to_dict('records')
+        for seq, (t, row) in enumerate(zip(df['Timestamp'].tolist(), values)):
+            yield t, index, seq, row
+
+
+class MergedRows:
+    """
+    归并结果: 每攒满 MERGE_BLOCK 行转为一个 DataFrame 块，不长期持有逐行 dict
+    len() 为已合并行数；frame() 构建当前已合并部分 (可在归并进行中调用，用于预览/部分结果)
+    """
+
+    def __init__(self):
+        self.frames = []
+        self.rows = []
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, row):
+        self.rows.append(row)
+        self._count += 1
+        if len(self.rows) >= MERGE_BLOCK:
+            self.frames.append(pd.DataFrame(self.rows))
+            self.rows = []
+
+    def frame(self, release=False):
+        """release=True 时拼接后立即释放各块 (归并结束时使用，避免块与结果同时驻留)"""
+        parts = list(self.frames)
+        rows = list(self.rows)
+        if rows:
+            parts.append(pd.DataFrame(rows))
+        if not parts:
+            return pd.DataFrame()
+        df = pd.concat(parts, ignore_index=True)
+        if release:
+            self.frames, self.rows = [], []
+            del parts
+        return LogParser.finish_frame(df)
+
+
+def _merge(sources, progress=None, cancel=None):
+    """k 路堆归并，同一时刻的记录合并为一行"""
+    streams = [
+        src.stream(i, cancel) if src.sorted else src.sorted_stream(i, cancel)
+        for i, src in enumerate(sources)
+    ]
+    total = sum(src.content.count('\n') + 1 for src in sources)
+    merged = MergedRows()
+    current_t = None
+    current = None
+    for n, (t, _, _, values) in enumerate(heapq.merge(*streams)):
+        if n % PROGRESS_EVERY == 0:
+            if cancel is not None and cancel.is_set():
+                raise ParseCancelled(n)
+            if progress is not None:
+                progress(n, total, merged)
+        if t == current_t:
+            current.update(values)
+            continue
+        if current is not None:
+            merged.append(current)
+        current_t = t
+        current = {'Timestamp': t, **values}
+    if current is not None:
+        merged.append(current)
+    if progress is not None:
+        progress(total, total, merged)
+    return merged
+
+
+def merge_sources(sources, progress=None, cancel=None):
+    """
+    合并多个日志源，返回 (df, parse_errors)
+
+    sources: MergeSource 列表
+    progress: 可选回调 progress(已归并记录数, 总行数, 已合并行列表)，与 LogParser.parse 的回调一致
+    """
+    while True:
+        try:
+            merged = _merge(sources, progress, cancel)
+            break
+        except _Unsorted as e:
+            # 只有乱序的源需要排序，其余源仍然流式归并
+            sources[e.index].sorted = False
+
+    parse_errors = sum(src.parser.parse_errors for src in sources)
+    df = merged.frame(release=True)
+    if not df.empty and any(src.grammar.ts_kind == "datetime" for src in sources):
+        df.insert(1, 'Time', pd.to_datetime(df['Timestamp'], unit='s').dt.round('us'))
+    return df, parse_errors
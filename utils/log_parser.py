@@ -0,0 +1,261 @@
+"""
+日志解析模块
+将文本日志解析为 DataFrame，不依赖 Streamlit，可在工作进程中导入
+日志格式由 utils.log_grammars 中注册的语法决定，默认按前若干行自动识别
+
+投影与时间范围下推: 指定 keys / t_range 时在逐行循环中提前丢弃不需要的键值对与
+超出范围的行，不为它们做数值转换、也不进入 DataFrame。典型用法是先用
+discover_keys 廉价地列出参数名，再只解析选中的参数。
+"""
+
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from utils.log_grammars import detect_grammar, get_grammar, parse_datetimes, datetimes_to_seconds
+
+
+# 进度回调 / 取消检查的间隔行数
+PROGRESS_EVERY = 20_000
+
+# 按块切分文本的字符数: 只有当前块的行列表驻留内存
+SPLIT_BLOCK = 1 << 20
+
+# 时间列: Timestamp 为数值时间轴 (秒)，Time 为日期时间格式日志附带的 datetime64 列
+TIME_COLUMNS = ('Timestamp', 'Time')
+
+
+def value_columns(df):
+    """参数列 (排除时间列)"""
+    return [c for c in df.columns if c not in TIME_COLUMNS]
+
+
+def iter_lines(content, block=SPLIT_BLOCK):
+    """按行迭代文本，每次只切分约 block 个字符 (与 content.split('\\n') 产出相同的行)"""
+    start = 0
+    while True:
+        end = content.find('\n', start + block)
+        if end < 0:
+            yield from content[start:].split('\n')
+            return
+        yield from content[start:end].split('\n')
+        start = end + 1
+
+
+class ParseCancelled(Exception):
+    """解析被取消 (由 cancel 事件触发)"""
+
+
+class LogParser:
+    def __init__(self, grammar="auto", keys=None, t_range=None):
+        """
+        grammar: 语法名称、LogGrammar 实例，或 "auto" (解析时按内容自动识别)
+        keys: 只解析这些参数 (None 为全部)
+        t_range: (t_start, t_end) 只保留该时间范围 (秒，闭区间) 内的行，None 为不限
+                 数值时间戳在逐行循环中判断；日期时间格式在整列转换后判断
+        """
+        self.grammar = grammar
+        self.keys = None if keys is None else frozenset(keys)
+        self.t_range = t_range
+        self.parse_errors = 0
+        self.units = {}  # 参数单位 (语法支持单位后缀时记录首次出现的单位)
+        self.row_lines = array('q')     # 各记录所在的源行号 (解析顺序)
+        self.record_times = None        # 各记录的时间戳 (秒，解析顺序)，供行偏移索引跳转
+
+    def resolve_grammar(self, content):
+        """确定本次解析使用的语法"""
+        if self.grammar == "auto":
+            return detect_grammar(content)
+        return get_grammar(self.grammar)
+
+    def parse(self, content, progress=None, cancel=None, inspect=None):
+        """
+        解析日志文本，返回 (df, parse_errors)
+
+        progress: 可选回调 progress(已处理行数, 总行数, 已解析记录列表)，每 PROGRESS_EVERY 行调用一次
+        cancel: 可选 threading.Event，置位后在下一个检查点抛出 ParseCancelled
+        inspect: 可选回调 inspect(df)，以解析顺序、尚未排序/填充的 DataFrame 调用 (用于构建索引)
+        """
+        grammar = self.resolve_grammar(content)
+        self.detected = grammar
+
+        data_list = []
+        report = None
+        if progress is not None:
+            report = lambda done, total: progress(done, total, data_list)
+        # extend 逐条追加，进度回调拿到的是正在增长的同一个列表
+        data_list.extend(self.iter_rows(content, grammar, progress=report, cancel=cancel))
+
+        df, time_errors = self.raw_frame(data_list, grammar)
+        # 逐行 dict 比 DataFrame 大得多: 转换后立即释放 (进度回调持有的是同一个列表)
+        data_list.clear()
+        if self.t_range is not None and grammar.ts_kind == "datetime":
+            df = self._clip_time(df)
+        if 'Timestamp' in df.columns:
+            self.record_times = df['Timestamp'].to_numpy(dtype=float, copy=True)
+        if inspect is not None:
+            inspect(df)
+        return self.finish_frame(df), self.parse_errors + time_errors
+
+    def _clip_time(self, df):
+        """日期时间格式的时间范围过滤 (转换为秒之后)；无时间戳的行跟随前一条有时间戳的行"""
+        if df.empty or 'Timestamp' not in df.columns:
+            return df
+        t_lo, t_hi = self.t_range
+        ts = df['Timestamp'].ffill()
+        keep = (ts.between(t_lo, t_hi) | ts.isna()).to_numpy()
+        if keep.all():
+            return df
+        self.row_lines = array('q', np.asarray(self.row_lines)[keep].tolist())
+        return df[keep].reset_index(drop=True)
+
+    def discover_keys(self, content, cancel=None):
+        """
+        只列出参数名 (按首次出现顺序)，不转换数值、不构建记录
+        每块文本一次 findall (语法的 key_pattern)，没有逐行的 Python 循环
+        """
+        grammar = self.resolve_grammar(content)
+        self.detected = grammar
+        pattern = grammar.key_pattern
+        found = {}
+        start = 0
+        while start < len(content):
+            if cancel is not None and cancel.is_set():
+                raise ParseCancelled(start)
+            end = content.find('\n', start + SPLIT_BLOCK)
+            end = len(content) if end < 0 else end
+            found.update(dict.fromkeys(pattern.findall(content, start, end)))
+            start = end + 1
+        found.pop('', None)
+        return list(found)
+
+    def iter_rows(self, content, grammar, progress=None, cancel=None):
+        """
+        逐行产出记录 dict ({'Timestamp': ..., key: value, ...})，不构建 DataFrame
+        日期时间格式的 Timestamp 为原始文本；时间戳转换失败数累计到 self.parse_errors
+
+        progress: 可选回调 progress(已处理行数, 总行数)
+        """
+        pattern = grammar.pattern
+        ts_convert = grammar.ts_convert
+        ts_i, key_i, value_i, unit_i = grammar.ts_index, grammar.key_index, grammar.value_index, grammar.unit_index
+        units = self.units
+        keys = self.keys
+        # 数值时间戳逐行判断范围: 先只匹配行首的时间戳，超出范围的行不做 findall
+        check_time = self.t_range is not None and ts_i is not None and grammar.ts_kind != "datetime"
+        t_lo, t_hi = self.t_range if check_time else (None, None)
+        in_range = True     # 无时间戳的行沿用前一条时间戳的判断结果
+        self.parse_errors = 0
+        row_lines = self.row_lines = array('q')
+
+        total = content.count('\n') + 1
+
+        for i, line in enumerate(iter_lines(content)):
+            if i % PROGRESS_EVERY == 0:
+                if cancel is not None and cancel.is_set():
+                    raise ParseCancelled(i)
+                if progress is not None:
+                    progress(i, total)
+
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            if check_time:
+                m = pattern.search(line)
+                if m is not None and m.group(ts_i + 1) is not None:
+                    try:
+                        ts = ts_convert(m.group(ts_i + 1))
+                        in_range = t_lo <= ts <= t_hi
+                    except ValueError:
+                        pass    # 转换失败在下面的 findall 中计数
+                if not in_range:
+                    continue
+
+            # 一次 findall 同时取出时间戳与键值对 (合并正则，每个匹配只命中其中一个分支)
+            row_data = {}
+            has_ts = False
+            for groups in pattern.findall(line):
+                key = groups[key_i]
+                if not key:
+                    if not has_ts and ts_i is not None:
+                        has_ts = True  # 只取第一个时间戳
+                        try:
+                            row_data['Timestamp'] = ts_convert(groups[ts_i])
+                        except ValueError:
+                            self.parse_errors += 1
+                    continue
+                if keys is not None and key not in keys:
+                    continue
+                try:
+                    row_data[key] = float(groups[value_i])
+                except ValueError:
+                    continue
+                if unit_i is not None and groups[unit_i] and key not in units:
+                    units[key] = groups[unit_i]
+
+            if len(row_data) > ('Timestamp' in row_data):
+                row_lines.append(i)
+                yield row_data
+
+        if progress is not None:
+            progress(total, total)
+
+    @staticmethod
+    def build_frame(data_list, grammar=None):
+        """
+        由逐行记录构建 DataFrame: 按时间排序并前向填充缺失值
+        日期时间格式的时间戳在这里整列批量转换，返回 (df, 时间解析失败数)
+        """
+        df, time_errors = LogParser.raw_frame(data_list, grammar)
+        return LogParser.finish_frame(df), time_errors
+
+    @staticmethod
+    def raw_frame(data_list, grammar=None):
+        """逐行记录 → DataFrame (保持解析顺序，不填充)，返回 (df, 时间解析失败数)"""
+        if not data_list:
+            return pd.DataFrame(), 0
+
+        df = pd.DataFrame(data_list)
+        time_errors = 0
+        if 'Timestamp' in df.columns and grammar is not None and grammar.ts_kind == "datetime":
+            times, time_errors = parse_datetimes(df['Timestamp'])
+            df['Timestamp'] = datetimes_to_seconds(times)
+            df.insert(1, 'Time', times)
+        return df, time_errors
+
+    @staticmethod
+    def finish_frame(df):
+        """按时间排序并前向填充缺失值，无时间戳时以行号代替"""
+        if df.empty:
+            return df
+        if 'Timestamp' in df.columns:
+            # 日志通常已按时间写入: 已有序时跳过排序；否则稳定排序，同一时刻保持文件中的先后顺序
+            if not df['Timestamp'].is_monotonic_increasing:
+                df = df.sort_values('Timestamp', kind='stable').reset_index(drop=True)
+            df = df.ffill()  # 使用 ffill() 替代 fillna(method='ffill')
+            df.fillna(dict.fromkeys(['Timestamp', *value_columns(df)], 0), inplace=True)
+        else:
+            df['Timestamp'] = df.index
+
+        return df
+    
+    def get_statistics(self, df):
+        if df.empty: return {}
+        stats = {}
+        for col in value_columns(df):
+            stats[col] = {
+                'mean': df[col].mean(), 'std': df[col].std(),
+                'min': df[col].min(), 'max': df[col].max(),
+                'range': df[col].max() - df[col].min()
+            }
+        return stats
+
+
+def get_common_keys(df1, df2):
+    cols1 = set(df1.columns)
+    cols2 = set(df2.columns)
+    common = list((cols1 & cols2) - set(TIME_COLUMNS))
+    common.sort()
+    return common
@@ -0,0 +1,173 @@
+"""
+历史日志存储模块
+将解析后的日志持久化到本地 SQLite (WAL 模式)，之后可按运行 / 参数 / 时间范围直接查询，无需重新解析
+
+采用长表 (窄表) 布局:
+    runs     (run_id, name, fingerprint, rows, t_min, t_max, created)
+    run_keys (run_id, key_id, key)
+    samples  (run_id, key_id, timestamp, value)   索引 (run_id, key_id, timestamp)
+"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.log_parser import value_columns
+
+
+DEFAULT_STORE_PATH = Path(__file__).parent.parent / "neup_store.sqlite"
+
+# 每个事务批量插入的样本数
+INSERT_BATCH = 200_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    name        TEXT NOT NULL,
+    fingerprint TEXT NOT NULL UNIQUE,
+    rows        INTEGER NOT NULL,
+    t_min       REAL,
+    t_max       REAL,
+    created     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_keys (
+    run_id INTEGER NOT NULL,
+    key_id INTEGER NOT NULL,
+    key    TEXT NOT NULL,
+    PRIMARY KEY (run_id, key_id)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id    INTEGER NOT NULL,
+    key_id    INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    value     REAL
+);
+CREATE INDEX IF NOT EXISTS idx_samples ON samples (run_id, key_id, timestamp);
+"""
+
+
+class LogStore:
+    """基于 SQLite 的历史日志存储 (每次操作使用独立连接，可在多线程下使用)"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = Path(path)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def find_run(self, fingerprint):
+        """按文件指纹查找已入库的运行，返回 run_id 或 None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT run_id FROM runs WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return row[0] if row else None
+
+    def ingest(self, df, name, fingerprint, batch=INSERT_BATCH):
+        """
+        将 LogParser 输出的 DataFrame 入库，返回 run_id
+        同一指纹只入库一次；查重与所有批次的插入在同一写事务 (BEGIN IMMEDIATE) 内完成，
+        多个会话同时保存同一文件时，后到的等待前一个提交后直接返回已有的 run_id
+        """
+        keys = value_columns(df)
+        times = df['Timestamp'].to_numpy(dtype=float)
+        t_min = float(times[0]) if len(times) else None
+        t_max = float(times[-1]) if len(times) else None
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT run_id FROM runs WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            if row is not None:
+                return row[0]
+            cur = conn.execute(
+                "INSERT INTO runs (name, fingerprint, rows, t_min, t_max, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, fingerprint, len(df), t_min, t_max, time.time())
+            )
+            run_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO run_keys (run_id, key_id, key) VALUES (?, ?, ?)",
+                [(run_id, key_id, key) for key_id, key in enumerate(keys)]
+            )
+
+            # 按列展开为 (run_id, key_id, timestamp, value)，分批 executemany
+            step = max(1, batch // max(len(keys), 1))
+            for start in range(0, len(df), step):
+                t = times[start:start + step]
+                values = df[keys].iloc[start:start + step].to_numpy(dtype=float)
+                key_ids = np.repeat(np.arange(len(keys)), len(t))
+                conn.executemany(
+                    "INSERT INTO samples (run_id, key_id, timestamp, value) VALUES (?, ?, ?, ?)",
+                    zip([run_id] * len(key_ids), key_ids.tolist(),
+                        np.tile(t, len(keys)).tolist(), values.T.ravel().tolist())
+                )
+        return run_id
+
+    def list_runs(self):
+        """已入库的运行列表 (最新在前)"""
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                "SELECT run_id, name, fingerprint, rows, t_min, t_max, created FROM runs ORDER BY run_id DESC",
+                conn
+            )
+
+    def get_keys(self, run_id):
+        """某次运行包含的参数 (保持入库时的列顺序)"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key FROM run_keys WHERE run_id = ? ORDER BY key_id", (run_id,)).fetchall()
+        return [r[0] for r in rows]
+
+    def query(self, run_id, keys=None, t_start=None, t_end=None):
+        """
+        按参数和时间范围查询，返回与 LogParser 相同的宽表格式 (Timestamp + 各参数列)
+        每个参数走一次 (run_id, key_id, timestamp) 索引范围扫描
+        """
+        with self._connect() as conn:
+            key_ids = dict(conn.execute(
+                "SELECT key, key_id FROM run_keys WHERE run_id = ?", (run_id,)
+            ).fetchall())
+            keys = [k for k in (keys if keys is not None else key_ids) if k in key_ids]
+
+            t_start = -np.inf if t_start is None else t_start
+            t_end = np.inf if t_end is None else t_end
+
+            data = {}
+            for key in keys:
+                rows = conn.execute(
+                    "SELECT timestamp, value FROM samples "
+                    "WHERE run_id = ? AND key_id = ? AND timestamp BETWEEN ? AND ? "
+                    "ORDER BY timestamp, rowid",
+                    (run_id, key_ids[key], t_start, t_end)
+                ).fetchall()
+                arr = np.array(rows, dtype=float).reshape(-1, 2)
+                if 'Timestamp' not in data:
+                    data['Timestamp'] = arr[:, 0]
+                data[key] = arr[:, 1]
+
+            if not keys:
+                # 没有参数时仍返回时间轴
+                rows = conn.execute(
+                    "SELECT DISTINCT timestamp FROM samples WHERE run_id = ? AND timestamp BETWEEN ? AND ? "
+                    "ORDER BY timestamp", (run_id, t_start, t_end)
+                ).fetchall()
+                data['Timestamp'] = np.array([r[0] for r in rows], dtype=float)
+
+        return pd.DataFrame(data, columns=['Timestamp'] + keys)
+
+    def delete_run(self, run_id):
+        """删除一次运行及其全部样本"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM samples WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM run_keys WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
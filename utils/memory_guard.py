@@ -0,0 +1,125 @@
+"""
+内存预算保护模块
+解析后估算 DataFrame 内存、渲染前估算图表负载，超出预算时自动降级:
+1. 数值列转为紧凑类型 (float64 → float32，整数向下转换)
+2. 仍然超出时按固定时间桶聚合，行数降到预算以内
+
+解析过程中也按已解析的行数 × 列数估算结果大小: 超过预算的 PARSE_LIMIT_FACTOR 倍时
+提前停止解析 (见 utils.parse_jobs)，不再先构建完整的记录列表与 DataFrame 再降级
+
+预算通过环境变量配置 (服务端统一设置，防止单个大文件拖垮共享服务器):
+    NEUP_MEMORY_BUDGET_MB   单个解析结果的内存预算，默认 512
+    NEUP_PAYLOAD_BUDGET_MB  单张图表发往浏览器的负载预算，默认 16
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.resampler import resample
+
+
+MB = 1024 * 1024
+
+MEMORY_BUDGET = float(os.environ.get("NEUP_MEMORY_BUDGET_MB", 512)) * MB
+PAYLOAD_BUDGET = float(os.environ.get("NEUP_PAYLOAD_BUDGET_MB", 16)) * MB
+
+# 解析中的结果估算超过预算的该倍数时停止解析 (float32 + 时间桶聚合仍可降到预算以内的范围)
+PARSE_LIMIT_FACTOR = float(os.environ.get("NEUP_PARSE_LIMIT_FACTOR", 4))
+
+# JSON 中每个数值的平均字节数 (数字文本 + 分隔符)，用于不序列化就估算负载
+BYTES_PER_VALUE = 20
+
+
+def frame_nbytes(df):
+    """DataFrame 实际占用内存 (字节)"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def estimate_frame_nbytes(rows, columns):
+    """估算解析结果 DataFrame 的内存: 每个单元格一个 float64"""
+    return rows * columns * 8
+
+
+def estimate_payload(rows, series):
+    """估算折线图负载: 每行一个 x 值 + 每个序列一个 y 值"""
+    return rows * (series + 1) * BYTES_PER_VALUE
+
+
+def compact_dtypes(df, copy=True):
+    """
+    数值列转为紧凑类型
+    Timestamp 保持 float64，避免长时间日志的时间精度损失
+    copy=False 时原地逐列替换 (调用方独占 df 时使用，旧列随替换释放，不额外复制整表)
+    """
+    out = df.copy() if copy else df
+    for col in out.columns:
+        if col == 'Timestamp':
+            continue
+        if pd.api.types.is_float_dtype(out[col]):
+            out[col] = out[col].astype(np.float32)
+        elif pd.api.types.is_integer_dtype(out[col]):
+            out[col] = pd.to_numeric(out[col], downcast='integer')
+    return out
+
+
+def bucket_to_rows(df, max_rows, columns=None):
+    """
+    按等宽时间桶取均值，使行数不超过 max_rows，返回 (DataFrame, 降采样方式说明)
+    时间跨度为 0 (无法分桶) 时改为等间隔抽行
+    """
+    max_rows = max(max_rows, 1)
+    times = df['Timestamp'].to_numpy(dtype=float)
+    span = times[-1] - times[0]
+    if span <= 0:
+        stride = -(-len(df) // max_rows)
+        return df.iloc[::stride], f"时间跨度为 0，按每 {stride} 行取 1 行抽样"
+    bucket = span / max_rows * (1 + 1e-6)
+    return resample(df, bucket, "mean", columns), f"按 {bucket:.4g} 秒时间桶取均值"
+
+
+def _format_bytes(n):
+    return f"{n / MB:.1f} MB"
+
+
+def guard_frame(df, label="数据", budget=None, copy=True):
+    """
+    解析结果内存保护
+    返回 (df, notes)，notes 为降级说明列表 (未降级时为空)
+    copy=False: 调用方独占 df (如刚取出的解析结果)，紧凑类型原地转换
+    """
+    budget = MEMORY_BUDGET if budget is None else budget
+    size = frame_nbytes(df)
+    if df.empty or size <= budget:
+        return df, []
+
+    notes = []
+    compact = compact_dtypes(df, copy)
+    compact_size = frame_nbytes(compact)
+    notes.append(f"{label}: {_format_bytes(size)} 超出内存预算 {_format_bytes(budget)}，"
+                 f"数值列已转为紧凑类型 ({_format_bytes(compact_size)})")
+    if compact_size <= budget:
+        return compact, notes
+
+    max_rows = int(len(compact) * budget / compact_size)
+    reduced, method = bucket_to_rows(compact, max_rows)
+    notes.append(f"{label}: {method}，{len(compact)} 行 → {len(reduced)} 行")
+    return compact_dtypes(reduced), notes
+
+
+def guard_chart_frame(df, y_cols, label="图表", budget=None):
+    """
+    图表负载保护: 在构建 ECharts 配置前估算负载，超出预算时按时间桶聚合
+    返回 (df, notes)
+    """
+    budget = PAYLOAD_BUDGET if budget is None else budget
+    estimate = estimate_payload(len(df), len(y_cols))
+    if df.empty or estimate <= budget:
+        return df, []
+
+    max_rows = int(budget // estimate_payload(1, len(y_cols)))
+    reduced, method = bucket_to_rows(df, max_rows, y_cols)
+    note = (f"{label}: 预计负载 {_format_bytes(estimate)} 超出预算 {_format_bytes(budget)}，"
+            f"{method}，降采样为 {len(reduced)} 点")
+    return reduced, [note]
@@ -0,0 +1,120 @@
+"""
+多日志对比模块
+并行解析多份历史日志，对齐到共享时间网格，并计算包络带 (min/max/分位数)
+
+内存只与 运行数 × 参数数 × 网格点数 成正比，
+原始 DataFrame 只在工作进程中短暂存在，不会回传到主进程。
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.derived import add_derived
+from utils.log_parser import LogParser
+
+
+# 默认网格点数 (每条曲线最终发送到前端的点数)
+DEFAULT_GRID_SIZE = 1000
+
+
+def build_time_grid(df, grid_size=DEFAULT_GRID_SIZE, align="start"):
+    """根据基准日志构建共享时间网格"""
+    times = df['Timestamp'].to_numpy(dtype=float)
+    if len(times) == 0:
+        return np.array([], dtype=float)
+
+    t_min, t_max = float(times.min()), float(times.max())
+    if align == "start":
+        # 按起始时间对齐: 网格表示相对起点的偏移
+        t_min, t_max = 0.0, t_max - t_min
+
+    return np.linspace(t_min, t_max, max(int(grid_size), 2))
+
+
+def align_to_grid(df, keys, grid, align="start"):
+    """
+    将单个日志的各参数线性插值到共享网格
+    返回 float32 数组 (len(keys), len(grid))，缺失参数或超出范围处为 NaN
+    """
+    out = np.full((len(keys), len(grid)), np.nan, dtype=np.float32)
+    if df.empty or len(grid) == 0:
+        return out
+
+    times = df['Timestamp'].to_numpy(dtype=float)
+    if align == "start":
+        times = times - times[0]
+
+    for i, key in enumerate(keys):
+        if key not in df.columns:
+            continue
+        out[i] = np.interp(grid, times, df[key].to_numpy(dtype=float), left=np.nan, right=np.nan)
+
+    return out
+
+
+def _align_worker(args):
+    """工作进程入口: 解码 → 解析 → 对齐，只回传网格数组"""
+    raw, keys, grid, align, grammar, derived = args
+    content = raw.decode("utf-8", errors='ignore')
+    df, _ = LogParser(grammar).parse(content)
+    if derived:
+        df, _ = add_derived(df, derived)    # 某份日志缺少引用的参数时，该派生通道为 NaN
+    return align_to_grid(df, keys, grid, align)
+
+
+def parse_runs_parallel(payloads, keys, grid, align="start", max_workers=None, grammar="auto", derived=()):
+    """
+    并行解析多份日志并对齐到网格
+
+    payloads: 原始字节列表 (每个元素对应一份日志)
+    grammar: 日志语法名称 (见 utils.log_grammars)，默认逐个文件自动识别
+    derived: 派生通道表达式列表 (见 utils.derived)，在工作进程中解析后计算
+    返回 float32 数组 (len(payloads), len(keys), len(grid))
+    """
+    values = np.full((len(payloads), len(keys), len(grid)), np.nan, dtype=np.float32)
+    if not payloads:
+        return values
+
+    if max_workers is None:
+        max_workers = min(len(payloads), os.cpu_count() or 1)
+
+    tasks = [(raw, keys, grid, align, grammar, list(derived)) for raw in payloads]
+
+    # 单个文件或单核时不启动进程池，避免额外开销
+    if max_workers <= 1 or len(payloads) == 1:
+        for i, task in enumerate(tasks):
+            values[i] = _align_worker(task)
+        return values
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for i, aligned in enumerate(executor.map(_align_worker, tasks)):
+            values[i] = aligned
+
+    return values
+
+
+def compute_envelope(values, percentiles=(10, 90)):
+    """
+    计算跨运行的包络带
+
+    values: (runs, keys, grid) 数组
+    返回字典，每项为 (keys, grid) 数组: min / max / median / p_low / p_high
+    """
+    if values.shape[0] == 0:
+        empty = np.full(values.shape[1:], np.nan, dtype=np.float32)
+        return {'min': empty, 'max': empty, 'median': empty, 'p_low': empty, 'p_high': empty}
+
+    # 某些网格点所有运行都是 NaN 时 numpy 会告警，这里静默处理
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        p_low, median, p_high = np.nanpercentile(values, [percentiles[0], 50, percentiles[1]], axis=0)
+        return {
+            'min': np.nanmin(values, axis=0),
+            'max': np.nanmax(values, axis=0),
+            'median': median,
+            'p_low': p_low,
+            'p_high': p_high,
+        }
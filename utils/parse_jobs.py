@@ -0,0 +1,292 @@
+"""
+后台解析任务模块
+在线程池中解析日志，脚本线程只轮询进度，不再阻塞页面
+
+- 按文件指纹去重: 同一文件只解析一次，多个会话共享结果
+- 进度按行数上报，可随时取消
+- 运行中或取消后可取出已解析部分作为预览/部分结果
+- 多个源文件可作为一个合并任务提交 (见 utils.log_merge)
+- 单文件任务同时构建行偏移索引 (见 utils.line_index) 与倒排索引 (见 utils.search_index)
+- 可只解析指定参数 (投影下推)；参数发现任务只列出参数名，供先选参数再解析
+- 解析中按已解析的行数 × 列数估算结果大小，超出 max_bytes 时提前停止 (可采用已解析部分)
+- 结果由调用方用 take_result 取走后任务不再持有 (只保留行偏移索引等)，同一份数据不会在任务表与缓存中各留一份
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.line_index import LineIndex
+from utils.log_merge import MergeSource, merge_sources
+from utils.log_parser import LogParser, ParseCancelled
+from utils.memory_guard import estimate_frame_nbytes
+from utils.search_index import SearchIndex
+
+
+# 估算列数时每隔多少条记录抽查一条的参数名
+COLUMN_SAMPLE_STEP = 16
+
+
+class ParseBudgetExceeded(ParseCancelled):
+    """解析中的结果估算超出内存上限 (按取消处理，已解析部分仍可采用)"""
+
+
+class ResultReleased(LookupError):
+    """任务结果已被取走 (需要重新解析)"""
+
+
+class ParseJob:
+    """单个日志的后台解析任务"""
+
+    # 取消后能否采用已解析部分
+    partial_ok = True
+
+    def __init__(self, raw, fingerprint, grammar="auto", keys=None, max_bytes=None):
+        self.fingerprint = fingerprint
+        self.grammar = grammar
+        self.keys = keys            # 只解析这些参数 (None 为全部)
+        self.detected = None        # 实际使用的语法 (auto 时为自动识别结果)
+        self.total_bytes = len(raw)
+        self.total_lines = 0
+        self.lines_done = 0
+        self.status = "pending"     # pending / running / done / cancelled / error
+        self.result = None          # (df, parse_errors)
+        self.partial_result = False # result 是否为取消后保留的部分结果
+        self.released = False       # result 已被 take_result 取走
+        self.max_bytes = max_bytes  # 解析结果估算上限 (None 为不限)
+        self.over_budget = False    # 因超出 max_bytes 而停止
+        self.error = None
+        self.line_index = None      # 行偏移索引 (合并任务没有)
+        self.search_index = None    # 倒排索引 (合并任务没有)
+        self.started = None
+        self.elapsed = 0.0
+        self._rows = []
+        self._parsed = 0
+        self._columns = set()
+        self._sampled = 0
+        self._cancel = threading.Event()
+
+    def run(self, raw):
+        """在工作线程中执行 (解码也放在后台)"""
+        self.status = "running"
+        self.started = time.perf_counter()
+        try:
+            self.line_index = LineIndex.from_bytes(raw)
+            content = raw.decode("utf-8", errors='ignore')
+            parser = LogParser(self.grammar, keys=self.keys)
+            self.detected = parser.resolve_grammar(content)
+            parser.grammar = self.detected
+            search_index = SearchIndex()
+            self.result = parser.parse(content, progress=self._on_progress, cancel=self._cancel,
+                                       inspect=search_index.index_keys)
+            if parser.record_times is not None:
+                self.line_index.attach_records(parser.record_times, parser.row_lines)
+            search_index.index_tokens(raw, self.line_index, cancel=self._cancel)
+            self.search_index = search_index
+            self._rows = []
+            self.status = "done"
+        except ParseCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "error"
+        finally:
+            self.elapsed = time.perf_counter() - self.started
+
+    def _on_progress(self, done, total, rows):
+        self.lines_done = done
+        self.total_lines = total
+        self._rows = rows
+        self._parsed = len(rows)
+        if self.max_bytes is not None and done < total and \
+                estimate_frame_nbytes(len(rows), self._count_columns(rows)) > self.max_bytes:
+            self.over_budget = True
+            raise ParseBudgetExceeded(done)
+
+    def _count_columns(self, rows):
+        """已解析部分的列数 (记录列表按间隔抽查参数名，合并结果直接取各块的列)"""
+        if isinstance(rows, list):
+            for i in range(self._sampled, len(rows), COLUMN_SAMPLE_STEP):
+                self._columns.update(rows[i])
+            self._sampled = len(rows)
+        else:
+            for frame in rows.frames:
+                self._columns.update(frame.columns)
+        return len(self._columns)
+
+    @property
+    def progress(self):
+        """0~1 的完成比例"""
+        if self.status == "done":
+            return 1.0
+        return self.lines_done / self.total_lines if self.total_lines else 0.0
+
+    @property
+    def finished(self):
+        return self.status in ("done", "cancelled", "error")
+
+    @property
+    def parsed_rows(self):
+        return self._parsed
+
+    def cancel(self):
+        self._cancel.set()
+
+    def partial(self):
+        """已解析部分构成的 DataFrame (复制记录列表，工作线程可继续追加)"""
+        df, _ = LogParser.build_frame(list(self._rows), self.detected)
+        return df
+
+    def accept_partial(self):
+        """取消后采用已解析部分作为结果"""
+        self.result = LogParser.build_frame(list(self._rows), self.detected)
+        self._rows = []
+        self.partial_result = True
+        self.status = "done"
+
+    def take_result(self):
+        """
+        取走结果 (df, parse_errors)，任务不再持有
+        调用方 (共享缓存) 成为结果的唯一持有者；已被取走时抛出 ResultReleased
+        """
+        if self.released:
+            raise ResultReleased(self.fingerprint)
+        result, self.result = self.result, None
+        self.released = True
+        return result
+
+
+class DiscoverJob(ParseJob):
+    """参数发现任务: 只列出参数名 (result 为参数名列表)，不解析数值"""
+
+    partial_ok = False
+
+    def run(self, raw):
+        self.status = "running"
+        self.started = time.perf_counter()
+        try:
+            content = raw.decode("utf-8", errors='ignore')
+            parser = LogParser(self.grammar)
+            self.result = parser.discover_keys(content, cancel=self._cancel)
+            self.detected = parser.detected
+            self.status = "done"
+        except ParseCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "error"
+        finally:
+            self.elapsed = time.perf_counter() - self.started
+
+    def partial(self):
+        return pd.DataFrame()
+
+
+class MergeJob(ParseJob):
+    """多源合并任务: 各源流式解析后按时间戳 k 路归并为一份日志"""
+
+    def __init__(self, raws, fingerprint, grammar="auto", max_bytes=None):
+        super().__init__(b"", fingerprint, grammar, max_bytes=max_bytes)
+        self.names = [name for name, _ in raws]
+        self.total_bytes = sum(len(raw) for _, raw in raws)
+        self.sources = []
+
+    def run(self, raws):
+        self.status = "running"
+        self.started = time.perf_counter()
+        try:
+            self.sources = [
+                MergeSource(name, raw.decode("utf-8", errors='ignore'), self.grammar)
+                for name, raw in raws
+            ]
+            self.detected = self.sources[0].grammar
+            self.result = merge_sources(self.sources, progress=self._on_progress, cancel=self._cancel)
+            self._rows = []
+            for src in self.sources:
+                src.content = None  # 归并结束后不再需要解码后的文本
+            self.status = "done"
+        except ParseCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "error"
+        finally:
+            self.elapsed = time.perf_counter() - self.started
+
+    def partial(self):
+        # 进度回调传入的是 MergedRows (已合并部分，时间戳已是秒)
+        return self._rows.frame() if self._rows else pd.DataFrame()
+
+    def accept_partial(self):
+        self.result = (self.partial(), 0)
+        self._rows = []
+        self.partial_result = True
+        self.status = "done"
+
+
+class ParseJobManager:
+    """进程内共享的解析任务表 (线程池 + 按指纹索引，只保留最近 max_jobs 个任务)"""
+
+    def __init__(self, max_workers=4, max_jobs=8, max_bytes=None):
+        """max_bytes: 单个解析结果的估算上限，超出时任务提前停止 (None 为不限)"""
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="neup-parse")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+
+    def submit(self, raw, fingerprint, grammar="auto", keys=None):
+        """
+        提交解析任务；同一指纹已有任务时直接返回该任务
+        fingerprint 应同时涵盖文件内容、grammar 与 keys (换语法或参数需要重新解析)
+        """
+        return self._submit(fingerprint, lambda: ParseJob(raw, fingerprint, grammar, keys, self.max_bytes), raw)
+
+    def submit_discover(self, raw, fingerprint, grammar="auto"):
+        """提交参数发现任务 (fingerprint 不能与同一文件的解析任务相同)"""
+        return self._submit(fingerprint, lambda: DiscoverJob(raw, fingerprint, grammar), raw)
+
+    def submit_merge(self, raws, fingerprint, grammar="auto"):
+        """
+        提交多源合并任务，raws 为 [(文件名, 原始字节), ...]
+        fingerprint 应涵盖全部源内容、文件名 (列前缀) 与 grammar
+        """
+        return self._submit(fingerprint, lambda: MergeJob(raws, fingerprint, grammar, self.max_bytes), raws)
+
+    def _submit(self, fingerprint, make_job, payload):
+        """同一指纹已有任务时直接返回，否则创建并启动"""
+        with self._lock:
+            job = self._jobs.get(fingerprint)
+            if job is not None:
+                self._jobs.move_to_end(fingerprint)
+                return job
+
+            job = make_job()
+            self._start(job, payload)
+            return job
+
+    def _start(self, job, payload):
+        """登记并启动任务 (调用方持有锁)"""
+        self._jobs[job.fingerprint] = job
+        self._executor.submit(job.run, payload)
+
+        # 淘汰最旧的已结束任务
+        for fp in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[fp].finished:
+                del self._jobs[fp]
+
+    def get(self, fingerprint):
+        with self._lock:
+            return self._jobs.get(fingerprint)
+
+    def discard(self, fingerprint):
+        """移除任务 (运行中的会先取消)，下次 submit 时重新解析"""
+        with self._lock:
+            job = self._jobs.pop(fingerprint, None)
+        if job is not None:
+            job.cancel()
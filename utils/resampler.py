@@ -0,0 +1,95 @@
+"""
+重采样/聚合引擎
+将不规则时间戳的日志数据聚合到固定时间桶 (如 10ms / 1s / 1min)
+
+依赖 Timestamp 已排序: 桶边界通过一次差分得到，
+各聚合由 numpy ufunc.reduceat 在 (行 × 列) 数组上一次完成。
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.log_parser import TIME_COLUMNS
+
+
+# 预置桶大小 (秒)
+BUCKET_SIZES = {
+    "10ms": 0.01,
+    "100ms": 0.1,
+    "1s": 1.0,
+    "10s": 10.0,
+    "1min": 60.0,
+    "10min": 600.0,
+}
+
+# 支持的聚合方式
+AGGREGATIONS = {
+    "mean": "平均值",
+    "min": "最小值",
+    "max": "最大值",
+    "last": "末值",
+    "count": "计数",
+}
+
+
+def _bucket_bounds(times, bucket, origin):
+    """返回每个非空桶的 (桶编号, 起始行号)"""
+    # 加一个极小量，避免 0.3 / 0.1 = 2.9999... 这类浮点误差把点分到前一个桶
+    ids = np.floor((times - origin) / bucket + 1e-9).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    return ids[starts], starts
+
+
+def resample(df, bucket, how="mean", columns=None, origin=None):
+    """
+    按固定时间桶聚合
+
+    bucket: 桶宽 (秒) 或 BUCKET_SIZES 中的名称
+    how: mean / min / max / last / count
+    返回新 DataFrame，Timestamp 为桶起点，只包含非空桶
+    """
+    if isinstance(bucket, str):
+        bucket = BUCKET_SIZES[bucket]
+    if how not in AGGREGATIONS:
+        raise ValueError(f"不支持的聚合方式: {how}")
+
+    cols = [c for c in (columns or df.columns) if c not in TIME_COLUMNS]
+    if df.empty:
+        return pd.DataFrame(columns=['Timestamp'] + cols)
+
+    times = df['Timestamp'].to_numpy(dtype=float)
+    origin = times[0] if origin is None else origin
+    ids, starts = _bucket_bounds(times, bucket, origin)
+    values = df[cols].to_numpy(dtype=float)
+
+    if how == "mean":
+        counts = np.diff(np.r_[starts, len(times)])
+        result = np.add.reduceat(values, starts, axis=0) / counts[:, None]
+    elif how == "min":
+        result = np.minimum.reduceat(values, starts, axis=0)
+    elif how == "max":
+        result = np.maximum.reduceat(values, starts, axis=0)
+    elif how == "last":
+        result = values[np.r_[starts[1:], len(times)] - 1]
+    else:
+        counts = np.diff(np.r_[starts, len(times)])
+        result = np.repeat(counts[:, None], len(cols), axis=1)
+
+    out = pd.DataFrame(result, columns=cols)
+    out.insert(0, 'Timestamp', origin + ids * bucket)
+    if 'Time' in df.columns:
+        out.insert(1, 'Time', pd.to_datetime(out['Timestamp'], unit='s').dt.round('us'))
+    return out
+
+
+def suggest_bucket(df, max_buckets=500):
+    """选择使桶数不超过 max_buckets 的最小预置桶，原始行数已足够少时返回 None"""
+    if df.empty or len(df) <= max_buckets:
+        return None
+
+    times = df['Timestamp'].to_numpy(dtype=float)
+    span = times[-1] - times[0]
+    for name, size in BUCKET_SIZES.items():
+        if span / size <= max_buckets:
+            return name
+    return list(BUCKET_SIZES)[-1]
@@ -0,0 +1,121 @@
+"""
+游程编码 (RLE) 模块
+模式、设定值、阀门状态等通道很少变化，前向填充后却以整列 float64 存储。
+这类 "阶跃" 通道只保存变化点: 起始行号 + 起始时间 + 值
+
+- 检测: 对二维数组按列块一次 diff，变化次数不超过行数的 RLE_MAX_RUN_RATIO 即视为阶跃通道
+- 查找: 行号/时间 → 所在游程均为二分查找 (searchsorted)
+- 统计: 按游程长度加权，不需要展开为整列
+- 绘图: 只发送窗口内的变化点，由 ECharts 阶梯线 (step) 绘制
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# 游程数 / 行数 不超过该比例的列按阶跃通道编码
+RLE_MAX_RUN_RATIO = 0.02
+
+# 行数少于此值时不编码 (收益太小)
+RLE_MIN_ROWS = 1000
+
+# 检测时每次同时处理的列数 (限制临时数组大小)
+DETECT_BLOCK = 32
+
+
+def detect_step_columns(df, columns, max_ratio=RLE_MAX_RUN_RATIO, min_rows=RLE_MIN_ROWS):
+    """返回 columns 中适合游程编码的列 (按列块向量化统计变化次数)"""
+    n = len(df)
+    if n < min_rows:
+        return []
+    numeric = [c for c in columns if pd.api.types.is_numeric_dtype(df[c])]
+    found = []
+    for start in range(0, len(numeric), DETECT_BLOCK):
+        block = numeric[start:start + DETECT_BLOCK]
+        values = df[block].to_numpy(dtype=float)
+        changes = (values[1:] != values[:-1]).sum(axis=0) + 1
+        found.extend(c for c, runs in zip(block, changes) if runs <= n * max_ratio)
+    return found
+
+
+class RunLengthColumn:
+    """一列的游程编码: 第 i 段从 starts[i] 行 (时间 times[i]) 开始，值为 values[i]"""
+
+    def __init__(self, starts, times, values, n_rows):
+        self.starts = starts
+        self.times = times
+        self.values = values
+        self.n_rows = n_rows
+
+    @classmethod
+    def encode(cls, times, values):
+        """整列 → 游程 (times 需已按时间排序)"""
+        values = np.asarray(values, dtype=float)
+        n = len(values)
+        if n == 0:
+            return cls(np.array([], dtype=np.int64), np.array([], dtype=float), values, 0)
+        # NaN != NaN，连续 NaN 也视为同一段
+        same = (values[1:] == values[:-1]) | (np.isnan(values[1:]) & np.isnan(values[:-1]))
+        starts = np.r_[0, np.flatnonzero(~same) + 1].astype(np.int64)
+        return cls(starts, np.asarray(times, dtype=float)[starts], values[starts], n)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def nbytes(self):
+        return self.starts.nbytes + self.times.nbytes + self.values.nbytes
+
+    @property
+    def dense_nbytes(self):
+        """展开为 float64 整列时的字节数"""
+        return self.n_rows * 8
+
+    def at_rows(self, rows):
+        """行号 → 值 (二分查找所在游程)"""
+        idx = np.searchsorted(self.starts, rows, side='right') - 1
+        return self.values[np.maximum(idx, 0)]
+
+    def at_time(self, t):
+        """时间 t 时的值 (t 之前最后一次变化的值；早于首行时取首段)"""
+        idx = int(np.searchsorted(self.times, t, side='right')) - 1
+        return float(self.values[max(idx, 0)])
+
+    def to_dense(self):
+        return np.repeat(self.values, np.diff(np.r_[self.starts, self.n_rows]))
+
+    def window(self, t_start, t_end):
+        """
+        时间窗口内的变化点 (times, values)
+        首点为窗口起点时刻生效的值，用于阶梯线绘制
+        """
+        if len(self) == 0:
+            return self.times, self.values
+        first = max(int(np.searchsorted(self.times, t_start, side='right')) - 1, 0)
+        last = int(np.searchsorted(self.times, t_end, side='right'))
+        times = self.times[first:max(last, first + 1)].copy()
+        times[0] = max(times[0], t_start)
+        return times, self.values[first:max(last, first + 1)]
+
+    def row_summary(self, r0, r1):
+        """
+        行区间 [r0, r1) 的汇总 (n / mean / m2 / min / max)，按游程长度加权
+        格式与 ChunkedLog._summarize 的单列结果一致
+        """
+        if r1 <= r0 or len(self) == 0:
+            return {'n': 0, 'mean': 0.0, 'm2': 0.0, 'min': np.nan, 'max': np.nan}
+        first = max(int(np.searchsorted(self.starts, r0, side='right')) - 1, 0)
+        last = int(np.searchsorted(self.starts, r1, side='left'))
+        starts = np.maximum(self.starts[first:last], r0)
+        ends = np.minimum(np.r_[self.starts[first + 1:last], r1], r1)
+        weights = (ends - starts).astype(float)
+        values = self.values[first:last]
+        n = weights.sum()
+        mean = (weights * values).sum() / n
+        return {
+            'n': int(n),
+            'mean': mean,
+            'm2': (weights * (values - mean) ** 2).sum(),
+            'min': values.min(),
+            'max': values.max(),
+        }
@@ -0,0 +1,190 @@
+"""
+日志倒排索引模块
+解析时顺带构建，参数选择、"查找首次出现" 与按参数过滤行都变为索引查找，而不是全量扫描
+
+- 参数索引: 参数名 → 该参数实际出现 (前向填充之前) 的行区间 [start, end)，行号对应最终 DataFrame
+- 词项索引: 词项 (小写) → 出现的行块编号；每块 BLOCK_LINES 行，查询时只扫描候选块确认具体行号
+- 词表按字典序排列: 前缀查找用二分，子串查找在拼接后的词表字符串上用 str.find
+"""
+
+import bisect
+import re
+
+import numpy as np
+
+from utils.log_parser import TIME_COLUMNS, ParseCancelled
+
+
+# 词项索引的行块大小: 越小定位越精确，索引越大
+BLOCK_LINES = 256
+
+# 词项: 以字母或下划线开头 (纯数字、时间戳不入索引)
+# 词项从单词边界开始，可跳过紧贴的数字前缀: 101.2kPa、25.3C 中的单位 kPa、C 也入索引。
+# 索引 (TOKEN_PATTERN) 与确认行 (find_lines) 共用同一边界，两者对 "词项出现在哪一行" 的判断一致
+TOKEN_START = r'(?<![\w.\-])[\d.\-]*'
+TOKEN_WORD = r'[A-Za-z_][\w.\-]*'
+TOKEN_END = r'(?![\w.\-])'
+TOKEN_PATTERN = re.compile(f'{TOKEN_START}({TOKEN_WORD})'.encode('ascii'))
+
+# 拼接词表时的分隔符 (不会出现在词项中)
+_SEP = "\n"
+
+
+def rows_to_ranges(rows):
+    """有序行号 → 连续区间 (starts, ends)，ends 不含"""
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = rows[np.r_[0, breaks]]
+    ends = rows[np.r_[breaks - 1, len(rows) - 1]] + 1
+    return starts, ends
+
+
+class Vocabulary:
+    """有序词表 (不区分大小写排序): 前缀二分查找 + 拼接字符串子串查找"""
+
+    def __init__(self, words):
+        self.words = sorted(words)
+        self._lower = [w.lower() for w in self.words]
+        self._order = sorted(range(len(self.words)), key=self._lower.__getitem__)
+        self._sorted_lower = [self._lower[i] for i in self._order]
+        self._joined = _SEP + _SEP.join(self._lower) + _SEP
+        self._starts = np.cumsum([1] + [len(w) + 1 for w in self._lower])[:-1]
+
+    def __len__(self):
+        return len(self.words)
+
+    def prefix(self, query, limit=None):
+        """不区分大小写的前缀匹配"""
+        q = query.lower()
+        lo = bisect.bisect_left(self._sorted_lower, q)
+        hi = bisect.bisect_left(self._sorted_lower, q + "\uffff")
+        found = [self.words[i] for i in self._order[lo:hi]]
+        return found[:limit] if limit else found
+
+    def substring(self, query, limit=None):
+        """不区分大小写的子串匹配"""
+        q = query.lower()
+        if not q or _SEP in q:
+            return []
+        hits = set()
+        pos = self._joined.find(q)
+        while pos >= 0:
+            # 命中位置所在的词: 词起点不大于 pos 的最后一个
+            hits.add(int(np.searchsorted(self._starts, pos, side='right')) - 1)
+            pos = self._joined.find(q, pos + 1)
+        found = [self.words[i] for i in sorted(hits, key=self._lower.__getitem__)]
+        return found[:limit] if limit else found
+
+    def lookup(self, query, mode="prefix", limit=None):
+        return self.substring(query, limit) if mode == "substring" else self.prefix(query, limit)
+
+
+class SearchIndex:
+    """单个日志的倒排索引"""
+
+    def __init__(self):
+        self.rows = 0
+        self.key_ranges = {}        # 参数 → (starts, ends)
+        self.token_blocks = {}      # 词项 → uint32 行块编号数组
+        self.block_lines = BLOCK_LINES
+        self.keys = Vocabulary([])
+        self.tokens = Vocabulary([])
+
+    @property
+    def nbytes(self):
+        key_bytes = sum(s.nbytes + e.nbytes for s, e in self.key_ranges.values())
+        return key_bytes + sum(b.nbytes for b in self.token_blocks.values())
+
+    def index_keys(self, df):
+        """
+        由解析顺序、未填充的 DataFrame (LogParser.parse 的 inspect 回调) 构建参数索引
+        解析结果按时间稳定排序，这里用同样的排序把行号映射到最终 DataFrame
+        """
+        self.rows = len(df)
+        inverse = None
+        if 'Timestamp' in df.columns and not df['Timestamp'].is_monotonic_increasing:
+            order = np.argsort(df['Timestamp'].to_numpy(dtype=float), kind='stable')
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+
+        for key in df.columns:
+            if key in TIME_COLUMNS:
+                continue
+            rows = np.flatnonzero(df[key].notna().to_numpy())
+            if inverse is not None:
+                rows = np.sort(inverse[rows])
+            self.key_ranges[key] = rows_to_ranges(rows)
+        self.keys = Vocabulary(self.key_ranges)
+
+    def index_tokens(self, raw, line_index, block_lines=BLOCK_LINES, cancel=None):
+        """按行块对原始字节做一次 findall，每块内去重后登记块编号"""
+        offsets = line_index.offsets
+        n_lines = line_index.line_count
+        postings = {}
+        for block, first in enumerate(range(0, n_lines, block_lines)):
+            if cancel is not None and block % 256 == 0 and cancel.is_set():
+                raise ParseCancelled(first)
+            start = int(offsets[first])
+            end = int(offsets[min(first + block_lines, n_lines)])
+            for token in set(TOKEN_PATTERN.findall(raw[start:end])):
+                postings.setdefault(token, []).append(block)
+
+        self.block_lines = block_lines
+        self.token_blocks = {}
+        for token, blocks in postings.items():
+            word = token.decode("utf-8", errors='ignore').lower()
+            if word in self.token_blocks:
+                # 大小写不同的同一词项合并
+                merged = np.union1d(self.token_blocks[word], blocks).astype(np.uint32)
+                self.token_blocks[word] = merged
+            else:
+                self.token_blocks[word] = np.array(blocks, dtype=np.uint32)
+        self.tokens = Vocabulary(self.token_blocks)
+
+    def key_rows(self, key, limit=None):
+        """参数实际出现的行号 (最终 DataFrame 中的位置)，按区间展开，最多 limit 行"""
+        if key not in self.key_ranges:
+            return np.array([], dtype=np.int64)
+        parts = []
+        total = 0
+        for start, end in zip(*self.key_ranges[key]):
+            if limit is not None and total + (end - start) > limit:
+                end = start + (limit - total)
+            parts.append(np.arange(start, end))
+            total += end - start
+            if limit is not None and total >= limit:
+                break
+        return np.concatenate(parts) if parts else np.array([], dtype=np.int64)
+
+    def key_count(self, key):
+        if key not in self.key_ranges:
+            return 0
+        starts, ends = self.key_ranges[key]
+        return int((ends - starts).sum())
+
+    def find_lines(self, word, fileobj, line_index, limit=100):
+        """
+        包含词项 word 的行号 (从 0 开始，最多 limit 个)
+        只读取候选行块，在块内逐行确认
+        """
+        blocks = self.token_blocks.get(word.lower())
+        if blocks is None:
+            return []
+        pattern = re.compile(TOKEN_START + re.escape(word) + TOKEN_END, re.IGNORECASE | re.ASCII)
+        found = []
+        for block in blocks.tolist():
+            first = block * self.block_lines
+            lines = line_index.read_lines(fileobj, first, self.block_lines)
+            for i, line in enumerate(lines):
+                if pattern.search(line):
+                    found.append(first + i)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+    def first_line(self, word, fileobj, line_index):
+        """词项首次出现的行号，未出现时返回 None"""
+        found = self.find_lines(word, fileobj, line_index, limit=1)
+        return found[0] if found else None
@@ -0,0 +1,186 @@
+"""
+进程内共享缓存模块
+同一服务器上多个会话打开同一份日志时，解析结果与派生索引只保留一份，按内容指纹共享
+
+- 缓存对象对所有会话只读: 调用方不得原地修改 (需要修改时先 copy)
+- 引用计数: 会话每次运行登记自己正在使用的条目 (租约)，不再使用或租约过期后计数减少；
+  断开的会话没有结束回调，租约超过 NEUP_CACHE_LEASE_S 秒未续期即视为已释放
+- 全局内存上限: 超出时按最近最少使用 (LRU) 顺序淘汰引用计数为 0 的条目；
+  仍在使用的条目不会被淘汰 (此时总量可能暂时超过上限)
+- 同一键并发请求时只构建一次，其余请求等待并直接复用结果
+- 统计命中率、淘汰次数，供管理视图显示
+
+上限通过环境变量配置:
+    NEUP_SHARED_CACHE_MB   共享缓存内存上限，默认 2048
+    NEUP_CACHE_LEASE_S     会话租约有效期 (秒)，默认 1800
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.memory_guard import MB
+
+
+SHARED_CACHE_BUDGET = float(os.environ.get("NEUP_SHARED_CACHE_MB", 2048)) * MB
+LEASE_TTL = float(os.environ.get("NEUP_CACHE_LEASE_S", 1800))
+
+
+class CacheEntry:
+    """一个缓存条目: 值、占用字节数、各会话的租约 (会话 id → 最近使用时间)"""
+
+    def __init__(self, key, value, nbytes, label=""):
+        self.key = key
+        self.value = value
+        self.nbytes = nbytes
+        self.label = label
+        self.leases = {}
+        self.hits = 0
+        self.created = self.last_used = time.time()
+
+
+class SharedCache:
+    """线程安全的进程内 LRU 缓存 (带会话引用计数与内存上限)"""
+
+    def __init__(self, max_bytes=SHARED_CACHE_BUDGET, lease_ttl=LEASE_TTL):
+        self.max_bytes = max_bytes
+        self.lease_ttl = lease_ttl
+        self._entries = OrderedDict()
+        self._building = {}         # 键 → 构建锁 (同一键只构建一次)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_create(self, key, build, size=None, label="", session=None):
+        """
+        取出 key 对应的值，不存在时调用 build() 构建并登记
+        size: 可选函数 size(value) → 占用字节数；session: 登记租约的会话 id
+        """
+        with self._lock:
+            value, found = self._lookup(key, session)
+            if found:
+                return value
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                # 等待期间其他会话可能已构建完成
+                value, found = self._lookup(key, session)
+                if found:
+                    return value
+                self.misses += 1
+
+            try:
+                value = build()
+            except Exception:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+            entry = CacheEntry(key, value, int(size(value)) if size else 0, label)
+            with self._lock:
+                self._entries[key] = entry
+                self._lease(entry, session)
+                self._building.pop(key, None)
+                self._evict()
+            return value
+
+    def _lookup(self, key, session):
+        """命中时续租并移到 LRU 末尾 (调用方持有锁)，返回 (value, found)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        self.hits += 1
+        entry.hits += 1
+        self._entries.move_to_end(key)
+        self._lease(entry, session)
+        return entry.value, True
+
+    @staticmethod
+    def _lease(entry, session):
+        entry.last_used = time.time()
+        if session is not None:
+            entry.leases[session] = entry.last_used
+
+    def refcount(self, entry, now=None):
+        """有效租约数 (顺带清理过期租约)"""
+        now = time.time() if now is None else now
+        expired = [s for s, seen in entry.leases.items() if now - seen > self.lease_ttl]
+        for s in expired:
+            del entry.leases[s]
+        return len(entry.leases)
+
+    def release(self, session, keep=()):
+        """释放会话在 keep 以外条目上的租约 (会话切换文件后旧结果即可被淘汰)"""
+        keep = set(keep)
+        with self._lock:
+            for key, entry in self._entries.items():
+                if key not in keep:
+                    entry.leases.pop(session, None)
+            self._evict()
+
+    def _evict(self):
+        """超出上限时从最久未用的一端淘汰未被引用的条目 (调用方持有锁)"""
+        total = sum(e.nbytes for e in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        now = time.time()
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if self.refcount(entry, now) > 0:
+                continue
+            del self._entries[key]
+            total -= entry.nbytes
+            self.evictions += 1
+
+    def clear(self, unused_only=True):
+        """清空缓存；unused_only 时只移除引用计数为 0 的条目，返回移除个数"""
+        with self._lock:
+            now = time.time()
+            keys = [k for k, e in self._entries.items() if not unused_only or self.refcount(e, now) == 0]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values())
+
+    def stats(self):
+        """汇总统计"""
+        with self._lock:
+            now = time.time()
+            entries = list(self._entries.values())
+            pinned = [e for e in entries if self.refcount(e, now) > 0]
+            requests = self.hits + self.misses
+            return {
+                'entries': len(entries),
+                'bytes': sum(e.nbytes for e in entries),
+                'pinned_bytes': sum(e.nbytes for e in pinned),
+                'max_bytes': self.max_bytes,
+                'sessions': len({s for e in entries for s in e.leases}),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+            }
+
+    def describe(self):
+        """各条目明细 (按最近使用排序，最近的在前)，供管理视图显示"""
+        with self._lock:
+            now = time.time()
+            return [
+                {
+                    'label': e.label or str(e.key),
+                    'MB': round(e.nbytes / MB, 2),
+                    'refs': self.refcount(e, now),
+                    'hits': e.hits,
+                    'idle_s': round(now - e.last_used, 1),
+                    'age_s': round(now - e.created, 1),
+                }
+                for e in reversed(self._entries.values())
+            ]
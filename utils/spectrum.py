@@ -0,0 +1,184 @@
+"""
+频谱分析模块
+振动、转速等通道的频率成分: Welch 平均功率谱密度 (PSD) 与时频谱 (spectrogram)
+
+- 先把通道线性插值到等间隔采样 (采样率 fs)，再按分段加窗 FFT
+- 全程流式计算: 逐块读取数据 → 插值为有限长度的样本块 → 分段成批 FFT 并累加，
+  不会把整列插值结果或全部分段同时放进内存，数百万样本的通道内存占用也有上界
+- 时频谱按时间均分为不超过 MAX_SPECTROGRAM_FRAMES 列，每列是落在其中的分段功率的平均
+- PSD 单位为 (通道单位)²/Hz，与 scipy.signal.welch 的 density 定标一致 (去均值、单边谱)
+"""
+
+from itertools import chain
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# 分段长度候选 (样本数)
+SEGMENT_SIZES = (256, 512, 1024, 2048, 4096)
+
+# 窗函数
+WINDOWS = {
+    "hann": np.hanning,
+    "hamming": np.hamming,
+    "blackman": np.blackman,
+    "rect": np.ones,
+}
+
+# 时频谱最多的时间列数 (超出时相邻分段合并平均)
+MAX_SPECTROGRAM_FRAMES = 400
+
+# 插值后每个样本块的最大长度，与每批 FFT 的最多分段数 (共同限制临时数组大小)
+BLOCK_SAMPLES = 1 << 18
+FRAME_BATCH = 512
+
+
+class Spectrum:
+    """一次频谱分析的结果"""
+
+    def __init__(self, fs, nperseg, freqs, psd, segments, times, spectrogram):
+        self.fs = fs
+        self.nperseg = nperseg
+        self.freqs = freqs              # (频点,)
+        self.psd = psd                  # (频点,) Welch 平均 PSD
+        self.segments = segments        # 参与平均的分段数
+        self.times = times              # (时间列,) 各列的中心时间
+        self.spectrogram = spectrogram  # (时间列, 频点) 各列的平均 PSD
+
+    @property
+    def nbytes(self):
+        return self.freqs.nbytes + self.psd.nbytes + self.times.nbytes + self.spectrogram.nbytes
+
+    def peak_frequency(self):
+        """PSD 最大处的频率 (跳过直流分量)"""
+        if len(self.psd) < 2:
+            return 0.0
+        return float(self.freqs[1 + int(np.argmax(self.psd[1:]))])
+
+
+def estimate_sample_rate(times):
+    """由采样间隔的中位数估计采样率 (Hz)"""
+    diffs = np.diff(np.asarray(times, dtype=float))
+    diffs = diffs[diffs > 0]
+    return 1.0 / float(np.median(diffs)) if len(diffs) else 1.0
+
+
+def uniform_blocks(chunks, key, fs, t0):
+    """
+    把逐块产出的 (Timestamp, key) 数据插值到等间隔网格 t0 + k / fs
+    逐块产出 (首个网格点序号, 样本数组)；块边界处用上一块的最后一个样本衔接
+    """
+    next_k = 0
+    prev_t = prev_v = None
+    for part in chunks:
+        times = part['Timestamp'].to_numpy(dtype=float)
+        values = np.nan_to_num(part[key].to_numpy(dtype=float))
+        if len(times) == 0:
+            continue
+        if prev_t is not None:
+            times = np.r_[prev_t, times]
+            values = np.r_[prev_v, values]
+        last_k = int(np.floor((times[-1] - t0) * fs + 1e-9))
+        for start in range(next_k, last_k + 1, BLOCK_SAMPLES):
+            grid = t0 + np.arange(start, min(start + BLOCK_SAMPLES, last_k + 1)) / fs
+            yield start, np.interp(grid, times, values)
+        next_k = max(next_k, last_k + 1)
+        prev_t, prev_v = times[-1], values[-1]
+
+
+def iter_frames(blocks, nperseg, step):
+    """
+    把连续的样本块切为重叠分段，逐批产出 (首个分段的起始样本序号, (批大小, nperseg) 视图)
+    块尾不足一个分段的样本留到下一块
+    """
+    tail = np.empty(0)
+    base = None
+    for start, block in blocks:
+        if base is None:
+            base = start
+        buf = np.concatenate([tail, block])
+        n_frames = (len(buf) - nperseg) // step + 1 if len(buf) >= nperseg else 0
+        if n_frames > 0:
+            frames = sliding_window_view(buf, nperseg)[::step][:n_frames]
+            for i in range(0, n_frames, FRAME_BATCH):
+                yield base + i * step, frames[i:i + FRAME_BATCH]
+        cut = n_frames * step
+        tail = buf[cut:]
+        base += cut
+
+
+def spectral_analysis(chunks, key, fs, t_start, t_end, nperseg=1024, overlap=0.5, window="hann",
+                      max_frames=MAX_SPECTROGRAM_FRAMES):
+    """
+    流式计算 Welch PSD 与时频谱
+    chunks: 按时间排序、逐块产出含 Timestamp 与 key 列的 DataFrame 的可迭代对象 (如 ChunkedLog.iter_chunks)
+    t_start / t_end: 分析窗口，用于划分时频谱的时间列
+    窗口内不足一个分段时返回 None
+    """
+    step = max(1, int(nperseg * (1 - overlap)))
+    expected = int((t_end - t_start) * fs + 1 - nperseg) // step + 1
+    if expected < 1:
+        return None
+    n_cols = max(1, min(max_frames, expected))
+
+    taper = WINDOWS[window](nperseg)
+    scale = 1.0 / (fs * (taper ** 2).sum())
+    n_bins = nperseg // 2 + 1
+    psd_sum = np.zeros(n_bins)
+    spec_sum = np.zeros((n_cols, n_bins))
+    spec_count = np.zeros(n_cols)
+    segments = 0
+
+    # 插值网格从窗口内首个样本开始
+    chunks = iter(chunks)
+    head = next((part for part in chunks if len(part)), None)
+    if head is None:
+        return None
+    t0 = float(head['Timestamp'].iloc[0])
+
+    blocks = uniform_blocks(chain([head], chunks), key, fs, t0)
+    for first, frames in iter_frames(blocks, nperseg, step):
+        detrended = frames - frames.mean(axis=1, keepdims=True)
+        power = np.abs(np.fft.rfft(detrended * taper, axis=1)) ** 2 * scale
+        # 单边谱: 直流 (与偶数长度时的奈奎斯特频点) 以外的能量加倍
+        power[:, 1:n_bins - (nperseg % 2 == 0)] *= 2
+        psd_sum += power.sum(axis=0)
+        segments += len(power)
+
+        # 分段中心时间 → 时频谱列；分段按时间有序，列号单调，可用 reduceat 分组累加
+        centers = t0 + (first + np.arange(len(power)) * step + nperseg / 2) / fs
+        cols = np.clip(((centers - t_start) / (t_end - t_start) * n_cols).astype(int), 0, n_cols - 1) \
+            if t_end > t_start else np.zeros(len(power), dtype=int)
+        starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+        spec_sum[cols[starts]] += np.add.reduceat(power, starts, axis=0)
+        spec_count[cols[starts]] += np.diff(np.r_[starts, len(cols)])
+
+    if segments == 0:
+        return None
+    filled = spec_count > 0
+    times = t_start + (np.arange(n_cols) + 0.5) * (t_end - t_start) / n_cols
+    return Spectrum(
+        fs=fs,
+        nperseg=nperseg,
+        freqs=np.fft.rfftfreq(nperseg, 1.0 / fs),
+        psd=psd_sum / segments,
+        segments=segments,
+        times=times[filled],
+        spectrogram=spec_sum[filled] / spec_count[filled, None],
+    )
+
+
+def to_db(power):
+    """功率 → dB (10·log10)，零值取极小值避免 -inf"""
+    return 10 * np.log10(np.maximum(power, np.finfo(float).tiny))
+
+
+def reduce_bins(freqs, power, max_bins):
+    """频点过多时相邻频点取平均 (power 最后一维为频点)，返回 (freqs, power)"""
+    n = len(freqs)
+    if n <= max_bins:
+        return freqs, power
+    edges = np.linspace(0, n, max_bins + 1).astype(int)
+    return np.add.reduceat(freqs, edges[:-1]) / np.diff(edges), \
+        np.add.reduceat(power, edges[:-1], axis=-1) / np.diff(edges)